@@ -38,6 +38,7 @@ export type { MLflowIntakeConfig } from './models/MLflowIntakeConfig';
 export type { MLflowIntakeConfigCreate } from './models/MLflowIntakeConfigCreate';
 export type { MLflowIntakeStatus } from './models/MLflowIntakeStatus';
 export type { MLflowTraceInfo } from './models/MLflowTraceInfo';
+export type { MLflowTracePreviewPage } from './models/MLflowTracePreviewPage';
 export type { Rubric } from './models/Rubric';
 export type { RubricCreate } from './models/RubricCreate';
 export type { Trace } from './models/Trace';
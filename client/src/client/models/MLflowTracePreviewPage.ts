@@ -0,0 +1,20 @@
+/* generated using openapi-typescript-codegen -- do not edit */
+/* istanbul ignore file */
+/* tslint:disable */
+/* eslint-disable */
+import type { MLflowTraceInfo } from './MLflowTraceInfo';
+/**
+ * A page of MLflow trace previews.
+ */
+export type MLflowTracePreviewPage = {
+    traces: Array<MLflowTraceInfo>;
+    total: number;
+    page: number;
+    page_size: number;
+    has_more: boolean;
+    /**
+     * Whether the previews were served from the preview cache
+     */
+    cached?: boolean;
+};
+
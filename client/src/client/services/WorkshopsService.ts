@@ -18,7 +18,7 @@ import type { JudgePromptCreate } from '../models/JudgePromptCreate';
 import type { MLflowIntakeConfig } from '../models/MLflowIntakeConfig';
 import type { MLflowIntakeConfigCreate } from '../models/MLflowIntakeConfigCreate';
 import type { MLflowIntakeStatus } from '../models/MLflowIntakeStatus';
-import type { MLflowTraceInfo } from '../models/MLflowTraceInfo';
+import type { MLflowTracePreviewPage } from '../models/MLflowTracePreviewPage';
 import type { Rubric } from '../models/Rubric';
 import type { RubricCreate } from '../models/RubricCreate';
 import type { Trace } from '../models/Trace';
@@ -1362,22 +1362,33 @@ export class WorkshopsService {
     }
     /**
      * Get Mlflow Traces
-     * Get available traces from MLflow (without ingesting).
+     * Get a page of trace previews from MLflow (without ingesting).
+     *
+     * Previews are fetched without span data and cached briefly per experiment and
+     * filter, so paging does not query MLflow again.
      * @param workshopId
      * @param requestBody
-     * @returns MLflowTraceInfo Successful Response
+     * @param page
+     * @param pageSize
+     * @returns MLflowTracePreviewPage Successful Response
      * @throws ApiError
      */
     public static getMlflowTracesWorkshopsWorkshopIdMlflowTracesGet(
         workshopId: string,
         requestBody: MLflowIntakeConfigCreate,
-    ): CancelablePromise<Array<MLflowTraceInfo>> {
+        page: number = 1,
+        pageSize: number = 25,
+    ): CancelablePromise<MLflowTracePreviewPage> {
         return __request(OpenAPI, {
             method: 'GET',
             url: '/workshops/{workshop_id}/mlflow-traces',
             path: {
                 'workshop_id': workshopId,
             },
+            query: {
+                'page': page,
+                'page_size': pageSize,
+            },
             body: requestBody,
             mediaType: 'application/json',
             errors: {
@@ -163,6 +163,14 @@ async def detailed_health():
     return {'status': 'unhealthy', 'database': 'disconnected', 'error': str(e), 'timestamp': time.time()}
 
 
+@app.get('/health/llm-endpoints')
+async def llm_endpoint_health():
+  """Adaptive scheduler state per model serving endpoint (throttling, concurrency, queue depth)."""
+  from server.services.endpoint_scheduler import scheduler_stats
+
+  return {'endpoints': scheduler_stats(), 'timestamp': time.time()}
+
+
 @app.get('/test')
 async def test():
   """Test endpoint."""
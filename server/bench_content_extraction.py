@@ -0,0 +1,127 @@
+"""Benchmark MLflow content extraction on a corpus of representative payload shapes.
+
+Usage: python -m server.bench_content_extraction [--traces 2000] [--repeat 5]
+"""
+
+import json
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+import click
+
+from server.services.content_extraction import ORJSON_AVAILABLE, default_registry
+
+LOREM = (
+  'Retrieval augmented generation combines a retriever with a generator so answers are grounded in documents. '
+  'The workshop collects human ratings on traces produced by the agent under evaluation. '
+)
+
+
+def _text(rng: random.Random, min_words: int, max_words: int) -> str:
+  words = LOREM.split()
+  return ' '.join(rng.choice(words) for _ in range(rng.randint(min_words, max_words)))
+
+
+def _chat_messages(rng: random.Random) -> Tuple[str, str]:
+  history = []
+  for _ in range(rng.randint(0, 6)):
+    history.append({'role': 'user', 'content': _text(rng, 5, 40)})
+    history.append({'role': 'assistant', 'content': _text(rng, 20, 200)})
+  request = {'messages': [{'role': 'system', 'content': _text(rng, 20, 60)}, *history, {'role': 'user', 'content': _text(rng, 5, 40)}]}
+  response = {'messages': [{'role': 'assistant', 'content': _text(rng, 50, 400)}]}
+  return json.dumps(request), json.dumps(response)
+
+
+def _agent_request_input(rng: random.Random) -> Tuple[str, str]:
+  request = {
+    'request': {
+      'input': [{'role': 'user', 'content': _text(rng, 5, 60)}],
+      'custom_inputs': {'session_id': f'session-{rng.randint(0, 10_000)}', 'documents': [_text(rng, 50, 200) for _ in range(rng.randint(1, 5))]},
+    }
+  }
+  response = {
+    'object': 'response',
+    'id': f'resp_{rng.randint(0, 10**9)}',
+    'output': [
+      {'type': 'function_call', 'name': 'search', 'arguments': json.dumps({'query': _text(rng, 3, 10)})},
+      {'type': 'message', 'role': 'assistant', 'content': [{'type': 'output_text', 'text': _text(rng, 50, 400)}]},
+    ],
+  }
+  return json.dumps(request), json.dumps(response)
+
+
+def _streamed_output_items(rng: random.Random) -> Tuple[str, str]:
+  request = {'messages': [{'role': 'user', 'content': _text(rng, 5, 60)}]}
+  events = [{'type': 'response.output_text.delta', 'delta': _text(rng, 1, 5)} for _ in range(rng.randint(10, 80))]
+  events.append(
+    {
+      'type': 'response.output_item.done',
+      'item': {'type': 'message', 'role': 'assistant', 'content': [{'type': 'output_text', 'text': _text(rng, 50, 400)}]},
+    }
+  )
+  return json.dumps(request), json.dumps(events)
+
+
+def _plain_text(rng: random.Random) -> Tuple[str, str]:
+  return _text(rng, 5, 60), _text(rng, 50, 400)
+
+
+SHAPES: Dict[str, Callable[[random.Random], Tuple[str, str]]] = {
+  'chat_messages': _chat_messages,
+  'agent_request_input': _agent_request_input,
+  'streamed_output_items': _streamed_output_items,
+  'plain_text': _plain_text,
+}
+
+
+def build_corpus(num_traces: int, seed: int = 0) -> List[Tuple[str, str]]:
+  """Build (request, response) payload pairs cycling through every payload shape."""
+  rng = random.Random(seed)
+  generators = list(SHAPES.values())
+  return [generators[i % len(generators)](rng) for i in range(num_traces)]
+
+
+def _time(fn: Callable[[], None], repeat: int) -> float:
+  best = float('inf')
+  for _ in range(repeat):
+    start = time.perf_counter()
+    fn()
+    best = min(best, time.perf_counter() - start)
+  return best
+
+
+@click.command()
+@click.option('--traces', default=2000, show_default=True, help='Number of traces in the corpus')
+@click.option('--repeat', default=5, show_default=True, help='Repetitions per measurement (best is reported)')
+def main(traces: int, repeat: int) -> None:
+  """Measure extraction throughput with the stdlib and orjson parsers."""
+  corpus = build_corpus(traces)
+  total_mb = sum(len(req) + len(resp) for req, resp in corpus) / 1e6
+  print(f'Corpus: {traces} traces, {total_mb:.1f} MB, shapes: {", ".join(SHAPES)}')
+
+  parsers = {'stdlib json': default_registry.copy(loads=json.loads)}
+  if ORJSON_AVAILABLE:
+    parsers['orjson'] = default_registry
+  else:
+    print('orjson is not installed - only the stdlib parser is measured')
+
+  for label, registry in parsers.items():
+
+    def extract_once(registry=registry) -> None:
+      for request, response in corpus:
+        registry.extract(request)
+        registry.extract(response)
+
+    # Search followed by ingest used to extract every trace twice
+    def extract_twice(registry=registry) -> None:
+      extract_once(registry)
+      extract_once(registry)
+
+    once = _time(extract_once, repeat)
+    twice = _time(extract_twice, repeat)
+    print(f'{label:>12}: parse once {once * 1000:8.1f} ms ({traces / once:9.0f} traces/s) | parse twice {twice * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,164 @@
+"""Benchmark judge evaluation throughput against the local fake serving endpoint.
+
+For each corpus size the benchmark seeds a workshop with synthetic annotated traces in
+a scratch database. It then runs ``JudgeService.evaluate_prompt`` with a
+``serving:`` (or, with ``--judge databricks``, a ``databricks-*``) judge whose calls go
+to ``server.fake_serving_endpoint``. It reports
+end-to-end throughput and the tail latency of judge calls from the recorded call
+telemetry. Latency includes scheduler queue wait and throttled retries.
+
+Usage: python -m server.bench_judge_throughput [--traces 100,1000,10000] [--latency lognormal:200:0.5] [--throttle-rate 0.01] [--judge serving|databricks]
+"""
+
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import List
+
+import click
+import numpy as np
+
+from server.fake_serving_endpoint import FakeServingConfig, FakeServingEndpoint, LatencyDistribution
+
+WORDS = (
+  'the workshop collects human ratings on traces produced by the agent under evaluation so that a judge prompt can be '
+  'aligned with expert reviewers before it is used to score production traffic at scale'
+).split()
+
+
+def _text(rng: random.Random, min_words: int, max_words: int) -> str:
+  return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words)))
+
+
+def _seed_workshop(db_service, num_traces: int, model_name: str, databricks_host: str, seed: int):
+  """Create a workshop with annotated synthetic traces and a serving judge prompt."""
+  from sqlalchemy import insert
+
+  from server.database import AnnotationDB
+  from server.models import JudgePromptCreate, MLflowIntakeConfig, TraceUpload, WorkshopCreate
+  from server.services.token_storage_service import token_storage
+
+  rng = random.Random(seed)
+  workshop = db_service.create_workshop(WorkshopCreate(name=f'Judge benchmark ({num_traces} traces)', facilitator_id='benchmark'))
+  traces = db_service.add_traces(workshop.id, [TraceUpload(input=_text(rng, 5, 40), output=_text(rng, 20, 200)) for _ in range(num_traces)])
+
+  # Bulk insert: one add_annotation commit per trace would dominate setup time
+  db_service.db.execute(
+    insert(AnnotationDB),
+    [
+      {'id': str(uuid.uuid4()), 'workshop_id': workshop.id, 'trace_id': trace.id, 'user_id': 'benchmark', 'rating': rng.randint(1, 5)}
+      for trace in traces
+    ],
+  )
+  db_service.db.commit()
+  db_service.refresh_trace_consensus(workshop.id)
+
+  db_service.create_mlflow_config(workshop.id, MLflowIntakeConfig(databricks_host=databricks_host, databricks_token='', experiment_id='0'))
+  token_storage.store_token(workshop.id, 'dapi-benchmark')
+  prompt = db_service.create_judge_prompt(
+    workshop.id,
+    JudgePromptCreate(
+      prompt_text='Rate how well the output answers the input on a 1-5 scale.\n\nInput: {input}\n\nOutput: {output}',
+      model_name=model_name,
+    ),
+  )
+  return workshop, prompt
+
+
+def _percentiles(values: List[float]) -> str:
+  if not values:
+    return '-'
+  p50, p95, p99 = np.percentile(values, [50, 95, 99])
+  return f'{p50:7.0f} {p95:7.0f} {p99:7.0f}'
+
+
+@click.command()
+@click.option('--traces', default='100,1000,10000', show_default=True, help='Comma-separated corpus sizes')
+@click.option('--latency', default='lognormal:200:0.5', show_default=True, help='Fake endpoint latency: fixed:MS, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA')
+@click.option('--throttle-rate', default=0.01, show_default=True, help='Share of requests the fake endpoint answers with 429')
+@click.option('--endpoint-concurrency', default=0, show_default=True, help='Fake endpoint answers 429 above this many requests in flight (0 for no limit)')
+@click.option('--max-concurrency', default=8, show_default=True, help='Judge worker threads (evaluation max_concurrency)')
+@click.option('--packed', is_flag=True, help='Pack several short traces into one judge call')
+@click.option(
+  '--judge',
+  type=click.Choice(['serving', 'databricks']),
+  default='serving',
+  show_default=True,
+  help='Judge backend: serving:* models, or databricks-* models called through DatabricksService',
+)
+@click.option('--database-url', default=None, help='Database for the benchmark workshops (default: a scratch SQLite file)')
+@click.option('--seed', default=0, show_default=True)
+def main(
+  traces: str,
+  latency: str,
+  throttle_rate: float,
+  endpoint_concurrency: int,
+  max_concurrency: int,
+  packed: bool,
+  judge: str,
+  database_url: str,
+  seed: int,
+) -> None:
+  """Measure judge evaluation throughput and call tail latency per corpus size."""
+  sizes = [int(size) for size in traces.split(',') if size.strip()]
+  scratch_dir = None
+  if database_url is None:
+    scratch_dir = tempfile.TemporaryDirectory(prefix='judge-bench-')
+    database_url = f'sqlite:///{os.path.join(scratch_dir.name, "bench.db")}'
+  # The engine is created on import, so the database must be chosen first
+  os.environ['DATABASE_URL'] = database_url
+
+  from server.config import ServerConfig
+  from server.database import SessionLocal, create_tables
+  from server.models import JudgeEvaluationRequest
+  from server.services.database_service import DatabaseService
+  from server.services.judge_service import JudgeService
+
+  create_tables()
+  config = FakeServingConfig(LatencyDistribution.parse(latency), throttle_rate, endpoint_concurrency, seed=seed)
+
+  with FakeServingEndpoint(config) as endpoint:
+    ServerConfig.JUDGE_SERVING_BASE_URL = endpoint.base_url
+    print(
+      f'Fake endpoint {endpoint.base_url}: latency {latency}, 429 rate {throttle_rate}, '
+      f'endpoint concurrency {endpoint_concurrency or "unlimited"} | {judge} judge, workers {max_concurrency}, packed {packed}'
+    )
+    print(f'{"traces":>7} {"wall s":>8} {"traces/s":>9} {"calls":>6} {"429s":>5} {"retries":>7} {"failed":>6}   latency ms p50/p95/p99   queue ms p95')
+
+    for size in sizes:
+      db_service = DatabaseService(SessionLocal())
+      try:
+        # A fresh endpoint name per size, so each run starts with a cold adaptive scheduler
+        endpoint_name = f'bench-judge-{size}-{uuid.uuid4().hex[:6]}'
+        model_name = f'databricks-{endpoint_name}' if judge == 'databricks' else f'serving:{endpoint_name}'
+        # DatabricksService calls <host>/serving-endpoints; serving judges use JUDGE_SERVING_BASE_URL
+        databricks_host = endpoint.base_url if judge == 'databricks' else 'https://benchmark.invalid'
+        workshop, prompt = _seed_workshop(db_service, size, model_name, databricks_host, seed)
+        throttled_before = endpoint.stats['throttled']
+
+        started = time.perf_counter()
+        metrics = JudgeService(db_service).evaluate_prompt(
+          workshop.id,
+          JudgeEvaluationRequest(prompt_id=prompt.id, max_concurrency=max_concurrency, bypass_cache=True, fail_fast=False, packed=packed),
+        )
+        elapsed = time.perf_counter() - started
+
+        rows = db_service.get_judge_call_telemetry(workshop.id, run_id=metrics.run_id)
+        latencies = [row['latency_ms'] for row in rows]
+        queue_waits = [row['queue_wait_ms'] or 0.0 for row in rows]
+        queue_p95 = f'{np.percentile(queue_waits, 95):12.0f}' if queue_waits else f'{"-":>12}'
+        print(
+          f'{size:>7} {elapsed:8.2f} {size / elapsed:9.1f} {len(rows):>6} {endpoint.stats["throttled"] - throttled_before:>5} '
+          f'{sum(row["retries"] or 0 for row in rows):>7} {len(metrics.evaluation_errors):>6}   {_percentiles(latencies)}   {queue_p95}'
+        )
+      finally:
+        db_service.db.close()
+
+  if scratch_dir is not None:
+    scratch_dir.cleanup()
+
+
+if __name__ == '__main__':
+  main()
@@ -1,5 +1,6 @@
 """Server configuration for handling concurrent users and high load."""
 
+import json
 import os
 
 
@@ -20,6 +21,35 @@ class ServerConfig:
   DB_MAX_OVERFLOW: int = int(os.getenv('DB_MAX_OVERFLOW', '30'))
   DB_POOL_TIMEOUT: int = int(os.getenv('DB_POOL_TIMEOUT', '30'))
   DB_POOL_RECYCLE: int = int(os.getenv('DB_POOL_RECYCLE', '3600'))
+  # Offline trace import settings (files are only read from inside this directory)
+  TRACE_IMPORT_DIR: str = os.getenv('TRACE_IMPORT_DIR', 'imports')
+  # Trace upload limits on the decompressed body and on a single NDJSON line, in bytes
+  TRACE_UPLOAD_MAX_BYTES: int = int(os.getenv('TRACE_UPLOAD_MAX_BYTES', str(256 * 1024**2)))
+  TRACE_UPLOAD_MAX_LINE_BYTES: int = int(os.getenv('TRACE_UPLOAD_MAX_LINE_BYTES', str(32 * 1024**2)))
+  # Judge evaluation settings (requests per minute is per serving endpoint, 0 = unlimited)
+  JUDGE_MAX_CONCURRENCY: int = int(os.getenv('JUDGE_MAX_CONCURRENCY', '8'))
+  JUDGE_REQUESTS_PER_MINUTE: float = float(os.getenv('JUDGE_REQUESTS_PER_MINUTE', '0'))
+  # Adaptive per-endpoint scheduling: concurrency ceiling and retries of throttled (429) calls
+  JUDGE_ENDPOINT_MAX_CONCURRENCY: int = int(os.getenv('JUDGE_ENDPOINT_MAX_CONCURRENCY', '32'))
+  JUDGE_THROTTLE_MAX_RETRIES: int = int(os.getenv('JUDGE_THROTTLE_MAX_RETRIES', '5'))
+  JUDGE_THROTTLE_BACKOFF_SECONDS: float = float(os.getenv('JUDGE_THROTTLE_BACKOFF_SECONDS', '1.0'))
+  # Maximum judge outputs kept in the result cache before least recently used entries are evicted
+  JUDGE_CACHE_MAX_ENTRIES: int = int(os.getenv('JUDGE_CACHE_MAX_ENTRIES', '50000'))
+  # Direct serving judge backend (serving:<endpoint> models); base URL overrides <workspace>/serving-endpoints
+  JUDGE_SERVING_BASE_URL: str = os.getenv('JUDGE_SERVING_BASE_URL', '')
+  JUDGE_HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv('JUDGE_HTTP_CONNECT_TIMEOUT_SECONDS', '10'))
+  JUDGE_HTTP_TIMEOUT_SECONDS: float = float(os.getenv('JUDGE_HTTP_TIMEOUT_SECONDS', '60'))
+  JUDGE_HTTP_MAX_RETRIES: int = int(os.getenv('JUDGE_HTTP_MAX_RETRIES', '3'))
+  JUDGE_HTTP_BACKOFF_SECONDS: float = float(os.getenv('JUDGE_HTTP_BACKOFF_SECONDS', '0.5'))
+  # Packed judging: estimated token budget per request, traces per request, and largest trace worth packing
+  JUDGE_PACK_TOKEN_BUDGET: int = int(os.getenv('JUDGE_PACK_TOKEN_BUDGET', '3000'))
+  JUDGE_PACK_MAX_ITEMS: int = int(os.getenv('JUDGE_PACK_MAX_ITEMS', '10'))
+  JUDGE_PACK_MAX_TRACE_TOKENS: int = int(os.getenv('JUDGE_PACK_MAX_TRACE_TOKENS', '600'))
+  # Bootstrap resamples and confidence level of judge metric intervals (0 resamples disables intervals)
+  JUDGE_METRICS_BOOTSTRAP_RESAMPLES: int = int(os.getenv('JUDGE_METRICS_BOOTSTRAP_RESAMPLES', '2000'))
+  JUDGE_METRICS_CONFIDENCE: float = float(os.getenv('JUDGE_METRICS_CONFIDENCE', '0.95'))
+  # Judge telemetry cost estimates: JSON of endpoint -> {"input": USD, "output": USD} per million tokens
+  JUDGE_TOKEN_PRICES: dict = json.loads(os.getenv('JUDGE_TOKEN_PRICES') or '{}')
   # CORS settings - Allow all origins for development
   CORS_ORIGINS: list = ['*']  # Allow all origins
 
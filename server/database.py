@@ -1,5 +1,6 @@
 """Database setup and configuration for the workshop application."""
 
+import hashlib
 import os
 import uuid
 
@@ -10,9 +11,11 @@ from sqlalchemy import (
   DateTime,
   Float,
   ForeignKey,
+  Index,
   Integer,
   String,
   Text,
+  UniqueConstraint,
   create_engine,
 )
 from sqlalchemy.ext.declarative import declarative_base
@@ -141,11 +144,17 @@ class WorkshopDB(Base):
   findings = relationship('DiscoveryFindingDB', back_populates='workshop', cascade='all, delete-orphan')
   rubrics = relationship('RubricDB', back_populates='workshop', cascade='all, delete-orphan')
   annotations = relationship('AnnotationDB', back_populates='workshop', cascade='all, delete-orphan')
+  trace_consensus = relationship('TraceConsensusDB', back_populates='workshop', cascade='all, delete-orphan')
   mlflow_config = relationship('MLflowIntakeConfigDB', back_populates='workshop', uselist=False, cascade='all, delete-orphan')
   judge_prompts = relationship('JudgePromptDB', back_populates='workshop', cascade='all, delete-orphan')
-  judge_evaluations = relationship('JudgeEvaluationDB', back_populates='workshop', cascade='all, delete-orphan')
   user_trace_orders = relationship('UserTraceOrderDB', back_populates='workshop', cascade='all, delete-orphan')
   user_discovery_completions = relationship('UserDiscoveryCompletionDB', back_populates='workshop', cascade='all, delete-orphan')
+  trace_payloads = relationship('TracePayloadDB', back_populates='workshop', cascade='all, delete-orphan')
+  judge_result_cache = relationship('JudgeResultCacheDB', back_populates='workshop', cascade='all, delete-orphan')
+  judge_evaluation_runs = relationship('JudgeEvaluationRunDB', back_populates='workshop', cascade='all, delete-orphan')
+  judge_outputs = relationship('JudgeOutputDB', back_populates='workshop', cascade='all, delete-orphan')
+  judge_call_telemetry = relationship('JudgeCallTelemetryDB', back_populates='workshop', cascade='all, delete-orphan')
+  trace_import_jobs = relationship('TraceImportJobDB', back_populates='workshop', cascade='all, delete-orphan')
 
 
 class TraceDB(Base):
@@ -163,13 +172,31 @@ class TraceDB(Base):
   mlflow_url = Column(String, nullable=True)  # Optional MLflow URL
   mlflow_host = Column(String, nullable=True)  # Optional MLflow host
   mlflow_experiment_id = Column(String, nullable=True)  # Optional MLflow experiment ID
+  token_estimate = Column(Integer, nullable=True)  # Estimated input + output tokens, set at ingestion
   created_at = Column(DateTime, default=func.now())
 
   # Relationships
   workshop = relationship('WorkshopDB', back_populates='traces')
   findings = relationship('DiscoveryFindingDB', back_populates='trace')
   annotations = relationship('AnnotationDB', back_populates='trace')
-  judge_evaluations = relationship('JudgeEvaluationDB', back_populates='trace')
+
+
+class TracePayloadDB(Base):
+  """Database model for span payloads moved out of trace context (overflow store)."""
+
+  __tablename__ = 'trace_payloads'
+  # One row per payload and workshop; concurrent imports of the same payload insert it once
+  __table_args__ = (Index('uq_trace_payloads_workshop_hash', 'workshop_id', 'content_hash', unique=True),)
+
+  id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+  workshop_id = Column(String, ForeignKey('workshops.id', ondelete='CASCADE'), nullable=False, index=True)
+  content_hash = Column(String, nullable=False, index=True)  # sha256 of the serialized payload
+  payload = Column(Text, nullable=False)  # Serialized JSON, only decoded when requested
+  size_bytes = Column(Integer, nullable=False)
+  created_at = Column(DateTime, default=func.now())
+
+  # Relationships
+  workshop = relationship('WorkshopDB', back_populates='trace_payloads')
 
 
 class DiscoveryFindingDB(Base):
@@ -238,6 +265,28 @@ class AnnotationDB(Base):
   trace = relationship('TraceDB', back_populates='annotations')
 
 
+class TraceConsensusDB(Base):
+  """Database model for the consensus human rating of a trace for one question.
+
+  Maintained from the trace's annotations on every annotation write.
+  """
+
+  __tablename__ = 'trace_consensus'
+  __table_args__ = (Index('ix_trace_consensus_workshop_question', 'workshop_id', 'question_id'),)
+
+  trace_id = Column(String, ForeignKey('traces.id', ondelete='CASCADE'), primary_key=True)
+  question_id = Column(String, primary_key=True)  # Rubric question ID, or 'overall' for the single rating
+  workshop_id = Column(String, ForeignKey('workshops.id', ondelete='CASCADE'), nullable=False)
+  mode = Column(Integer, nullable=False)  # Most common rating, ties to the rating given first
+  count = Column(Integer, nullable=False)  # Number of ratings
+  distribution = Column(JSON, nullable=False)  # {rating: number of annotators}
+  agreement = Column(Float, nullable=False)  # Share of annotators who gave the mode
+  updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+  # Relationships
+  workshop = relationship('WorkshopDB', back_populates='trace_consensus')
+
+
 class MLflowIntakeConfigDB(Base):
   """Database model for MLflow intake configuration."""
 
@@ -249,6 +298,7 @@ class MLflowIntakeConfigDB(Base):
   experiment_id = Column(String, nullable=False)
   max_traces = Column(Integer, default=100)
   filter_string = Column(Text, nullable=True)
+  span_compaction = Column(JSON, nullable=True)  # SpanCompactionConfig as a dict
   is_ingested = Column(Boolean, default=False)
   trace_count = Column(Integer, default=0)
   last_ingestion_time = Column(DateTime, nullable=True)
@@ -278,28 +328,143 @@ class JudgePromptDB(Base):
 
   # Relationships
   workshop = relationship('WorkshopDB', back_populates='judge_prompts')
-  evaluations = relationship('JudgeEvaluationDB', back_populates='prompt', cascade='all, delete-orphan')
 
 
-class JudgeEvaluationDB(Base):
-  """Database model for judge evaluations."""
+class JudgeResultCacheDB(Base):
+  """Database model for cached judge outputs, keyed by a hash of everything that affects them."""
 
-  __tablename__ = 'judge_evaluations'
+  __tablename__ = 'judge_result_cache'
 
-  id = Column(String, primary_key=True)
-  workshop_id = Column(String, ForeignKey('workshops.id'), nullable=False)
-  prompt_id = Column(String, ForeignKey('judge_prompts.id'), nullable=False)
-  trace_id = Column(String, ForeignKey('traces.id'), nullable=False)
+  id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+  workshop_id = Column(String, ForeignKey('workshops.id', ondelete='CASCADE'), nullable=False, index=True)
+  cache_key = Column(String, nullable=False, index=True)  # sha256 of prompt, model, parameters and trace content
+  model_name = Column(String, nullable=False)
+  predicted_rating = Column(Integer, nullable=False)
+  reasoning = Column(Text, nullable=True)
+  hit_count = Column(Integer, default=0)
+  created_at = Column(DateTime, default=func.now())
+  last_used_at = Column(DateTime, default=func.now(), index=True)
+
+  # Relationships
+  workshop = relationship('WorkshopDB', back_populates='judge_result_cache')
+
+
+class JudgeEvaluationRunDB(Base):
+  """Database model for a judge evaluation run and its manifest of traces to score.
+
+  Runs are append-only history: every run keeps its own results, so any two runs can
+  be compared without re-running the judge.
+  """
+
+  __tablename__ = 'judge_evaluation_runs'
+  # Run numbers are allocated as MAX + 1; the constraint makes a concurrent duplicate retry
+  __table_args__ = (UniqueConstraint('prompt_id', 'run_number', name='uq_judge_evaluation_runs_prompt_run'),)
+
+  id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+  workshop_id = Column(String, ForeignKey('workshops.id', ondelete='CASCADE'), nullable=False, index=True)
+  prompt_id = Column(String, ForeignKey('judge_prompts.id', ondelete='CASCADE'), nullable=False, index=True)
+  run_number = Column(Integer, nullable=False)  # 1, 2, ... per prompt, in start order
+  status = Column(String, nullable=False, default='running')  # running, completed or failed
+  trace_ids = Column(JSON, nullable=False, default=list)  # Manifest of every trace the run scores
+  options = Column(JSON, nullable=True)  # Evaluation request options, reused on resume
+  completed_traces = Column(Integer, default=0)
+  failed_traces = Column(Integer, default=0)
+  metrics = Column(JSON, nullable=True)  # Performance metrics, set when the run completes
+  error = Column(Text, nullable=True)
+  created_at = Column(DateTime, default=func.now())
+  updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+  # Relationships
+  workshop = relationship('WorkshopDB', back_populates='judge_evaluation_runs')
+  results = relationship('JudgeRunResultDB', back_populates='run', cascade='all, delete-orphan', passive_deletes=True)
+
+
+class JudgeRunResultDB(Base):
+  """Database model for the judge result of one trace in an evaluation run."""
+
+  __tablename__ = 'judge_run_results'
+
+  run_id = Column(String, ForeignKey('judge_evaluation_runs.id', ondelete='CASCADE'), primary_key=True)
+  trace_id = Column(String, primary_key=True)
+  evaluation_id = Column(String, nullable=False)
   predicted_rating = Column(Integer, nullable=False)
   human_rating = Column(Integer, nullable=False)
   confidence = Column(Float, nullable=True)
-  reasoning = Column(Text, nullable=True)
+  output_id = Column(String, ForeignKey('judge_outputs.id'), nullable=True)  # Deduplicated reasoning text
+
+  # Relationships
+  run = relationship('JudgeEvaluationRunDB', back_populates='results')
+
+
+def judge_output_id(workshop_id: str, text: str) -> str:
+  """Content key of a judge output; identical outputs within a workshop share one row."""
+  return hashlib.sha256(f'{workshop_id}\0{text}'.encode()).hexdigest()
+
+
+class JudgeOutputDB(Base):
+  """Database model for judge reasoning text, stored once however many runs produced it."""
+
+  __tablename__ = 'judge_outputs'
+
+  id = Column(String, primary_key=True)  # judge_output_id(workshop_id, text)
+  workshop_id = Column(String, ForeignKey('workshops.id', ondelete='CASCADE'), nullable=False, index=True)
+  text = Column(Text, nullable=False)
+
+  # Relationships
+  workshop = relationship('WorkshopDB', back_populates='judge_outputs')
+
+
+class JudgeCallTelemetryDB(Base):
+  """Database model for latency, token and retry telemetry of one judge model call."""
+
+  __tablename__ = 'judge_call_telemetry'
+
+  id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+  workshop_id = Column(String, ForeignKey('workshops.id', ondelete='CASCADE'), nullable=False, index=True)
+  prompt_id = Column(String, nullable=True, index=True)  # Kept after the prompt is deleted
+  prompt_version = Column(Integer, nullable=True)
+  run_id = Column(String, nullable=True, index=True)  # Evaluation run, if the call was part of one
+  trace_id = Column(String, nullable=True)  # First trace of a packed call
+  endpoint = Column(String, nullable=False)
+  traces = Column(Integer, default=1)  # Traces judged by the call (more than one when packed)
+  status = Column(String, nullable=False)  # succeeded or failed
+  retries = Column(Integer, default=0)  # Throttled attempts that were retried
+  latency_ms = Column(Float, nullable=False)  # Wall time including queue wait and retries
+  queue_wait_ms = Column(Float, default=0.0)  # Time spent waiting for the endpoint scheduler
+  prompt_tokens = Column(Integer, nullable=True)
+  completion_tokens = Column(Integer, nullable=True)
+  tokens_estimated = Column(Boolean, default=False)  # Token counts estimated because the backend reports none
+  error = Column(Text, nullable=True)
   created_at = Column(DateTime, default=func.now())
 
   # Relationships
-  workshop = relationship('WorkshopDB', back_populates='judge_evaluations')
-  prompt = relationship('JudgePromptDB', back_populates='evaluations')
-  trace = relationship('TraceDB', back_populates='judge_evaluations')
+  workshop = relationship('WorkshopDB', back_populates='judge_call_telemetry')
+
+
+class TraceImportJobDB(Base):
+  """Database model for the progress of an offline trace import.
+
+  Jobs live in the database so any server worker can report on an import another
+  worker runs, and finished jobs survive restarts.
+  """
+
+  __tablename__ = 'trace_import_jobs'
+
+  id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+  workshop_id = Column(String, ForeignKey('workshops.id', ondelete='CASCADE'), nullable=False, index=True)
+  source = Column(String, nullable=False)  # Import path or uploaded file name
+  file_format = Column(String, nullable=False)  # jsonl or parquet
+  status = Column(String, nullable=False, default='pending')  # pending, running, completed or failed
+  records_read = Column(Integer, default=0)
+  traces_imported = Column(Integer, default=0)
+  records_skipped = Column(Integer, default=0)
+  errors = Column(JSON, nullable=False, default=list)  # At most MAX_JOB_ERRORS messages
+  started_at = Column(DateTime, nullable=True)
+  finished_at = Column(DateTime, nullable=True)
+  created_at = Column(DateTime, default=func.now())
+
+  # Relationships
+  workshop = relationship('WorkshopDB', back_populates='trace_import_jobs')
 
 
 class UserTraceOrderDB(Base):
@@ -377,11 +542,146 @@ def create_tables():
         # Column already exists or table doesn't exist yet
         print(f'ℹ️ annotations schema update skipped (ratings column may already exist): {e}')
 
+      try:
+        # Add span compaction settings to MLflow intake config
+        conn.execute(text('ALTER TABLE mlflow_intake_config ADD COLUMN span_compaction JSON'))
+        conn.commit()
+        print('✅ Database schema updated for mlflow_intake_config (added span_compaction column)')
+      except Exception as e:
+        print(f'ℹ️ mlflow_intake_config schema update skipped (span_compaction column may already exist): {e}')
+
+      try:
+        # Add token estimates used to pack short traces into one judge call
+        conn.execute(text('ALTER TABLE traces ADD COLUMN token_estimate INTEGER'))
+        conn.commit()
+        print('✅ Database schema updated for traces (added token_estimate column)')
+      except Exception as e:
+        print(f'ℹ️ traces schema update skipped (token_estimate column may already exist): {e}')
+
+      try:
+        _dedupe_trace_payloads(conn)
+      except Exception as e:
+        conn.rollback()
+        print(f'ℹ️ trace_payloads unique index skipped: {e}')
+
+      try:
+        _backfill_trace_consensus(conn)
+      except Exception as e:
+        conn.rollback()
+        print(f'ℹ️ trace_consensus backfill skipped: {e}')
+
+      try:
+        _migrate_legacy_judge_evaluations(conn)
+      except Exception as e:
+        conn.rollback()
+        print(f'ℹ️ legacy judge_evaluations migration skipped: {e}')
+
   except Exception as e:
     print(f'❌ Error creating database tables: {e}')
     raise e
 
 
+def _dedupe_trace_payloads(conn) -> None:
+  """Drop duplicate overflow payloads and add the unique index for databases created without it.
+
+  Duplicates of a payload have the same content, so any one of them can be kept.
+  """
+  from sqlalchemy import text
+
+  deleted = conn.execute(
+    text('DELETE FROM trace_payloads WHERE id NOT IN (SELECT MIN(id) FROM trace_payloads GROUP BY workshop_id, content_hash)')
+  ).rowcount
+  conn.execute(text('CREATE UNIQUE INDEX IF NOT EXISTS uq_trace_payloads_workshop_hash ON trace_payloads (workshop_id, content_hash)'))
+  conn.commit()
+  if deleted:
+    print(f'✅ Removed {deleted} duplicate trace payloads')
+
+
+def _backfill_trace_consensus(conn) -> None:
+  """Compute consensus rows for databases created before the table existed."""
+  from sqlalchemy import text
+
+  from server.services.trace_consensus import consensus_rows
+
+  if conn.execute(text('SELECT 1 FROM trace_consensus LIMIT 1')).first() is not None:
+    return
+
+  annotations_by_trace = {}
+  rows = conn.execute(AnnotationDB.__table__.select().order_by(AnnotationDB.created_at, AnnotationDB.id))
+  for row in rows:
+    annotations_by_trace.setdefault((row.workshop_id, row.trace_id), []).append((row.rating, row.ratings))
+  if not annotations_by_trace:
+    return
+
+  consensus = [row for (workshop_id, trace_id), annotations in annotations_by_trace.items() for row in consensus_rows(workshop_id, trace_id, annotations)]
+  conn.execute(TraceConsensusDB.__table__.insert(), consensus)
+  conn.commit()
+  print(f'✅ Computed consensus ratings for {len(annotations_by_trace)} annotated traces')
+
+
+def _migrate_legacy_judge_evaluations(conn) -> None:
+  """Move rows of the old delete-and-replace ``judge_evaluations`` table into run history.
+
+  Each prompt's stored evaluations become one completed run.
+  """
+  from sqlalchemy import text
+
+  rows = conn.execute(
+    text('SELECT id, workshop_id, prompt_id, trace_id, predicted_rating, human_rating, confidence, reasoning FROM judge_evaluations')
+  ).fetchall()
+  if not rows:
+    return
+
+  by_prompt = {}
+  for row in rows:
+    by_prompt.setdefault((row.workshop_id, row.prompt_id), []).append(row)
+
+  for (workshop_id, prompt_id), prompt_rows in by_prompt.items():
+    prompt_rows = list({row.trace_id: row for row in prompt_rows}.values())
+    run_id = str(uuid.uuid4())
+    previous = conn.execute(text('SELECT MAX(run_number) FROM judge_evaluation_runs WHERE prompt_id = :prompt_id'), {'prompt_id': prompt_id}).scalar()
+    conn.execute(
+      JudgeEvaluationRunDB.__table__.insert(),
+      {
+        'id': run_id,
+        'workshop_id': workshop_id,
+        'prompt_id': prompt_id,
+        'run_number': (previous or 0) + 1,
+        'status': 'completed',
+        'trace_ids': [row.trace_id for row in prompt_rows],
+        'options': {},
+        'completed_traces': len(prompt_rows),
+        'failed_traces': 0,
+      },
+    )
+    outputs = {judge_output_id(workshop_id, row.reasoning): row.reasoning for row in prompt_rows if row.reasoning is not None}
+    existing = {
+      output_id for (output_id,) in conn.execute(JudgeOutputDB.__table__.select().with_only_columns(JudgeOutputDB.id).where(JudgeOutputDB.id.in_(outputs)))
+    }
+    new_outputs = [{'id': output_id, 'workshop_id': workshop_id, 'text': output} for output_id, output in outputs.items() if output_id not in existing]
+    if new_outputs:
+      conn.execute(JudgeOutputDB.__table__.insert(), new_outputs)
+    conn.execute(
+      JudgeRunResultDB.__table__.insert(),
+      [
+        {
+          'run_id': run_id,
+          'trace_id': row.trace_id,
+          'evaluation_id': row.id,
+          'predicted_rating': row.predicted_rating,
+          'human_rating': row.human_rating,
+          'confidence': row.confidence,
+          'output_id': judge_output_id(workshop_id, row.reasoning) if row.reasoning is not None else None,
+        }
+        for row in prompt_rows
+      ],
+    )
+
+  conn.execute(text('DELETE FROM judge_evaluations'))
+  conn.commit()
+  print(f'✅ Moved {len(rows)} legacy judge evaluations into evaluation run history')
+
+
 def drop_tables():
   """Drop all database tables."""
   Base.metadata.drop_all(bind=engine)
@@ -0,0 +1,242 @@
+"""Local stand-in for a model serving endpoint, for measuring the judge pipeline offline.
+
+It serves the OpenAI-compatible chat completions routes the judge backends call:
+``/chat/completions`` for ``JUDGE_SERVING_BASE_URL``, plus ``/serving-endpoints/chat/completions``
+and ``/serving-endpoints/<name>/invocations`` as exposed under a Databricks workspace.
+Each reply is delayed by a configurable latency distribution. Requests can be throttled
+with 429s, at random or above a concurrency limit. Scores are derived from a hash of
+the judged text, so the same request always gets the same score. Packed prompts get
+one score per item.
+
+Usage: python -m server.fake_serving_endpoint [--port 8900] [--latency lognormal:200:0.5] [--throttle-rate 0.02]
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+import click
+
+from server.services.packed_judge import estimate_tokens
+
+# An item block of a packed prompt, up to the next item or the closing answer instructions
+_PACKED_ITEM = re.compile(r'^### Item (\S+)\n(.*?)(?=^### Item |\n\nRespond with only|\Z)', re.MULTILINE | re.DOTALL)
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+  """Response latency in milliseconds: ``fixed:MS``, ``uniform:LOW:HIGH`` or ``lognormal:MEDIAN:SIGMA``."""
+
+  kind: str
+  params: Tuple[float, ...]
+
+  @classmethod
+  def parse(cls, spec: str) -> 'LatencyDistribution':
+    """Parse a latency spec such as ``lognormal:200:0.5``.
+
+    Raises:
+        ValueError: If the spec is not one of the supported distributions
+    """
+    kind, *values = spec.split(':')
+    expected = {'fixed': 1, 'uniform': 2, 'lognormal': 2}
+    if kind not in expected or len(values) != expected[kind]:
+      raise ValueError(f'Unsupported latency spec {spec!r}, expected fixed:MS, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA')
+    return cls(kind, tuple(float(value) for value in values))
+
+  def sample(self, rng: random.Random) -> float:
+    """Draw one latency in seconds."""
+    if self.kind == 'fixed':
+      milliseconds = self.params[0]
+    elif self.kind == 'uniform':
+      milliseconds = rng.uniform(*self.params)
+    else:
+      median, sigma = self.params
+      milliseconds = rng.lognormvariate(math.log(median), sigma)
+    return max(milliseconds, 0.0) / 1000
+
+
+@dataclass
+class FakeServingConfig:
+  """Behaviour of the fake serving endpoint."""
+
+  latency: LatencyDistribution = field(default_factory=lambda: LatencyDistribution('fixed', (50.0,)))
+  throttle_rate: float = 0.0  # Share of requests answered with 429 at random
+  max_concurrency: int = 0  # Requests in flight above this get 429 (0 for no limit)
+  score: Optional[int] = None  # Fixed score, or None for a hash of the judged text
+  seed: int = 0
+
+
+def deterministic_score(text: str, low: int = 1, high: int = 5) -> int:
+  """Score in ``[low, high]`` derived from a hash of the text."""
+  digest = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+  return low + digest % (high - low + 1)
+
+
+class _Server(ThreadingHTTPServer):
+  daemon_threads = True
+  # The default listen backlog of 5 drops connections under concurrent judge workers
+  request_queue_size = 1024
+
+
+class FakeServingEndpoint:
+  """Threaded HTTP server answering chat completions like a judge model would."""
+
+  def __init__(self, config: Optional[FakeServingConfig] = None, host: str = '127.0.0.1', port: int = 0):
+    self.config = config or FakeServingConfig()
+    self._rng = random.Random(self.config.seed)
+    self._lock = threading.Lock()
+    self._in_flight = 0
+    self.stats: Dict[str, int] = {'requests': 0, 'throttled': 0, 'completed': 0}
+    self._server = _Server((host, port), self._handler_class())
+    self._thread: Optional[threading.Thread] = None
+
+  @property
+  def base_url(self) -> str:
+    """Base URL to use as ``JUDGE_SERVING_BASE_URL``."""
+    host, port = self._server.server_address[:2]
+    return f'http://{host}:{port}'
+
+  def start(self) -> 'FakeServingEndpoint':
+    """Serve from a background thread."""
+    self._thread = threading.Thread(target=self._server.serve_forever, name='fake-serving-endpoint', daemon=True)
+    self._thread.start()
+    return self
+
+  def serve_forever(self) -> None:
+    """Serve from the calling thread until interrupted."""
+    try:
+      self._server.serve_forever()
+    finally:
+      self._server.server_close()
+
+  def stop(self) -> None:
+    self._server.shutdown()
+    self._server.server_close()
+
+  def __enter__(self) -> 'FakeServingEndpoint':
+    return self.start()
+
+  def __exit__(self, *exc_info: Any) -> None:
+    self.stop()
+
+  def reply(self, content: str) -> str:
+    """The judge reply to a prompt: one JSON object per packed item, or a single score."""
+    items = _PACKED_ITEM.findall(content)
+    if items:
+      return json.dumps({item_id: {'score': self._score(block), 'justification': 'Fake judge rationale.'} for item_id, block in items})
+    return json.dumps({'score': self._score(content), 'justification': 'Fake judge rationale.'})
+
+  def _score(self, text: str) -> int:
+    return self.config.score if self.config.score is not None else deterministic_score(text)
+
+  def _admit(self) -> Tuple[bool, float]:
+    """Count a request in; returns whether it is throttled and its latency."""
+    with self._lock:
+      self.stats['requests'] += 1
+      throttled = self._rng.random() < self.config.throttle_rate or (
+        self.config.max_concurrency > 0 and self._in_flight >= self.config.max_concurrency
+      )
+      if throttled:
+        self.stats['throttled'] += 1
+        return True, 0.0
+      self._in_flight += 1
+      return False, self.config.latency.sample(self._rng)
+
+  def _finish(self) -> None:
+    with self._lock:
+      self._in_flight -= 1
+      self.stats['completed'] += 1
+
+  def _handler_class(self):
+    endpoint = self
+
+    class Handler(BaseHTTPRequestHandler):
+      protocol_version = 'HTTP/1.1'
+      # Headers and body are written separately; without TCP_NODELAY keep-alive replies stall on delayed ACKs
+      disable_nagle_algorithm = True
+
+      def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+      def _send(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+      def do_POST(self) -> None:
+        path = self.path.split('?')[0].rstrip('/')
+        is_chat_route = path.endswith('/chat/completions') or (path.startswith('/serving-endpoints/') and path.endswith('/invocations'))
+        payload = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not is_chat_route:
+          self._send(404, {'error_code': 'ENDPOINT_NOT_FOUND', 'message': f'No route for {path}'})
+          return
+        try:
+          request = json.loads(payload or b'{}')
+          messages = request['messages']
+          content = '\n'.join(str(message.get('content', '')) for message in messages)
+        except (ValueError, KeyError, TypeError, AttributeError):
+          self._send(400, {'error_code': 'BAD_REQUEST', 'message': 'Expected a chat completion request with messages'})
+          return
+
+        throttled, latency = endpoint._admit()
+        if throttled:
+          self._send(429, {'error_code': 'REQUEST_LIMIT_EXCEEDED', 'message': 'Exceeded rate limit'})
+          return
+        try:
+          time.sleep(latency)
+          reply = endpoint.reply(content)
+        finally:
+          endpoint._finish()
+
+        model = request.get('model') or path.split('/')[-2]
+        self._send(
+          200,
+          {
+            'id': f'chatcmpl-{hashlib.sha256(payload).hexdigest()[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply}, 'finish_reason': 'stop'}],
+            'usage': {
+              'prompt_tokens': estimate_tokens(content),
+              'completion_tokens': estimate_tokens(reply),
+              'total_tokens': estimate_tokens(content) + estimate_tokens(reply),
+            },
+          },
+        )
+
+    return Handler
+
+
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8900, show_default=True)
+@click.option('--latency', default='lognormal:200:0.5', show_default=True, help='fixed:MS, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA')
+@click.option('--throttle-rate', default=0.0, show_default=True, help='Share of requests answered with 429')
+@click.option('--max-concurrency', default=0, show_default=True, help='Answer 429 above this many requests in flight (0 for no limit)')
+@click.option('--score', type=int, default=None, help='Fixed score for every reply (default: hash of the judged text)')
+@click.option('--seed', default=0, show_default=True)
+def main(host: str, port: int, latency: str, throttle_rate: float, max_concurrency: int, score: Optional[int], seed: int) -> None:
+  """Run the fake serving endpoint until interrupted."""
+  config = FakeServingConfig(LatencyDistribution.parse(latency), throttle_rate, max_concurrency, score, seed)
+  endpoint = FakeServingEndpoint(config, host, port)
+  print(f'Fake serving endpoint on {endpoint.base_url} (set JUDGE_SERVING_BASE_URL={endpoint.base_url})')
+  try:
+    endpoint.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  print(f'Served {endpoint.stats}')
+
+
+if __name__ == '__main__':
+  main()
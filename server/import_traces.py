@@ -0,0 +1,45 @@
+"""Import MLflow trace exports (JSONL / Parquet) into a workshop without a running server."""
+
+from pathlib import Path
+from typing import Optional
+
+import click
+
+
+@click.command()
+@click.argument('workshop_id')
+@click.argument('export_file', type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('--format', 'file_format', type=click.Choice(['jsonl', 'parquet']), default=None, help='Export format (inferred by default)')
+@click.option('--chunk-size', default=500, show_default=True, help='Traces inserted per transaction')
+@click.option('--include-existing', is_flag=True, help='Import traces whose MLflow trace ID already exists in the workshop')
+def main(workshop_id: str, export_file: Path, file_format: Optional[str], chunk_size: int, include_existing: bool) -> None:
+  """Stream EXPORT_FILE into the workshop WORKSHOP_ID."""
+  from server.database import SessionLocal, create_tables
+  from server.services.database_service import DatabaseService
+  from server.services.trace_import_service import TraceImportService
+
+  create_tables()
+  db = SessionLocal()
+  try:
+    db_service = DatabaseService(db)
+    if not db_service.get_workshop(workshop_id):
+      raise click.ClickException(f'Workshop {workshop_id} not found')
+
+    def report(counters: dict) -> None:
+      print(f'  read={counters["records_read"]} imported={counters["traces_imported"]} skipped={counters["records_skipped"]}')
+
+    counters = TraceImportService(db_service).import_file(
+      workshop_id,
+      export_file,
+      file_format=file_format,
+      chunk_size=chunk_size,
+      skip_existing=not include_existing,
+      progress_callback=report,
+    )
+    print(f'Imported {counters["traces_imported"]} traces ({counters["records_skipped"]} skipped) from {export_file}')
+  finally:
+    db.close()
+
+
+if __name__ == '__main__':
+  main()
@@ -4,7 +4,7 @@
 
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -25,6 +25,13 @@ class WorkshopPhase(str, Enum):
   UNITY_VOLUME = 'unity_volume'
 
 
+class GroundTruthMethod(str, Enum):
+  """How human ratings of a trace are combined into the ground truth for judge evaluation."""
+
+  MODE = 'mode'  # Most common rating, every annotator weighted equally
+  DAWID_SKENE = 'dawid_skene'  # Most probable rating under per-rater confusion matrices fitted by EM
+
+
 class UserRole(str, Enum):
   FACILITATOR = 'facilitator'
   SME = 'sme'  # Subject Matter Expert
@@ -172,6 +179,7 @@ class Trace(BaseModel):
   mlflow_url: Optional[str] = None
   mlflow_host: Optional[str] = None
   mlflow_experiment_id: Optional[str] = None
+  token_estimate: Optional[int] = None  # Estimated input + output tokens
   created_at: datetime = Field(default_factory=datetime.now)
 
 
@@ -223,6 +231,19 @@ class Annotation(BaseModel):
   created_at: datetime = Field(default_factory=datetime.now)
 
 
+class TraceConsensus(BaseModel):
+  """Consensus human rating of a trace for one question, maintained on every annotation write."""
+
+  workshop_id: str
+  trace_id: str
+  question_id: str = Field(description="Rubric question ID, or 'overall' for the single rating")
+  mode: int = Field(description='Most common rating; ties go to the rating given first')
+  count: int = Field(description='Number of ratings')
+  distribution: Dict[str, int] = Field(default_factory=dict, description='Number of annotators per rating')
+  agreement: float = Field(description='Share of annotators who gave the mode')
+  updated_at: Optional[datetime] = None
+
+
 class IRRResult(BaseModel):
   workshop_id: str
   score: float
@@ -236,6 +257,15 @@ class IRRResult(BaseModel):
 
 
 # MLflow Intake Models
+class SpanCompactionConfig(BaseModel):
+  """Budget and compaction settings for span data stored in trace context."""
+
+  mode: Literal['full', 'metadata_only'] = Field('full', description="Span storage mode: 'full' keeps payloads within budget, 'metadata_only' keeps names, types and timings")
+  max_span_bytes: Optional[int] = Field(16384, description='Inline budget per span payload; larger payloads go to the overflow store')
+  max_trace_bytes: Optional[int] = Field(262144, description='Inline budget for all span payloads of one trace')
+  deduplicate: bool = Field(True, description='Store payloads repeated across spans once in the overflow store')
+
+
 class MLflowIntakeConfig(BaseModel):
   """Configuration for MLflow trace intake."""
 
@@ -244,6 +274,7 @@ class MLflowIntakeConfig(BaseModel):
   experiment_id: str = Field(..., description='MLflow experiment ID to pull traces from')
   max_traces: Optional[int] = Field(100, description='Maximum number of traces to pull')
   filter_string: Optional[str] = Field(None, description='Optional filter string for traces')
+  span_compaction: Optional[SpanCompactionConfig] = Field(None, description='Span budget and compaction settings')
 
 
 class MLflowIntakeConfigCreate(BaseModel):
@@ -254,6 +285,7 @@ class MLflowIntakeConfigCreate(BaseModel):
   experiment_id: str = Field(..., description='MLflow experiment ID to pull traces from')
   max_traces: Optional[int] = Field(100, description='Maximum number of traces to pull')
   filter_string: Optional[str] = Field(None, description='Optional filter string for traces')
+  span_compaction: Optional[SpanCompactionConfig] = Field(None, description='Span budget and compaction settings')
 
 
 class MLflowIntakeStatus(BaseModel):
@@ -281,6 +313,42 @@ class MLflowTraceInfo(BaseModel):
   mlflow_url: Optional[str] = None
 
 
+class MLflowTracePreviewPage(BaseModel):
+  """A page of MLflow trace previews."""
+
+  traces: List[MLflowTraceInfo]
+  total: int
+  page: int
+  page_size: int
+  has_more: bool
+  cached: bool = Field(False, description='Whether the previews were served from the preview cache')
+
+
+class TraceImportRequest(BaseModel):
+  """Request model for importing an MLflow trace export from local disk."""
+
+  path: str = Field(..., description='Path of a JSONL or Parquet export, relative to the server import directory')
+  file_format: Optional[str] = Field(None, description="'jsonl' or 'parquet'; inferred from the file extension when omitted")
+  chunk_size: int = Field(500, gt=0, le=10000, description='Number of traces inserted per database transaction')
+  skip_existing: bool = Field(True, description='Skip traces whose MLflow trace ID already exists in the workshop')
+
+
+class TraceImportJob(BaseModel):
+  """Progress of an offline trace import."""
+
+  id: str
+  workshop_id: str
+  source: str
+  file_format: str
+  status: str = 'pending'  # pending, running, completed, failed
+  records_read: int = 0
+  traces_imported: int = 0
+  records_skipped: int = 0
+  errors: List[str] = Field(default_factory=list)
+  started_at: Optional[datetime] = None
+  finished_at: Optional[datetime] = None
+
+
 # Judge Tuning Models
 class JudgePromptCreate(BaseModel):
   """Request model for creating a judge prompt."""
@@ -325,6 +393,12 @@ class JudgeEvaluationRequest(BaseModel):
   prompt_id: str
   trace_ids: Optional[List[str]] = Field(None, description='Specific traces to evaluate, or None for all')
   override_model: Optional[str] = Field(None, description="Override model selection from UI (e.g., 'demo' to force simulation)")
+  max_concurrency: Optional[int] = Field(None, ge=1, le=64, description='Traces evaluated in parallel (server default if None)')
+  fail_fast: bool = Field(True, description='Abort on the first failed trace instead of collecting errors')
+  batch: bool = Field(False, description='Score all traces in a single MLflow evaluation run instead of one run per trace')
+  bypass_cache: bool = Field(False, description='Re-score every trace instead of reusing cached judge outputs')
+  packed: bool = Field(False, description='Judge several short traces per model call (serving:* and databricks-* models)')
+  ground_truth: GroundTruthMethod = Field(GroundTruthMethod.MODE, description="How annotators' ratings are combined into ground truth")
 
 
 class JudgeEvaluationDirectRequest(BaseModel):
@@ -334,6 +408,19 @@ class JudgeEvaluationDirectRequest(BaseModel):
   model_name: str = 'demo'
   model_parameters: Optional[Dict[str, Any]] = None
   trace_ids: Optional[List[str]] = Field(None, description='Specific traces to evaluate, or None for all')
+  max_concurrency: Optional[int] = Field(None, ge=1, le=64, description='Traces evaluated in parallel (server default if None)')
+  fail_fast: bool = Field(True, description='Abort on the first failed trace instead of collecting errors')
+  batch: bool = Field(False, description='Score all traces in a single MLflow evaluation run instead of one run per trace')
+  bypass_cache: bool = Field(False, description='Re-score every trace instead of reusing cached judge outputs')
+  ground_truth: GroundTruthMethod = Field(GroundTruthMethod.MODE, description="How annotators' ratings are combined into ground truth")
+
+
+class JudgeMetricInterval(BaseModel):
+  """Point estimate and confidence interval of a judge metric."""
+
+  estimate: float
+  lower: float
+  upper: float
 
 
 class JudgePerformanceMetrics(BaseModel):
@@ -346,6 +433,70 @@ class JudgePerformanceMetrics(BaseModel):
   agreement_by_rating: Dict[str, float]
   confusion_matrix: List[List[int]]
   total_evaluations: int
+  weighted_kappa: Optional[float] = Field(None, description='Quadratic-weighted kappa, which credits near misses on ordinal scales')
+  rating_labels: List[int] = Field(default_factory=lambda: [1, 2, 3, 4, 5], description='Rating of each confusion matrix row/column')
+  precision_by_rating: Dict[str, Optional[float]] = Field(default_factory=dict, description='None where the judge never gave the rating')
+  recall_by_rating: Dict[str, Optional[float]] = Field(default_factory=dict, description='None where humans never gave the rating')
+  confidence_intervals: Dict[str, JudgeMetricInterval] = Field(
+    default_factory=dict, description='Bootstrap intervals for accuracy, kappa and weighted_kappa'
+  )
+  evaluation_errors: Dict[str, str] = Field(default_factory=dict, description='Error per trace ID for traces that failed to evaluate')
+  run_id: Optional[str] = Field(None, description='Evaluation run that produced these metrics')
+
+
+class JudgeEvaluationRun(BaseModel):
+  """A checkpointed judge evaluation run, kept in the prompt's evaluation history."""
+
+  id: str
+  workshop_id: str
+  prompt_id: str
+  run_number: Optional[int] = Field(None, description='1, 2, ... per prompt, in start order')
+  status: str = Field(description='running, completed or failed')
+  trace_ids: List[str] = Field(default_factory=list, description='Manifest of every trace the run scores')
+  options: Dict[str, Any] = Field(default_factory=dict, description='Evaluation request options reused on resume')
+  total_traces: int = 0
+  completed_traces: int = 0
+  failed_traces: int = 0
+  metrics: Optional[JudgePerformanceMetrics] = Field(None, description='Set when the run completes')
+  error: Optional[str] = None
+  created_at: Optional[datetime] = None
+  updated_at: Optional[datetime] = None
+
+
+class JudgeRunDiffItem(BaseModel):
+  """A trace whose judge rating differs between two evaluation runs."""
+
+  trace_id: str
+  human_rating: int = Field(description='Human rating at the time of the compared run')
+  base_rating: int
+  compare_rating: int
+  base_reasoning: Optional[str] = None
+  compare_reasoning: Optional[str] = None
+
+
+class JudgeRunDiff(BaseModel):
+  """Per-trace differences between two judge evaluation runs."""
+
+  base_run_id: str
+  compare_run_id: str
+  common_traces: int = Field(description='Traces scored by both runs')
+  changed_traces: int
+  improved_traces: int = Field(description='Now matching the human rating, previously not')
+  regressed_traces: int = Field(description='Previously matching the human rating, now not')
+  changes: List[JudgeRunDiffItem] = Field(default_factory=list)
+  only_in_base: List[str] = Field(default_factory=list)
+  only_in_compare: List[str] = Field(default_factory=list)
+
+
+class JudgeCacheStats(BaseModel):
+  """Judge result cache statistics for a workshop."""
+
+  workshop_id: str
+  entries: int
+  max_entries: int
+  hits: int = Field(0, description='Cache hits since server start')
+  misses: int = Field(0, description='Cache misses since server start')
+  hit_rate: Optional[float] = None
 
 
 class JudgeEvaluationResult(BaseModel):
@@ -355,6 +506,153 @@ class JudgeEvaluationResult(BaseModel):
   evaluations: List[JudgeEvaluation]
 
 
+class JudgeRubricEvaluationRequest(BaseModel):
+  """Request model for judging every rubric question with one model call per trace."""
+
+  prompt_text: str
+  model_name: str = 'demo'
+  model_parameters: Optional[Dict[str, Any]] = None
+  question_ids: Optional[List[str]] = Field(None, description='Rubric questions to judge, or None for all')
+  trace_ids: Optional[List[str]] = Field(None, description='Specific traces to evaluate, or None for all')
+  max_concurrency: Optional[int] = Field(None, ge=1, le=64, description='Traces evaluated in parallel (server default if None)')
+  fail_fast: bool = Field(True, description='Abort on the first failed trace instead of collecting errors')
+  ground_truth: GroundTruthMethod = Field(GroundTruthMethod.MODE, description="How annotators' ratings are combined into ground truth")
+
+
+class JudgeRubricEvaluationResult(BaseModel):
+  """Per-question metrics and evaluations from a multi-question judge run."""
+
+  questions: List[Dict[str, str]]
+  metrics: Dict[str, JudgePerformanceMetrics] = Field(description='Agreement metrics keyed by question ID')
+  evaluations: Dict[str, List[JudgeEvaluation]] = Field(description='Evaluations keyed by question ID')
+  evaluation_errors: Dict[str, str] = Field(default_factory=dict, description='Error per trace ID for traces that failed to evaluate')
+
+
+class JudgeMatrixEvaluationRequest(BaseModel):
+  """Request model for evaluating several judge prompts against several models."""
+
+  prompt_ids: List[str] = Field(..., min_length=1)
+  model_names: Optional[List[str]] = Field(None, description="Models to compare, or None for each prompt's saved model")
+  trace_ids: Optional[List[str]] = Field(None, description='Specific traces to evaluate, or None for all')
+  max_concurrency: Optional[int] = Field(None, ge=1, le=64, description='Judge calls in parallel across all combinations (server default if None)')
+  bypass_cache: bool = Field(False, description='Re-score every trace instead of reusing cached judge outputs')
+  ground_truth: GroundTruthMethod = Field(GroundTruthMethod.MODE, description="How annotators' ratings are combined into ground truth")
+
+
+class JudgeMatrixCell(BaseModel):
+  """Result for one prompt/model combination of an evaluation matrix."""
+
+  prompt_id: str
+  prompt_version: int
+  model_name: str
+  metrics: Optional[JudgePerformanceMetrics] = None
+  cached: int = Field(0, description='Traces scored from the judge result cache')
+  error: Optional[str] = Field(None, description='Set when no trace could be evaluated for this combination')
+
+
+class JudgeMatrixEvaluationResult(BaseModel):
+  """Comparison table of judge prompt/model combinations."""
+
+  total_traces: int
+  cells: List[JudgeMatrixCell]
+
+
+class JudgeTelemetrySummary(BaseModel):
+  """Aggregated judge call telemetry for a prompt version, evaluation run or endpoint."""
+
+  prompt_id: Optional[str] = None
+  prompt_version: Optional[int] = None
+  run_id: Optional[str] = None
+  endpoint: Optional[str] = None
+  endpoints: List[str] = Field(default_factory=list)
+  calls: int
+  failed_calls: int
+  traces: int = Field(description='Traces judged; exceeds calls when traces were packed')
+  retries: int = Field(description='Throttled attempts that were retried')
+  latency_ms_mean: float
+  latency_ms_p50: Optional[float] = None
+  latency_ms_p95: Optional[float] = None
+  queue_wait_ms_mean: float
+  queue_wait_ms_p95: Optional[float] = None
+  prompt_tokens: int
+  completion_tokens: int
+  tokens_estimated: bool = Field(False, description='Some token counts are estimates because the backend reported none')
+  cost_usd: Optional[float] = Field(None, description='From JUDGE_TOKEN_PRICES; None when no endpoint has a price')
+  first_call_at: datetime
+  last_call_at: datetime
+
+
+class RaterQuality(BaseModel):
+  """Estimated reliability of one annotator from a weighted consensus fit."""
+
+  user_id: str
+  accuracy: float = Field(description='Probability of giving the true rating, under the estimated rating priors')
+  annotations: int
+  confusion_matrix: List[List[float]] = Field(description='P(given rating | true rating); rows are true ratings in rating_labels order')
+
+
+class WeightedConsensusLabel(BaseModel):
+  """Rater-quality weighted consensus rating of one trace."""
+
+  trace_id: str
+  rating: int = Field(description='Most probable true rating')
+  confidence: float = Field(description='Posterior probability of the rating')
+
+
+class WeightedConsensusResult(BaseModel):
+  """Dawid-Skene consensus ratings and rater reliabilities for one question."""
+
+  question_id: str
+  rating_labels: List[int]
+  priors: List[float] = Field(description='Estimated share of traces per true rating')
+  iterations: int
+  converged: bool
+  log_likelihood: float
+  raters: List[RaterQuality]
+  labels: List[WeightedConsensusLabel]
+
+
+class FewShotExample(BaseModel):
+  """An annotated trace selected as a few-shot example for a judge prompt."""
+
+  trace_id: str
+  rating: int = Field(description='Consensus (most common) human rating')
+  agreement: float = Field(description='Share of annotators who gave the consensus rating')
+  annotations: int
+
+
+class JudgeSequentialEvaluationRequest(BaseModel):
+  """Request model for evaluating a judge prompt on random traces until the result is clear."""
+
+  prompt_id: str
+  baseline_prompt_id: Optional[str] = Field(None, description='Prompt whose stored metrics to compare against (stop once clearly better or worse)')
+  trace_ids: Optional[List[str]] = Field(None, description='Traces to sample from, or None for all')
+  override_model: Optional[str] = Field(None, description="Override model selection from UI (e.g., 'demo' to force simulation)")
+  target_ci_width: float = Field(0.1, gt=0, le=1, description='Stop once the accuracy and kappa intervals are this narrow')
+  confidence: float = Field(0.95, ge=0.5, lt=1, description='Confidence level of the intervals over the whole run')
+  min_traces: int = Field(20, ge=2, description='Traces scored before the stopping rule is first checked')
+  batch_size: Optional[int] = Field(None, ge=1, le=256, description='Traces scored between checks (max_concurrency if None)')
+  max_concurrency: Optional[int] = Field(None, ge=1, le=64, description='Traces evaluated in parallel (server default if None)')
+  seed: Optional[int] = Field(None, description='Seed for the trace order, for reproducible runs')
+  bypass_cache: bool = Field(False, description='Re-score every trace instead of reusing cached judge outputs')
+  ground_truth: GroundTruthMethod = Field(GroundTruthMethod.MODE, description="How annotators' ratings are combined into ground truth")
+
+
+class JudgeSequentialEvaluationResult(BaseModel):
+  """Outcome of a sequential judge evaluation."""
+
+  prompt_id: str
+  baseline_prompt_id: Optional[str] = None
+  stop_reason: str = Field(description='precision_reached, better_than_baseline, worse_than_baseline or exhausted')
+  traces_evaluated: int
+  total_traces: int
+  accuracy: JudgeMetricInterval
+  kappa: JudgeMetricInterval
+  baseline_accuracy: Optional[float] = None
+  baseline_kappa: Optional[float] = None
+  metrics: JudgePerformanceMetrics
+
+
 class JudgeExportConfig(BaseModel):
   """Configuration for exporting a judge."""
 
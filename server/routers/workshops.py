@@ -1,10 +1,13 @@
 """Workshop API endpoints."""
 
+import json
 import logging
 import os
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from server.database import WorkshopDB, get_db
@@ -13,29 +16,47 @@ from server.models import (
   AnnotationCreate,
   DiscoveryFinding,
   DiscoveryFindingCreate,
+  FewShotExample,
   IRRResult,
+  JudgeCacheStats,
   JudgeEvaluation,
   JudgeEvaluationDirectRequest,
   JudgeEvaluationRequest,
   JudgeEvaluationResult,
+  JudgeEvaluationRun,
   JudgeExportConfig,
+  JudgeMatrixEvaluationRequest,
+  JudgeMatrixEvaluationResult,
   JudgePerformanceMetrics,
   JudgePrompt,
   JudgePromptCreate,
+  JudgeRubricEvaluationRequest,
+  JudgeRubricEvaluationResult,
+  JudgeRunDiff,
+  JudgeSequentialEvaluationRequest,
+  JudgeSequentialEvaluationResult,
+  JudgeTelemetrySummary,
   MLflowIntakeConfig,
   MLflowIntakeConfigCreate,
   MLflowIntakeStatus,
-  MLflowTraceInfo,
+  MLflowTracePreviewPage,
+  RaterQuality,
   Rubric,
   RubricCreate,
   Trace,
+  TraceConsensus,
+  TraceImportJob,
+  TraceImportRequest,
   TraceUpload,
+  WeightedConsensusLabel,
+  WeightedConsensusResult,
   Workshop,
   WorkshopCreate,
   WorkshopPhase,
 )
 from server.services.database_service import DatabaseService
 from server.services.irr_service import calculate_irr_for_workshop
+from server.services.trace_consensus import OVERALL_QUESTION_ID
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -58,14 +79,68 @@ async def get_workshop(workshop_id: str, db: Session = Depends(get_db)) -> Works
   return workshop
 
 
-@router.post('/{workshop_id}/traces')
-async def upload_traces(workshop_id: str, traces: List[TraceUpload], db: Session = Depends(get_db)) -> List[Trace]:
-  """Upload traces to a workshop."""
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+
+@router.post(
+  '/{workshop_id}/traces',
+  response_model=None,
+  openapi_extra={
+    'requestBody': {
+      'required': True,
+      'content': {
+        'application/json': {'schema': {'type': 'array', 'items': {'$ref': '#/components/schemas/TraceUpload'}}},
+        'application/x-ndjson': {'schema': {'type': 'string', 'description': 'One TraceUpload JSON object per line'}},
+      },
+    }
+  },
+)
+async def upload_traces(workshop_id: str, request: Request, db: Session = Depends(get_db)) -> List[Trace] | Dict[str, Any]:
+  """Upload traces to a workshop.
+
+  Accepts a JSON array of ``TraceUpload`` objects (returns the created traces) or, for large
+  uploads, NDJSON with one ``TraceUpload`` per line. NDJSON bodies are parsed while they stream
+  in and inserted in batches, and the response is a summary instead of the created traces.
+  Both formats may be sent with ``Content-Encoding: gzip``.
+  """
   db_service = DatabaseService(db)
   workshop = db_service.get_workshop(workshop_id)
   if not workshop:
     raise HTTPException(status_code=404, detail='Workshop not found')
 
+  content_encoding = request.headers.get('content-encoding', '').lower().strip()
+  if content_encoding not in ('', 'identity', 'gzip'):
+    raise HTTPException(status_code=415, detail=f'Unsupported Content-Encoding: {content_encoding}')
+  gzip_encoded = content_encoding == 'gzip'
+  content_type = request.headers.get('content-type', 'application/json').split(';')[0].strip().lower()
+
+  if content_type in NDJSON_CONTENT_TYPES:
+    from server.services.trace_import_service import TraceImportService
+
+    try:
+      return await TraceImportService(db_service).import_upload_stream(workshop_id, request.stream(), gzip_encoded=gzip_encoded)
+    except ValueError as e:
+      raise HTTPException(status_code=400, detail=str(e)) from e
+
+  # JSON array body: validate the whole list up front, as before
+  import json
+
+  from pydantic import TypeAdapter, ValidationError
+
+  from server.config import ServerConfig
+  from server.services.trace_import_service import gunzip_limited
+
+  body = await request.body()
+  try:
+    if gzip_encoded:
+      body = gunzip_limited(body, ServerConfig.TRACE_UPLOAD_MAX_BYTES)
+    traces = TypeAdapter(List[TraceUpload]).validate_python(json.loads(body))
+  except ValidationError as e:
+    raise HTTPException(status_code=422, detail=e.errors(include_url=False)) from e
+  except ValueError as e:
+    # Corrupt, truncated or oversized gzip data, or malformed JSON
+    raise HTTPException(status_code=400, detail=f'Invalid request body: {str(e)}') from e
+
   return db_service.add_traces(workshop_id, traces)
 
 
@@ -104,6 +179,23 @@ async def get_traces(workshop_id: str, user_id: str, db: Session = Depends(get_d
     return db_service.get_traces(workshop_id)
 
 
+@router.get('/{workshop_id}/trace-payloads/{content_hash}')
+async def get_trace_payload(workshop_id: str, content_hash: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
+  """Lazily load a span payload that was moved out of trace context during ingestion.
+
+  Compacted spans reference these payloads as ``{"$overflow_ref": <content_hash>, ...}``.
+  """
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  payload = db_service.get_trace_payload(workshop_id, content_hash)
+  if not payload:
+    raise HTTPException(status_code=404, detail='Trace payload not found')
+  return payload
+
+
 @router.get('/{workshop_id}/all-traces')
 async def get_all_traces(workshop_id: str, db: Session = Depends(get_db)) -> List[Trace]:
   """Get ALL traces for a workshop, unfiltered by phase."""
@@ -956,6 +1048,7 @@ async def generate_annotation_test_data(workshop_id: str, db: Session = Depends(
           annotations_created += 1
 
     db.commit()
+    db_service.refresh_trace_consensus(workshop_id)
 
     return {
       'message': f'Generated {annotations_created} realistic annotations with varied agreement levels',
@@ -1297,6 +1390,275 @@ async def evaluate_judge_prompt(
     raise HTTPException(status_code=500, detail=f'Failed to evaluate judge: {str(e)}')
 
 
+@router.get('/{workshop_id}/judge-evaluation-runs')
+async def list_judge_evaluation_runs(workshop_id: str, prompt_id: Optional[str] = None, db: Session = Depends(get_db)) -> List[JudgeEvaluationRun]:
+  """List judge evaluation runs, newest first."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  return db_service.list_judge_evaluation_runs(workshop_id, prompt_id)
+
+
+@router.get('/{workshop_id}/judge-evaluation-runs/{run_id}')
+async def get_judge_evaluation_run(workshop_id: str, run_id: str, db: Session = Depends(get_db)) -> JudgeEvaluationRun:
+  """Get a judge evaluation run and its progress."""
+  db_service = DatabaseService(db)
+  run = db_service.get_judge_evaluation_run(workshop_id, run_id)
+  if not run:
+    raise HTTPException(status_code=404, detail='Evaluation run not found')
+
+  return run
+
+
+@router.get('/{workshop_id}/judge-evaluation-runs/{run_id}/evaluations')
+async def get_judge_evaluation_run_results(workshop_id: str, run_id: str, db: Session = Depends(get_db)) -> List[JudgeEvaluation]:
+  """Get the evaluation results recorded by one judge evaluation run."""
+  db_service = DatabaseService(db)
+  if not db_service.get_judge_evaluation_run(workshop_id, run_id):
+    raise HTTPException(status_code=404, detail='Evaluation run not found')
+
+  return db_service.get_judge_run_evaluations(workshop_id, run_id)
+
+
+@router.get('/{workshop_id}/judge-evaluation-runs/{run_id}/diff/{compare_run_id}')
+async def diff_judge_evaluation_runs(workshop_id: str, run_id: str, compare_run_id: str, db: Session = Depends(get_db)) -> JudgeRunDiff:
+  """Compare the per-trace results of two judge evaluation runs."""
+  db_service = DatabaseService(db)
+  for requested_run_id in (run_id, compare_run_id):
+    if not db_service.get_judge_evaluation_run(workshop_id, requested_run_id):
+      raise HTTPException(status_code=404, detail=f'Evaluation run {requested_run_id} not found')
+
+  try:
+    return db_service.diff_judge_evaluation_runs(workshop_id, run_id, compare_run_id)
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f'Failed to compare evaluation runs: {str(e)}') from e
+
+
+@router.post('/{workshop_id}/judge-evaluation-runs/{run_id}/resume')
+async def resume_judge_evaluation_run(workshop_id: str, run_id: str, db: Session = Depends(get_db)) -> JudgePerformanceMetrics:
+  """Resume an interrupted judge evaluation run, scoring only the traces it is missing."""
+  db_service = DatabaseService(db)
+  if not db_service.get_judge_evaluation_run(workshop_id, run_id):
+    raise HTTPException(status_code=404, detail='Evaluation run not found')
+
+  try:
+    from server.services.judge_service import JudgeService
+
+    judge_service = JudgeService(db_service)
+
+    return judge_service.resume_evaluation_run(workshop_id, run_id)
+  except HTTPException:
+    raise
+  except ValueError as e:
+    raise HTTPException(status_code=409, detail=str(e)) from e
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f'Failed to resume judge evaluation: {str(e)}') from e
+
+
+@router.get('/{workshop_id}/judge-telemetry')
+async def get_judge_telemetry(
+  workshop_id: str,
+  group_by: str = Query('prompt_version', description='Aggregate per prompt_version, run or endpoint'),
+  prompt_id: Optional[str] = None,
+  run_id: Optional[str] = None,
+  db: Session = Depends(get_db),
+) -> List[JudgeTelemetrySummary]:
+  """Latency, queue wait, token, retry and cost aggregates of judge model calls."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  try:
+    from server.services.judge_service import JudgeService
+
+    judge_service = JudgeService(db_service)
+
+    return judge_service.get_telemetry_summary(workshop_id, group_by=group_by, prompt_id=prompt_id, run_id=run_id)
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e)) from e
+
+
+@router.get('/{workshop_id}/trace-consensus')
+async def get_trace_consensus(
+  workshop_id: str,
+  question_id: Optional[str] = Query(OVERALL_QUESTION_ID, description="Rubric question ID, 'overall' for the single rating, or empty for all"),
+  trace_id: Optional[List[str]] = Query(None),
+  db: Session = Depends(get_db),
+) -> List[TraceConsensus]:
+  """Get the consensus (mode) human rating, rating distribution and agreement per annotated trace."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  try:
+    return db_service.get_trace_consensus(workshop_id, [question_id] if question_id else None, trace_id)
+  except HTTPException:
+    raise
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f'Failed to get trace consensus: {str(e)}') from e
+
+
+@router.get('/{workshop_id}/weighted-consensus')
+async def get_weighted_consensus(
+  workshop_id: str,
+  question_id: str = Query(OVERALL_QUESTION_ID, description="Rubric question ID, or 'overall' for the single rating"),
+  db: Session = Depends(get_db),
+) -> WeightedConsensusResult:
+  """Fit rater-quality weighted (Dawid-Skene) consensus ratings and per-annotator reliabilities."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  try:
+    from server.services.judge_data_loader import JudgeDataLoader
+
+    result = JudgeDataLoader(db_service).weighted_consensus(workshop_id, question_id)
+    if result is None:
+      raise HTTPException(status_code=404, detail=f'No ratings found for question {question_id}')
+
+    model = result.model
+    return WeightedConsensusResult(
+      question_id=question_id,
+      rating_labels=model.classes.tolist(),
+      priors=model.priors.tolist(),
+      iterations=result.iterations,
+      converged=result.converged,
+      log_likelihood=result.log_likelihood,
+      raters=[
+        RaterQuality(user_id=user_id, accuracy=float(accuracy), annotations=int(annotations), confusion_matrix=confusion.tolist())
+        for user_id, accuracy, annotations, confusion in zip(model.rater_ids, model.rater_accuracy(), result.annotations_per_rater, model.confusion, strict=True)
+      ],
+      labels=[
+        WeightedConsensusLabel(trace_id=trace_id, rating=rating, confidence=confidence)
+        for trace_id, (rating, confidence) in result.consensus().items()
+      ],
+    )
+  except HTTPException:
+    raise
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f'Failed to fit weighted consensus: {str(e)}') from e
+
+
+@router.get('/{workshop_id}/few-shot-examples')
+async def get_few_shot_examples(
+  workshop_id: str,
+  num_examples: int = Query(3, ge=1, le=20),
+  diversity: float = Query(0.5, ge=0.0, le=1.0, description='Weight of dissimilarity to already chosen examples versus typicality'),
+  db: Session = Depends(get_db),
+) -> List[FewShotExample]:
+  """Suggest diverse, representative annotated traces to use as few-shot examples."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  try:
+    from server.services.judge_service import JudgeService
+
+    judge_service = JudgeService(db_service)
+
+    return judge_service.select_few_shot_examples(workshop_id, num_examples=num_examples, diversity=diversity)
+  except HTTPException:
+    raise
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f'Failed to select few-shot examples: {str(e)}') from e
+
+
+@router.post('/{workshop_id}/evaluate-judge-matrix')
+async def evaluate_judge_matrix(
+  workshop_id: str, evaluation_request: JudgeMatrixEvaluationRequest, db: Session = Depends(get_db)
+) -> JudgeMatrixEvaluationResult:
+  """Compare several judge prompts across several models in a single run."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  try:
+    from server.services.judge_service import JudgeService
+
+    judge_service = JudgeService(db_service)
+
+    return judge_service.evaluate_matrix(workshop_id, evaluation_request)
+  except HTTPException:
+    raise
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f'Failed to evaluate judge matrix: {str(e)}') from e
+
+
+@router.post('/{workshop_id}/evaluate-judge-sequential')
+async def evaluate_judge_sequential(
+  workshop_id: str, evaluation_request: JudgeSequentialEvaluationRequest, db: Session = Depends(get_db)
+) -> JudgeSequentialEvaluationResult:
+  """Evaluate a judge prompt on sampled traces, stopping once the result is statistically clear."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  try:
+    from server.services.judge_service import JudgeService
+
+    judge_service = JudgeService(db_service)
+
+    return judge_service.evaluate_prompt_sequential(workshop_id, evaluation_request)
+  except HTTPException:
+    raise
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f'Failed to evaluate judge prompt sequentially: {str(e)}') from e
+
+
+def _format_sse(event: Dict[str, Any]) -> str:
+  """Format an event dictionary as a server-sent event."""
+  return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+@router.post('/{workshop_id}/evaluate-judge/stream')
+async def evaluate_judge_prompt_stream(
+  workshop_id: str, evaluation_request: JudgeEvaluationRequest, db: Session = Depends(get_db)
+) -> StreamingResponse:
+  """Evaluate a judge prompt, streaming each evaluation and running metrics as server-sent events.
+
+  Completed evaluations are saved as they arrive, so a failure late in the run keeps
+  earlier scores. Traces that fail are reported as ``error`` events and the run continues.
+  """
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  from server.database import SessionLocal
+  from server.services.judge_service import JudgeService
+
+  # The stream outlives this request handler, so it gets its own session
+  stream_db = SessionLocal()
+  try:
+    events = JudgeService(DatabaseService(stream_db)).stream_evaluate_prompt(workshop_id, evaluation_request)
+  except HTTPException:
+    stream_db.close()
+    raise
+  except Exception as e:
+    stream_db.close()
+    raise HTTPException(status_code=500, detail=f'Failed to evaluate judge: {str(e)}') from e
+
+  def event_stream():
+    try:
+      for event in events:
+        yield _format_sse(event)
+    except Exception as e:
+      yield _format_sse({'event': 'error', 'data': {'trace_id': None, 'error': str(e), 'fatal': True}})
+    finally:
+      events.close()
+      stream_db.close()
+
+  return StreamingResponse(event_stream(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @router.post('/{workshop_id}/evaluate-judge-direct')
 async def evaluate_judge_prompt_direct(
   workshop_id: str, evaluation_request: JudgeEvaluationDirectRequest, db: Session = Depends(get_db)
@@ -1317,9 +1679,31 @@ async def evaluate_judge_prompt_direct(
     raise HTTPException(status_code=500, detail=f'Failed to evaluate judge: {str(e)}')
 
 
+@router.post('/{workshop_id}/evaluate-judge-rubric')
+async def evaluate_judge_rubric(
+  workshop_id: str, evaluation_request: JudgeRubricEvaluationRequest, db: Session = Depends(get_db)
+) -> JudgeRubricEvaluationResult:
+  """Evaluate a judge prompt on every rubric question with one model call per trace."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  try:
+    from server.services.judge_service import JudgeService
+
+    judge_service = JudgeService(db_service)
+
+    return judge_service.evaluate_rubric(workshop_id, evaluation_request)
+  except HTTPException:
+    raise
+  except Exception as e:
+    raise HTTPException(status_code=500, detail=f'Failed to evaluate judge: {str(e)}') from e
+
+
 @router.get('/{workshop_id}/judge-evaluations/{prompt_id}')
 async def get_judge_evaluations(workshop_id: str, prompt_id: str, db: Session = Depends(get_db)) -> List[JudgeEvaluation]:
-  """Get evaluation results for a specific judge prompt."""
+  """Get evaluation results of the latest run of a specific judge prompt."""
   db_service = DatabaseService(db)
   workshop = db_service.get_workshop(workshop_id)
   if not workshop:
@@ -1335,7 +1719,7 @@ async def save_judge_evaluations(
   evaluations: List[JudgeEvaluation],
   db: Session = Depends(get_db),
 ):
-  """Save evaluation results for a specific judge prompt."""
+  """Save evaluation results for a specific judge prompt as a new evaluation run."""
   db_service = DatabaseService(db)
   workshop = db_service.get_workshop(workshop_id)
   if not workshop:
@@ -1352,12 +1736,50 @@ async def save_judge_evaluations(
     evaluation.workshop_id = workshop_id
 
   try:
-    db_service.store_judge_evaluations(evaluations)
-    return {'message': f'Saved {len(evaluations)} evaluations for prompt {prompt_id}'}
+    run = db_service.store_judge_evaluations(evaluations)
+    return {'message': f'Saved {len(evaluations)} evaluations for prompt {prompt_id}', 'run_id': run.id if run else None}
   except Exception as e:
     raise HTTPException(status_code=500, detail=f'Failed to save evaluations: {str(e)}')
 
 
+@router.get('/{workshop_id}/judge-cache')
+async def get_judge_cache_stats(workshop_id: str, db: Session = Depends(get_db)) -> JudgeCacheStats:
+  """Get judge result cache statistics for a workshop."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  from server.config import ServerConfig
+  from server.services.judge_cache import judge_cache_stats
+
+  counters = judge_cache_stats.get(workshop_id)
+  lookups = counters['hits'] + counters['misses']
+  return JudgeCacheStats(
+    workshop_id=workshop_id,
+    entries=db_service.count_judge_cache_entries(workshop_id),
+    max_entries=ServerConfig.JUDGE_CACHE_MAX_ENTRIES,
+    hits=counters['hits'],
+    misses=counters['misses'],
+    hit_rate=counters['hits'] / lookups if lookups else None,
+  )
+
+
+@router.delete('/{workshop_id}/judge-cache')
+async def clear_judge_cache(workshop_id: str, db: Session = Depends(get_db)):
+  """Clear cached judge outputs for a workshop."""
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  from server.services.judge_cache import judge_cache_stats
+
+  deleted = db_service.clear_judge_cache(workshop_id)
+  judge_cache_stats.reset(workshop_id)
+  return {'message': f'Cleared {deleted} cached judge outputs'}
+
+
 @router.post('/{workshop_id}/export-judge')
 async def export_judge(workshop_id: str, export_config: JudgeExportConfig, db: Session = Depends(get_db)) -> Dict[str, Any]:
   """Export a judge configuration."""
@@ -1398,8 +1820,14 @@ async def configure_mlflow_intake(workshop_id: str, config: MLflowIntakeConfigCr
       experiment_id=config.experiment_id,
       max_traces=config.max_traces,
       filter_string=config.filter_string,
+      span_compaction=config.span_compaction,
     )
 
+    # Judge contexts built for the previous config are stale
+    from server.services.judge_context import judge_contexts
+
+    judge_contexts.invalidate(workshop_id)
+
     return db_service.create_mlflow_config(workshop_id, config_without_token)
   except Exception as e:
     raise HTTPException(status_code=500, detail=f'Failed to configure MLflow intake: {str(e)}')
@@ -1486,6 +1914,7 @@ async def ingest_mlflow_traces(workshop_id: str, ingest_request: dict, db: Sessi
     experiment_id=config.experiment_id,
     max_traces=config.max_traces,
     filter_string=config.filter_string,
+    span_compaction=config.span_compaction,
   )
 
   try:
@@ -1511,8 +1940,18 @@ async def ingest_mlflow_traces(workshop_id: str, ingest_request: dict, db: Sessi
 
 
 @router.get('/{workshop_id}/mlflow-traces')
-async def get_mlflow_traces(workshop_id: str, config: MLflowIntakeConfigCreate, db: Session = Depends(get_db)) -> List[MLflowTraceInfo]:
-  """Get available traces from MLflow (without ingesting)."""
+async def get_mlflow_traces(
+  workshop_id: str,
+  config: MLflowIntakeConfigCreate,
+  page: int = Query(1, ge=1),
+  page_size: int = Query(25, ge=1, le=200),
+  db: Session = Depends(get_db),
+) -> MLflowTracePreviewPage:
+  """Get a page of trace previews from MLflow (without ingesting).
+
+  Previews are fetched without span data and cached briefly per experiment and
+  filter, so paging does not query MLflow again.
+  """
   db_service = DatabaseService(db)
   workshop = db_service.get_workshop(workshop_id)
   if not workshop:
@@ -1531,10 +1970,116 @@ async def get_mlflow_traces(workshop_id: str, config: MLflowIntakeConfigCreate,
       filter_string=config.filter_string,
     )
 
-    return mlflow_service.search_traces(mlflow_config)
+    previews, cached = mlflow_service.search_trace_previews(mlflow_config)
   except Exception as e:
     raise HTTPException(status_code=500, detail=f'Failed to get MLflow traces: {str(e)}')
 
+  start = (page - 1) * page_size
+  return MLflowTracePreviewPage(
+    traces=previews[start : start + page_size],
+    total=len(previews),
+    page=page,
+    page_size=page_size,
+    has_more=start + page_size < len(previews),
+    cached=cached,
+  )
+
+
+def _run_trace_import_job(job_id: str, path: Path, chunk_size: int, skip_existing: bool, delete_after: bool) -> None:
+  """Run an offline trace import in the background with its own database session."""
+  from server.database import SessionLocal
+  from server.services.trace_import_service import TraceImportService
+
+  db = SessionLocal()
+  try:
+    TraceImportService(DatabaseService(db)).run_import_job(job_id, path, chunk_size, skip_existing, delete_after=delete_after)
+  finally:
+    db.close()
+
+
+@router.post('/{workshop_id}/trace-imports', status_code=status.HTTP_202_ACCEPTED)
+async def import_traces_from_disk(
+  workshop_id: str, import_request: TraceImportRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
+) -> TraceImportJob:
+  """Import an MLflow trace export (JSONL or Parquet) from the server import directory.
+
+  The import runs in the background; poll ``GET /{workshop_id}/trace-imports/{job_id}`` for progress.
+  """
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  from server.config import ServerConfig
+  from server.services.trace_import_service import infer_file_format
+
+  # Only files inside the configured import directory may be read
+  import_root = Path(ServerConfig.TRACE_IMPORT_DIR).resolve()
+  path = (import_root / import_request.path).resolve()
+  if not path.is_relative_to(import_root):
+    raise HTTPException(status_code=400, detail='Import path must be inside the trace import directory')
+  if not path.is_file():
+    raise HTTPException(status_code=404, detail=f'Import file not found: {import_request.path}')
+
+  try:
+    file_format = import_request.file_format or infer_file_format(path.name)
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e)) from e
+
+  job = db_service.create_trace_import_job(workshop_id, str(import_request.path), file_format)
+  background_tasks.add_task(_run_trace_import_job, job.id, path, import_request.chunk_size, import_request.skip_existing, False)
+  return job
+
+
+@router.post('/{workshop_id}/trace-imports/upload', status_code=status.HTTP_202_ACCEPTED)
+def import_traces_from_upload(
+  workshop_id: str,
+  background_tasks: BackgroundTasks,
+  file: UploadFile = File(...),
+  file_format: Optional[str] = Form(None),
+  chunk_size: int = Form(500),
+  skip_existing: bool = Form(True),
+  db: Session = Depends(get_db),
+) -> TraceImportJob:
+  """Import an uploaded MLflow trace export (JSONL or Parquet) in the background.
+
+  A plain ``def`` endpoint, so spooling the upload to disk runs in the threadpool
+  instead of blocking the event loop.
+  """
+  db_service = DatabaseService(db)
+  workshop = db_service.get_workshop(workshop_id)
+  if not workshop:
+    raise HTTPException(status_code=404, detail='Workshop not found')
+
+  import shutil
+  import tempfile
+
+  from server.services.trace_import_service import infer_file_format
+
+  try:
+    file_format = file_format or infer_file_format(file.filename or '')
+  except ValueError as e:
+    raise HTTPException(status_code=400, detail=str(e)) from e
+
+  # Spool the upload to disk so the background job can stream it after the request ends
+  suffix = '.gz' if (file.filename or '').endswith('.gz') else ''
+  with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+    shutil.copyfileobj(file.file, tmp, length=1024 * 1024)
+    tmp_path = Path(tmp.name)
+
+  job = db_service.create_trace_import_job(workshop_id, file.filename or 'upload', file_format)
+  background_tasks.add_task(_run_trace_import_job, job.id, tmp_path, chunk_size, skip_existing, True)
+  return job
+
+
+@router.get('/{workshop_id}/trace-imports/{job_id}')
+async def get_trace_import_job(workshop_id: str, job_id: str, db: Session = Depends(get_db)) -> TraceImportJob:
+  """Get progress of an offline trace import."""
+  job = DatabaseService(db).get_trace_import_job(job_id)
+  if not job or job.workshop_id != workshop_id:
+    raise HTTPException(status_code=404, detail='Import job not found')
+  return job
+
 
 # User Discovery Completion endpoints
 @router.post('/{workshop_id}/users/{user_id}/complete-discovery')
@@ -0,0 +1,182 @@
+"""Content extraction for MLflow request/response payloads.
+
+MLflow stores trace requests and responses as JSON text in several shapes (chat
+``messages``, agent ``request.input``, Responses API objects, streamed output items).
+Each shape is handled by a registered extractor. A cheap sniff of the first
+non-whitespace character skips JSON parsing for plain text, and payloads are parsed
+once with orjson when it is installed.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+try:
+  import orjson
+
+  ORJSON_AVAILABLE = True
+except ImportError:
+  ORJSON_AVAILABLE = False
+
+
+def _orjson_loads(text: str) -> Any:
+  """Parse with orjson, falling back to the stdlib for inputs orjson rejects (e.g. NaN)."""
+  try:
+    return orjson.loads(text)
+  except orjson.JSONDecodeError:
+    return json.loads(text)
+
+
+# Fastest available JSON parser
+json_loads: Callable[[str], Any] = _orjson_loads if ORJSON_AVAILABLE else json.loads
+
+
+@dataclass(frozen=True)
+class ContentExtractor:
+  """A format-specific extractor.
+
+  ``matches`` is a cheap structural check on the parsed payload. ``extract`` returns
+  the content, or None to let the next registered extractor try.
+  """
+
+  name: str
+  matches: Callable[[Any], bool]
+  extract: Callable[[Any], Optional[Any]]
+
+
+class ContentExtractorRegistry:
+  """Ordered collection of content extractors tried against a parsed payload."""
+
+  def __init__(self, loads: Callable[[str], Any] = json_loads):
+    self.loads = loads
+    self._extractors: List[ContentExtractor] = []
+
+  def register(self, name: str, matches: Callable[[Any], bool]) -> Callable:
+    """Decorator registering an extract function for payloads accepted by ``matches``."""
+
+    def decorator(extract: Callable[[Any], Optional[Any]]) -> Callable[[Any], Optional[Any]]:
+      self._extractors.append(ContentExtractor(name=name, matches=matches, extract=extract))
+      return extract
+
+    return decorator
+
+  @property
+  def extractors(self) -> List[ContentExtractor]:
+    return list(self._extractors)
+
+  def copy(self, loads: Optional[Callable[[str], Any]] = None) -> 'ContentExtractorRegistry':
+    """Copy the registry, optionally swapping the JSON parser."""
+    registry = ContentExtractorRegistry(loads or self.loads)
+    registry._extractors = list(self._extractors)
+    return registry
+
+  def extract_from_data(self, data: Any) -> Optional[Any]:
+    """Run the registered extractors against an already parsed payload."""
+    for extractor in self._extractors:
+      if extractor.matches(data):
+        content = extractor.extract(data)
+        if content is not None:
+          return content
+    return None
+
+  def extract(self, json_text: str) -> Any:
+    """Extract the human readable content from a JSON payload.
+
+    Returns the original text when it is not JSON or no extractor recognizes it.
+    """
+    # Only objects and arrays can match an extractor - skip parsing anything else
+    stripped = json_text.lstrip()
+    if not stripped or stripped[0] not in '{[':
+      return json_text
+
+    try:
+      data = self.loads(json_text)
+    except ValueError:
+      return json_text
+
+    content = self.extract_from_data(data)
+    return json_text if content is None else content
+
+
+default_registry = ContentExtractorRegistry()
+
+
+def _is_dict_with(key: str) -> Callable[[Any], bool]:
+  return lambda data: isinstance(data, dict) and key in data
+
+
+@default_registry.register('agent_request_input', _is_dict_with('request'))
+def _extract_agent_request_input(data: dict) -> Optional[Any]:
+  """``{"request": {"input": [...]}}`` - first user message, else the first item."""
+  request_data = data['request']
+  if not isinstance(request_data, dict) or 'input' not in request_data:
+    return None
+  input_list = request_data['input']
+  if not isinstance(input_list, list) or not input_list:
+    return None
+  for item in input_list:
+    if isinstance(item, dict) and item.get('role') == 'user' and 'content' in item:
+      return item['content']
+  first = input_list[0]
+  if isinstance(first, dict) and first.get('content'):
+    return first['content']
+  return None
+
+
+@default_registry.register('chat_messages', _is_dict_with('messages'))
+def _extract_chat_messages(data: dict) -> Optional[Any]:
+  """``{"messages": [...]}`` - last assistant message, else first user message, else last message."""
+  messages = data['messages']
+  if not messages:
+    return None
+  if not isinstance(messages, list):
+    return None
+  for message in reversed(messages):
+    if isinstance(message, dict) and message.get('role') == 'assistant' and 'content' in message:
+      return message['content']
+  for message in messages:
+    if isinstance(message, dict) and message.get('role') == 'user' and 'content' in message:
+      return message['content']
+  if isinstance(messages[-1], dict) and 'content' in messages[-1]:
+    return messages[-1]['content']
+  return None
+
+
+def _first_output_text(content_list: Any) -> Optional[str]:
+  if isinstance(content_list, list):
+    for content_item in content_list:
+      if isinstance(content_item, dict) and content_item.get('type') == 'output_text':
+        return content_item.get('text', '')
+  return None
+
+
+@default_registry.register('streamed_output_items', lambda data: isinstance(data, list))
+def _extract_streamed_output_items(data: list) -> Optional[Any]:
+  """List of ``response.output_item.done`` stream events - first ``output_text``."""
+  for item in data:
+    if isinstance(item, dict) and item.get('type') == 'response.output_item.done':
+      item_data = item.get('item', {})
+      if isinstance(item_data, dict) and 'content' in item_data:
+        text = _first_output_text(item_data['content'])
+        if text is not None:
+          return text
+  return None
+
+
+@default_registry.register('responses_api', lambda data: isinstance(data, dict) and data.get('object') == 'response' and 'output' in data)
+def _extract_responses_api(data: dict) -> Optional[Any]:
+  """Responses API object - first ``output_text`` of an assistant message."""
+  output_list = data['output']
+  if not isinstance(output_list, list):
+    return None
+  for output_item in output_list:
+    if isinstance(output_item, dict) and output_item.get('type') == 'message' and output_item.get('role') == 'assistant':
+      text = _first_output_text(output_item.get('content', []))
+      if text is not None:
+        return text
+  return None
+
+
+def extract_content(json_text: str) -> Any:
+  """Extract content from a JSON payload using the default registry."""
+  return default_registry.extract(json_text)
@@ -2,25 +2,37 @@
 
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy import and_, case, func, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, contains_eager
 
 from server.database import (
   AnnotationDB,
   DiscoveryFindingDB,
   FacilitatorConfigDB,
-  JudgeEvaluationDB,
+  JudgeCallTelemetryDB,
+  JudgeEvaluationRunDB,
+  JudgeOutputDB,
   JudgePromptDB,
+  JudgeResultCacheDB,
+  JudgeRunResultDB,
   MLflowIntakeConfigDB,
   RubricDB,
+  TraceConsensusDB,
   TraceDB,
+  TraceImportJobDB,
+  TracePayloadDB,
   UserDB,
   UserDiscoveryCompletionDB,
   UserTraceOrderDB,
   WorkshopDB,
   WorkshopParticipantDB,
+  judge_output_id,
 )
 from server.models import (
   Annotation,
@@ -30,13 +42,19 @@ from server.models import (
   FacilitatorConfig,
   FacilitatorConfigCreate,
   JudgeEvaluation,
+  JudgeEvaluationRun,
   JudgePrompt,
   JudgePromptCreate,
+  JudgeRunDiff,
+  JudgeRunDiffItem,
   MLflowIntakeConfig,
   MLflowIntakeStatus,
   Rubric,
   RubricCreate,
+  SpanCompactionConfig,
   Trace,
+  TraceConsensus,
+  TraceImportJob,
   TraceUpload,
   User,
   UserCreate,
@@ -48,9 +66,15 @@ from server.models import (
   WorkshopParticipant,
   WorkshopPhase,
 )
+from server.services.dawid_skene import dawid_skene_models
+from server.services.packed_judge import estimate_trace_tokens
+from server.services.trace_consensus import OVERALL_QUESTION_ID, consensus_rows
 from server.utils.config import get_facilitator_config
 from server.utils.password import generate_default_password, hash_password, verify_password
 
+# Times a judge evaluation run number is allocated before a conflict is raised
+RUN_NUMBER_ATTEMPTS = 5
+
 
 class DatabaseService:
   """Service layer for database operations with caching support."""
@@ -266,6 +290,7 @@ class DatabaseService:
         trace_metadata=trace_data.trace_metadata,
         mlflow_trace_id=trace_data.mlflow_trace_id,
         mlflow_experiment_id=trace_data.mlflow_experiment_id,
+        token_estimate=estimate_trace_tokens(trace_data.input, trace_data.output),
       )
       self.db.add(db_trace)
       db_traces.append(db_trace)
@@ -285,18 +310,113 @@ class DatabaseService:
           context=db_trace.context,
           trace_metadata=db_trace.trace_metadata,
           mlflow_trace_id=db_trace.mlflow_trace_id,
+          token_estimate=db_trace.token_estimate,
           created_at=db_trace.created_at,
         )
       )
 
     return created_traces
 
+  def bulk_add_traces(self, workshop_id: str, traces: List[TraceUpload]) -> int:
+    """Insert a chunk of traces in one transaction without reloading them.
+
+    Used by bulk imports where the created rows are not needed in the response.
+    """
+    if not traces:
+      return 0
+
+    self.db.add_all([self._trace_to_db(workshop_id, trace) for trace in traces])
+    self.db.commit()
+    return len(traces)
+
+  def get_mlflow_trace_ids(self, workshop_id: str) -> set:
+    """Get the MLflow trace IDs already present in a workshop."""
+    rows = self.db.query(TraceDB.mlflow_trace_id).filter(TraceDB.workshop_id == workshop_id, TraceDB.mlflow_trace_id.isnot(None)).all()
+    return {row.mlflow_trace_id for row in rows}
+
+  def add_trace_payloads(self, workshop_id: str, payloads: Dict[str, str]) -> int:
+    """Store span payloads in the overflow store, skipping hashes that already exist.
+
+    Args:
+        workshop_id: The workshop ID
+        payloads: Serialized JSON payloads keyed by content hash
+
+    Returns:
+        Number of newly stored payloads
+    """
+    if not payloads:
+      return 0
+
+    existing_hashes = {
+      row.content_hash
+      for row in self.db.query(TracePayloadDB.content_hash)
+      .filter(TracePayloadDB.workshop_id == workshop_id, TracePayloadDB.content_hash.in_(list(payloads.keys())))
+      .all()
+    }
+
+    new_payloads = [
+      {
+        'id': str(uuid.uuid4()),
+        'workshop_id': workshop_id,
+        'content_hash': content_hash,
+        'payload': serialized,
+        'size_bytes': len(serialized.encode('utf-8')),
+      }
+      for content_hash, serialized in payloads.items()
+      if content_hash not in existing_hashes
+    ]
+    if not new_payloads:
+      return 0
+
+    # A concurrent import may store the same payload between the check above and this insert
+    dialect = self.db.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+      dialect_insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+      statement = dialect_insert(TracePayloadDB.__table__).on_conflict_do_nothing(index_elements=['workshop_id', 'content_hash'])
+      stored = self.db.execute(statement, new_payloads).rowcount
+    else:
+      self.db.execute(insert(TracePayloadDB), new_payloads)
+      stored = len(new_payloads)
+    self.db.commit()
+    return stored
+
+  def get_trace_payload(self, workshop_id: str, content_hash: str) -> Optional[Dict[str, Any]]:
+    """Load a span payload from the overflow store."""
+    import json
+
+    db_payload = (
+      self.db.query(TracePayloadDB).filter(TracePayloadDB.workshop_id == workshop_id, TracePayloadDB.content_hash == content_hash).first()
+    )
+    if not db_payload:
+      return None
+
+    return {
+      'content_hash': db_payload.content_hash,
+      'size_bytes': db_payload.size_bytes,
+      'payload': json.loads(db_payload.payload),
+    }
+
   def get_traces(self, workshop_id: str) -> List[Trace]:
     """Get all traces for a workshop in chronological order."""
     db_traces = self.db.query(TraceDB).filter(TraceDB.workshop_id == workshop_id).order_by(TraceDB.created_at).all()
 
     return [self._trace_from_db(db_trace) for db_trace in db_traces]
 
+  def get_traces_by_ids(self, trace_ids: List[str]) -> Dict[str, Trace]:
+    """Get many traces by ID with one query per 500 IDs.
+
+    Returns:
+        Traces keyed by ID (IDs that don't exist are omitted)
+    """
+    unique_ids = list(dict.fromkeys(trace_ids))
+    traces = {}
+    # Chunk the IN list to stay under SQLite's bound parameter limit
+    for start in range(0, len(unique_ids), 500):
+      chunk = unique_ids[start : start + 500]
+      for db_trace in self.db.query(TraceDB).filter(TraceDB.id.in_(chunk)).all():
+        traces[db_trace.id] = self._trace_from_db(db_trace)
+    return traces
+
   def get_traces_by_experiment(self, workshop_id: str, experiment_id: str) -> List[Trace]:
     """Get all traces for a workshop that were ingested from a specific MLflow experiment."""
     db_traces = self.db.query(TraceDB).filter(TraceDB.workshop_id == workshop_id, TraceDB.mlflow_experiment_id == experiment_id).all()
@@ -408,6 +528,69 @@ class DatabaseService:
 
     return result
 
+  # Trace import job operations
+  def create_trace_import_job(self, workshop_id: str, source: str, file_format: str) -> TraceImportJob:
+    """Create a pending offline trace import job."""
+    db_job = TraceImportJobDB(
+      id=str(uuid.uuid4()),
+      workshop_id=workshop_id,
+      source=source,
+      file_format=file_format,
+      status='pending',
+      records_read=0,
+      traces_imported=0,
+      records_skipped=0,
+      errors=[],
+    )
+    self.db.add(db_job)
+    self.db.commit()
+    return self._trace_import_job_from_db(db_job)
+
+  def get_trace_import_job(self, job_id: str) -> Optional[TraceImportJob]:
+    """Get an offline trace import job."""
+    db_job = self.db.query(TraceImportJobDB).filter(TraceImportJobDB.id == job_id).first()
+    return self._trace_import_job_from_db(db_job) if db_job else None
+
+  def update_trace_import_job(
+    self,
+    job_id: str,
+    status: Optional[str] = None,
+    counters: Optional[Dict[str, int]] = None,
+    errors: Optional[List[str]] = None,
+    started_at: Optional[datetime] = None,
+    finished_at: Optional[datetime] = None,
+  ) -> None:
+    """Set a job's status, progress counters (records_read, traces_imported, records_skipped), errors or times."""
+    db_job = self.db.query(TraceImportJobDB).filter(TraceImportJobDB.id == job_id).first()
+    if not db_job:
+      return
+    if status is not None:
+      db_job.status = status
+    for key, value in (counters or {}).items():
+      setattr(db_job, key, value)
+    if errors is not None:
+      db_job.errors = list(errors)
+    if started_at is not None:
+      db_job.started_at = started_at
+    if finished_at is not None:
+      db_job.finished_at = finished_at
+    self.db.commit()
+
+  def _trace_import_job_from_db(self, db_job: TraceImportJobDB) -> TraceImportJob:
+    return TraceImportJob(
+      id=db_job.id,
+      workshop_id=db_job.workshop_id,
+      source=db_job.source,
+      file_format=db_job.file_format,
+      status=db_job.status,
+      records_read=db_job.records_read or 0,
+      traces_imported=db_job.traces_imported or 0,
+      records_skipped=db_job.records_skipped or 0,
+      errors=db_job.errors or [],
+      started_at=db_job.started_at,
+      finished_at=db_job.finished_at,
+    )
+
   # Discovery finding operations
   def add_finding(self, workshop_id: str, finding_data: DiscoveryFindingCreate) -> DiscoveryFinding:
     """Add a discovery finding."""
@@ -659,6 +842,7 @@ class DatabaseService:
       existing_annotation.rating = annotation_data.rating
       existing_annotation.ratings = annotation_data.ratings  # Support multiple ratings
       existing_annotation.comment = annotation_data.comment
+      self._refresh_trace_consensus(existing_annotation.workshop_id, [existing_annotation.trace_id])
       self.db.commit()
       self.db.refresh(existing_annotation)
 
@@ -686,6 +870,7 @@ class DatabaseService:
         comment=annotation_data.comment,
       )
       self.db.add(db_annotation)
+      self._refresh_trace_consensus(workshop_id, [annotation_data.trace_id])
       self.db.commit()
       self.db.refresh(db_annotation)
 
@@ -703,7 +888,8 @@ class DatabaseService:
 
   def get_annotations(self, workshop_id: str, user_id: Optional[str] = None) -> List[Annotation]:
     """Get annotations for a workshop, optionally filtered by user."""
-    query = self.db.query(AnnotationDB).join(TraceDB).filter(AnnotationDB.workshop_id == workshop_id)
+    # Load the joined trace with the annotation so mlflow_trace_id doesn't trigger a query per row
+    query = self.db.query(AnnotationDB).join(TraceDB).options(contains_eager(AnnotationDB.trace)).filter(AnnotationDB.workshop_id == workshop_id)
 
     # Filter by user_id if provided
     if user_id:
@@ -726,6 +912,85 @@ class DatabaseService:
       for db_annotation in db_annotations
     ]
 
+  # Trace consensus operations
+  def get_trace_consensus(
+    self,
+    workshop_id: str,
+    question_ids: Optional[Sequence[str]] = (OVERALL_QUESTION_ID,),
+    trace_ids: Optional[Iterable[str]] = None,
+  ) -> List[TraceConsensus]:
+    """Get consensus ratings in trace order, for the given questions (None for all) and traces."""
+    query = (
+      self.db.query(TraceConsensusDB)
+      .join(TraceDB, TraceDB.id == TraceConsensusDB.trace_id)
+      .filter(TraceConsensusDB.workshop_id == workshop_id)
+    )
+    if question_ids is not None:
+      query = query.filter(TraceConsensusDB.question_id.in_(list(question_ids)))
+    if trace_ids is not None:
+      query = query.filter(TraceConsensusDB.trace_id.in_(list(trace_ids)))
+
+    return [
+      TraceConsensus(
+        workshop_id=db_consensus.workshop_id,
+        trace_id=db_consensus.trace_id,
+        question_id=db_consensus.question_id,
+        mode=db_consensus.mode,
+        count=db_consensus.count,
+        distribution=db_consensus.distribution or {},
+        agreement=db_consensus.agreement,
+        updated_at=db_consensus.updated_at,
+      )
+      for db_consensus in query.order_by(TraceDB.created_at, TraceDB.id, TraceConsensusDB.question_id).all()
+    ]
+
+  def get_rater_ratings(self, workshop_id: str, question_id: str = OVERALL_QUESTION_ID) -> Tuple[List[str], List[str], List[int]]:
+    """Parallel ``(trace_ids, user_ids, ratings)`` of every rating for one question, reading only those columns."""
+    rating_column = AnnotationDB.rating if question_id == OVERALL_QUESTION_ID else AnnotationDB.ratings
+    rows = (
+      self.db.query(AnnotationDB.trace_id, AnnotationDB.user_id, rating_column)
+      .filter(AnnotationDB.workshop_id == workshop_id)
+      .order_by(AnnotationDB.created_at, AnnotationDB.id)
+    )
+
+    trace_ids: List[str] = []
+    user_ids: List[str] = []
+    ratings: List[int] = []
+    for trace_id, user_id, value in rows:
+      if question_id != OVERALL_QUESTION_ID:
+        value = (value or {}).get(question_id)
+      if value is not None:
+        trace_ids.append(trace_id)
+        user_ids.append(user_id)
+        ratings.append(int(value))
+    return trace_ids, user_ids, ratings
+
+  def refresh_trace_consensus(self, workshop_id: str, trace_ids: Optional[List[str]] = None) -> None:
+    """Recompute consensus ratings for some traces, or the whole workshop after bulk annotation writes."""
+    self._refresh_trace_consensus(workshop_id, trace_ids)
+    self.db.commit()
+    if trace_ids is None:
+      # Bulk writes (e.g. demo annotations) bypass add_annotation, so drop the workshop's fits too
+      dawid_skene_models.invalidate(workshop_id)
+
+  def _refresh_trace_consensus(self, workshop_id: str, trace_ids: Optional[List[str]]) -> None:
+    """Replace the consensus rows of the given traces from their annotations, without committing."""
+    # Sessions do not autoflush, so pending annotation writes must reach the query below
+    self.db.flush()
+    consensus_query = self.db.query(TraceConsensusDB).filter(TraceConsensusDB.workshop_id == workshop_id)
+    annotation_query = self.db.query(AnnotationDB.trace_id, AnnotationDB.rating, AnnotationDB.ratings).filter(AnnotationDB.workshop_id == workshop_id)
+    if trace_ids is not None:
+      consensus_query = consensus_query.filter(TraceConsensusDB.trace_id.in_(trace_ids))
+      annotation_query = annotation_query.filter(AnnotationDB.trace_id.in_(trace_ids))
+    consensus_query.delete(synchronize_session=False)
+
+    annotations_by_trace: Dict[str, List[Tuple[Optional[int], Optional[Dict[str, Any]]]]] = {}
+    for trace_id, rating, ratings in annotation_query.order_by(AnnotationDB.created_at, AnnotationDB.id):
+      annotations_by_trace.setdefault(trace_id, []).append((rating, ratings))
+    rows = [row for trace_id, annotations in annotations_by_trace.items() for row in consensus_rows(workshop_id, trace_id, annotations)]
+    if rows:
+      self.db.execute(insert(TraceConsensusDB), rows)
+
   def get_annotations_with_user_details(self, workshop_id: str, user_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """Get annotations with user details for facilitator view."""
     query = self.db.query(AnnotationDB, UserDB).join(UserDB, AnnotationDB.user_id == UserDB.id).filter(AnnotationDB.workshop_id == workshop_id)
@@ -1218,7 +1483,9 @@ class DatabaseService:
   def clear_annotations(self, workshop_id: str) -> None:
     """Clear all annotations for a workshop (for testing)."""
     self.db.query(AnnotationDB).filter(AnnotationDB.workshop_id == workshop_id).delete()
+    self.db.query(TraceConsensusDB).filter(TraceConsensusDB.workshop_id == workshop_id).delete()
     self.db.commit()
+    dawid_skene_models.invalidate(workshop_id)
 
   def clear_rubric(self, workshop_id: str) -> None:
     """Clear the rubric for a workshop (for testing)."""
@@ -1237,6 +1504,7 @@ class DatabaseService:
       existing_config.experiment_id = config_data.experiment_id
       existing_config.max_traces = config_data.max_traces
       existing_config.filter_string = config_data.filter_string
+      existing_config.span_compaction = config_data.span_compaction.model_dump() if config_data.span_compaction else None
       existing_config.is_ingested = False
       existing_config.trace_count = 0
       existing_config.last_ingestion_time = None
@@ -1251,6 +1519,7 @@ class DatabaseService:
         experiment_id=existing_config.experiment_id,
         max_traces=existing_config.max_traces,
         filter_string=existing_config.filter_string,
+        span_compaction=self._span_compaction_from_db(existing_config),
       )
     else:
       # Create new config
@@ -1262,6 +1531,7 @@ class DatabaseService:
         experiment_id=config_data.experiment_id,
         max_traces=config_data.max_traces,
         filter_string=config_data.filter_string,
+        span_compaction=config_data.span_compaction.model_dump() if config_data.span_compaction else None,
       )
 
       self.db.add(db_config)
@@ -1274,6 +1544,7 @@ class DatabaseService:
         experiment_id=db_config.experiment_id,
         max_traces=db_config.max_traces,
         filter_string=db_config.filter_string,
+        span_compaction=self._span_compaction_from_db(db_config),
       )
 
   def get_mlflow_config(self, workshop_id: str) -> Optional[MLflowIntakeConfig]:
@@ -1289,8 +1560,21 @@ class DatabaseService:
       experiment_id=db_config.experiment_id,
       max_traces=db_config.max_traces,
       filter_string=db_config.filter_string,
+      span_compaction=self._span_compaction_from_db(db_config),
     )
 
+  def _span_compaction_from_db(self, db_config: MLflowIntakeConfigDB) -> Optional[SpanCompactionConfig]:
+    """Convert the stored span compaction settings to a model."""
+    stored = getattr(db_config, 'span_compaction', None)
+    if not stored:
+      return None
+    try:
+      return SpanCompactionConfig(**stored)
+    except ValidationError as e:
+      # Settings saved before the mode was validated fall back to the defaults
+      print(f'⚠️ Ignoring invalid span compaction settings for workshop {db_config.workshop_id}: {e}')
+      return None
+
   def update_mlflow_ingestion_status(self, workshop_id: str, trace_count: int, error_message: Optional[str] = None) -> None:
     """Update MLflow ingestion status for a workshop."""
     db_config = self.db.query(MLflowIntakeConfigDB).filter(MLflowIntakeConfigDB.workshop_id == workshop_id).first()
@@ -1321,6 +1605,7 @@ class DatabaseService:
       experiment_id=db_config.experiment_id,
       max_traces=db_config.max_traces,
       filter_string=db_config.filter_string,
+      span_compaction=self._span_compaction_from_db(db_config),
     )
 
     return MLflowIntakeStatus(
@@ -1416,52 +1701,338 @@ class DatabaseService:
       db_prompt.performance_metrics = metrics
       self.db.commit()
 
-  def store_judge_evaluations(self, evaluations: List[JudgeEvaluation]) -> None:
-    """Store judge evaluation results."""
-    # Clear existing evaluations for this prompt
-    if evaluations:
-      self.db.query(JudgeEvaluationDB).filter(JudgeEvaluationDB.prompt_id == evaluations[0].prompt_id).delete()
-
-    # Add new evaluations
-    for evaluation in evaluations:
-      db_evaluation = JudgeEvaluationDB(
-        id=evaluation.id,
-        workshop_id=evaluation.workshop_id,
-        prompt_id=evaluation.prompt_id,
-        trace_id=evaluation.trace_id,
-        predicted_rating=evaluation.predicted_rating,
-        human_rating=evaluation.human_rating,
-        confidence=evaluation.confidence,
-        reasoning=evaluation.reasoning,
-      )
-      self.db.add(db_evaluation)
-
-    self.db.commit()
+  def store_judge_evaluations(self, evaluations: List[JudgeEvaluation]) -> Optional[JudgeEvaluationRun]:
+    """Store judge evaluation results as a new completed run in the prompt's history."""
+    if not evaluations:
+      return None
+    workshop_id, prompt_id = evaluations[0].workshop_id, evaluations[0].prompt_id
+    run = self.create_judge_evaluation_run(workshop_id, prompt_id, [evaluation.trace_id for evaluation in evaluations], {})
+    self.checkpoint_judge_evaluation_run(run.id, evaluations)
+    self.update_judge_evaluation_run(run.id, 'completed')
+    return self.get_judge_evaluation_run(workshop_id, run.id)
 
   def get_judge_evaluations(self, workshop_id: str, prompt_id: str) -> List[JudgeEvaluation]:
-    """Get evaluation results for a judge prompt."""
-    db_evaluations = (
-      self.db.query(JudgeEvaluationDB).filter(and_(JudgeEvaluationDB.workshop_id == workshop_id, JudgeEvaluationDB.prompt_id == prompt_id)).all()
+    """Get evaluation results of the latest run of a judge prompt."""
+    db_run = (
+      self.db.query(JudgeEvaluationRunDB)
+      .filter(JudgeEvaluationRunDB.workshop_id == workshop_id, JudgeEvaluationRunDB.prompt_id == prompt_id)
+      .order_by(JudgeEvaluationRunDB.run_number.desc(), JudgeEvaluationRunDB.created_at.desc())
+      .first()
+    )
+    return self.get_judge_run_evaluations(workshop_id, db_run.id) if db_run else []
+
+  def get_judge_run_evaluations(self, workshop_id: str, run_id: str) -> List[JudgeEvaluation]:
+    """Get the evaluation results recorded by one run."""
+    rows = (
+      self.db.query(JudgeRunResultDB, JudgeEvaluationRunDB.prompt_id, JudgeOutputDB.text)
+      .join(JudgeEvaluationRunDB, JudgeRunResultDB.run_id == JudgeEvaluationRunDB.id)
+      .outerjoin(JudgeOutputDB, JudgeRunResultDB.output_id == JudgeOutputDB.id)
+      .filter(JudgeEvaluationRunDB.workshop_id == workshop_id, JudgeRunResultDB.run_id == run_id)
+      .all()
     )
 
     return [
       JudgeEvaluation(
-        id=db_eval.id,
-        workshop_id=db_eval.workshop_id,
-        prompt_id=db_eval.prompt_id,
-        trace_id=db_eval.trace_id,
-        predicted_rating=db_eval.predicted_rating,
-        human_rating=db_eval.human_rating,
-        confidence=db_eval.confidence,
-        reasoning=db_eval.reasoning,
+        id=db_result.evaluation_id,
+        workshop_id=workshop_id,
+        prompt_id=prompt_id,
+        trace_id=db_result.trace_id,
+        predicted_rating=db_result.predicted_rating,
+        human_rating=db_result.human_rating,
+        confidence=db_result.confidence,
+        reasoning=reasoning,
       )
-      for db_eval in db_evaluations
+      for db_result, prompt_id, reasoning in rows
     ]
 
-  def clear_judge_evaluations(self, workshop_id: str, prompt_id: str) -> None:
-    """Clear all evaluation results for a specific judge prompt."""
-    self.db.query(JudgeEvaluationDB).filter(and_(JudgeEvaluationDB.workshop_id == workshop_id, JudgeEvaluationDB.prompt_id == prompt_id)).delete()
+  def diff_judge_evaluation_runs(self, workshop_id: str, base_run_id: str, compare_run_id: str) -> JudgeRunDiff:
+    """Compare the per-trace results of two runs of the same workshop with set-based queries.
+
+    Raises:
+        ValueError: If either run does not belong to the workshop
+    """
+    # Both runs must belong to the workshop
+    run_count = (
+      self.db.query(func.count(JudgeEvaluationRunDB.id))
+      .filter(JudgeEvaluationRunDB.workshop_id == workshop_id, JudgeEvaluationRunDB.id.in_([base_run_id, compare_run_id]))
+      .scalar()
+    )
+    if run_count < len({base_run_id, compare_run_id}):
+      raise ValueError('Both evaluation runs must belong to the workshop')
+
+    base = aliased(JudgeRunResultDB)
+    compare = aliased(JudgeRunResultDB)
+    base_output = aliased(JudgeOutputDB)
+    compare_output = aliased(JudgeOutputDB)
+    pairs = self.db.query(base, compare).join(compare, and_(compare.trace_id == base.trace_id, compare.run_id == compare_run_id)).filter(
+      base.run_id == base_run_id
+    )
+
+    common, changed, improved, regressed = pairs.with_entities(
+      func.count(),
+      func.coalesce(func.sum(case((base.predicted_rating != compare.predicted_rating, 1), else_=0)), 0),
+      func.coalesce(
+        func.sum(case((and_(base.predicted_rating != base.human_rating, compare.predicted_rating == compare.human_rating), 1), else_=0)), 0
+      ),
+      func.coalesce(
+        func.sum(case((and_(base.predicted_rating == base.human_rating, compare.predicted_rating != compare.human_rating), 1), else_=0)), 0
+      ),
+    ).one()
+
+    changes = (
+      pairs.with_entities(
+        base.trace_id,
+        compare.human_rating,
+        base.predicted_rating,
+        compare.predicted_rating,
+        base_output.text,
+        compare_output.text,
+      )
+      .outerjoin(base_output, base.output_id == base_output.id)
+      .outerjoin(compare_output, compare.output_id == compare_output.id)
+      .filter(base.predicted_rating != compare.predicted_rating)
+      .order_by(base.trace_id)
+      .all()
+    )
+
+    def only_in(run_id: str, other_run_id: str) -> List[str]:
+      other = aliased(JudgeRunResultDB)
+      scored_by_other = self.db.query(other.trace_id).filter(other.run_id == other_run_id, other.trace_id == JudgeRunResultDB.trace_id)
+      rows = self.db.query(JudgeRunResultDB.trace_id).filter(JudgeRunResultDB.run_id == run_id, ~scored_by_other.exists())
+      return [trace_id for (trace_id,) in rows.order_by(JudgeRunResultDB.trace_id)]
+
+    return JudgeRunDiff(
+      base_run_id=base_run_id,
+      compare_run_id=compare_run_id,
+      common_traces=common,
+      changed_traces=changed,
+      improved_traces=improved,
+      regressed_traces=regressed,
+      changes=[
+        JudgeRunDiffItem(
+          trace_id=trace_id,
+          human_rating=human_rating,
+          base_rating=base_rating,
+          compare_rating=compare_rating,
+          base_reasoning=base_reasoning,
+          compare_reasoning=compare_reasoning,
+        )
+        for trace_id, human_rating, base_rating, compare_rating, base_reasoning, compare_reasoning in changes
+      ],
+      only_in_base=only_in(base_run_id, compare_run_id),
+      only_in_compare=only_in(compare_run_id, base_run_id),
+    )
+
+  # Judge evaluation run operations
+  def create_judge_evaluation_run(self, workshop_id: str, prompt_id: str, trace_ids: List[str], options: Dict[str, Any]) -> JudgeEvaluationRun:
+    """Start a judge evaluation run for a prompt. Earlier runs and their results are kept.
+
+    The run number is the prompt's highest so far plus one. If a concurrent run takes
+    the same number first, the unique (prompt_id, run_number) constraint rejects the
+    insert and the next number is tried.
+    """
+    for attempt in range(RUN_NUMBER_ATTEMPTS):
+      previous = self.db.query(func.max(JudgeEvaluationRunDB.run_number)).filter(JudgeEvaluationRunDB.prompt_id == prompt_id).scalar()
+      db_run = JudgeEvaluationRunDB(
+        id=str(uuid.uuid4()),
+        workshop_id=workshop_id,
+        prompt_id=prompt_id,
+        run_number=(previous or 0) + 1,
+        status='running',
+        trace_ids=list(trace_ids),
+        options=options,
+        completed_traces=0,
+        failed_traces=0,
+      )
+      self.db.add(db_run)
+      try:
+        self.db.commit()
+      except IntegrityError:
+        self.db.rollback()
+        if attempt == RUN_NUMBER_ATTEMPTS - 1:
+          raise
+        continue
+      self.db.refresh(db_run)
+      return self._judge_evaluation_run_from_db(db_run)
+
+  def get_judge_evaluation_run(self, workshop_id: str, run_id: str) -> Optional[JudgeEvaluationRun]:
+    """Get a judge evaluation run."""
+    db_run = self.db.query(JudgeEvaluationRunDB).filter(JudgeEvaluationRunDB.workshop_id == workshop_id, JudgeEvaluationRunDB.id == run_id).first()
+    return self._judge_evaluation_run_from_db(db_run) if db_run else None
+
+  def list_judge_evaluation_runs(self, workshop_id: str, prompt_id: Optional[str] = None) -> List[JudgeEvaluationRun]:
+    """List judge evaluation runs, newest first."""
+    query = self.db.query(JudgeEvaluationRunDB).filter(JudgeEvaluationRunDB.workshop_id == workshop_id)
+    if prompt_id:
+      query = query.filter(JudgeEvaluationRunDB.prompt_id == prompt_id)
+    query = query.order_by(JudgeEvaluationRunDB.created_at.desc(), JudgeEvaluationRunDB.run_number.desc())
+    return [self._judge_evaluation_run_from_db(db_run) for db_run in query.all()]
+
+  def checkpoint_judge_evaluation_run(self, run_id: str, evaluations: List[JudgeEvaluation]) -> None:
+    """Append evaluations to a run and count them as completed, in one commit.
+
+    Results are bulk inserted. Reasoning text is stored once per workshop and shared
+    by every result that produced the same text, across runs.
+    """
+    if not evaluations:
+      return
+    workshop_id = evaluations[0].workshop_id
+
+    outputs = {judge_output_id(workshop_id, evaluation.reasoning): evaluation.reasoning for evaluation in evaluations if evaluation.reasoning is not None}
+    if outputs:
+      existing = {output_id for (output_id,) in self.db.query(JudgeOutputDB.id).filter(JudgeOutputDB.id.in_(outputs))}
+      new_outputs = [{'id': output_id, 'workshop_id': workshop_id, 'text': text} for output_id, text in outputs.items() if output_id not in existing]
+      if new_outputs:
+        self.db.execute(insert(JudgeOutputDB), new_outputs)
+
+    self.db.execute(
+      insert(JudgeRunResultDB),
+      [
+        {
+          'run_id': run_id,
+          'trace_id': evaluation.trace_id,
+          'evaluation_id': evaluation.id,
+          'predicted_rating': evaluation.predicted_rating,
+          'human_rating': evaluation.human_rating,
+          'confidence': evaluation.confidence,
+          'output_id': judge_output_id(workshop_id, evaluation.reasoning) if evaluation.reasoning is not None else None,
+        }
+        for evaluation in evaluations
+      ],
+    )
+    self.db.query(JudgeEvaluationRunDB).filter(JudgeEvaluationRunDB.id == run_id).update(
+      {JudgeEvaluationRunDB.completed_traces: JudgeEvaluationRunDB.completed_traces + len(evaluations)}, synchronize_session=False
+    )
+    self.db.commit()
+
+  def update_judge_evaluation_run(
+    self,
+    run_id: str,
+    status: str,
+    completed_traces: Optional[int] = None,
+    failed_traces: Optional[int] = None,
+    error: Optional[str] = None,
+    metrics: Optional[Dict[str, Any]] = None,
+  ) -> None:
+    """Set a run's status, and optionally its progress counts, error and final metrics."""
+    db_run = self.db.query(JudgeEvaluationRunDB).filter(JudgeEvaluationRunDB.id == run_id).first()
+    if not db_run:
+      return
+    db_run.status = status
+    db_run.error = error
+    if completed_traces is not None:
+      db_run.completed_traces = completed_traces
+    if failed_traces is not None:
+      db_run.failed_traces = failed_traces
+    if metrics is not None:
+      db_run.metrics = metrics
+    self.db.commit()
+
+  def _judge_evaluation_run_from_db(self, db_run: JudgeEvaluationRunDB) -> JudgeEvaluationRun:
+    return JudgeEvaluationRun(
+      id=db_run.id,
+      workshop_id=db_run.workshop_id,
+      prompt_id=db_run.prompt_id,
+      run_number=db_run.run_number,
+      status=db_run.status,
+      trace_ids=db_run.trace_ids or [],
+      options=db_run.options or {},
+      total_traces=len(db_run.trace_ids or []),
+      completed_traces=db_run.completed_traces or 0,
+      failed_traces=db_run.failed_traces or 0,
+      metrics=db_run.metrics,
+      error=db_run.error,
+      created_at=db_run.created_at,
+      updated_at=db_run.updated_at,
+    )
+
+  # Judge call telemetry operations
+  def add_judge_call_telemetry(self, rows: List[Dict[str, Any]]) -> None:
+    """Store telemetry rows of judge model calls in one commit."""
+    self.db.add_all([JudgeCallTelemetryDB(id=str(uuid.uuid4()), **row) for row in rows])
+    self.db.commit()
+
+  def get_judge_call_telemetry(self, workshop_id: str, prompt_id: Optional[str] = None, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Telemetry rows of a workshop's judge calls, optionally for one prompt or run."""
+    query = self.db.query(JudgeCallTelemetryDB).filter(JudgeCallTelemetryDB.workshop_id == workshop_id)
+    if prompt_id:
+      query = query.filter(JudgeCallTelemetryDB.prompt_id == prompt_id)
+    if run_id:
+      query = query.filter(JudgeCallTelemetryDB.run_id == run_id)
+    columns = [column.name for column in JudgeCallTelemetryDB.__table__.columns]
+    return [{column: getattr(db_row, column) for column in columns} for db_row in query.all()]
+
+  # Judge result cache operations
+  def get_judge_cache_entries(self, workshop_id: str, cache_keys: List[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+    """Look up cached judge outputs and mark the hits as recently used.
+
+    Returns:
+        (predicted_rating, reasoning) keyed by cache key, for the keys that were found
+    """
+    if not cache_keys:
+      return {}
+
+    entries = (
+      self.db.query(JudgeResultCacheDB)
+      .filter(JudgeResultCacheDB.workshop_id == workshop_id, JudgeResultCacheDB.cache_key.in_(list(set(cache_keys))))
+      .all()
+    )
+    now = datetime.now()
+    results = {}
+    for entry in entries:
+      entry.hit_count = (entry.hit_count or 0) + 1
+      entry.last_used_at = now
+      results[entry.cache_key] = (entry.predicted_rating, entry.reasoning)
+    if entries:
+      self.db.commit()
+    return results
+
+  def store_judge_cache_entries(self, workshop_id: str, model_name: str, entries: Dict[str, Tuple[int, Optional[str]]], max_entries: int) -> int:
+    """Store judge outputs in the cache, then evict least recently used entries beyond ``max_entries``.
+
+    Returns:
+        Number of evicted entries
+    """
+    if entries:
+      existing_keys = {
+        row.cache_key
+        for row in self.db.query(JudgeResultCacheDB.cache_key)
+        .filter(JudgeResultCacheDB.workshop_id == workshop_id, JudgeResultCacheDB.cache_key.in_(list(entries.keys())))
+        .all()
+      }
+      self.db.add_all(
+        [
+          JudgeResultCacheDB(
+            workshop_id=workshop_id,
+            cache_key=cache_key,
+            model_name=model_name,
+            predicted_rating=predicted_rating,
+            reasoning=reasoning,
+          )
+          for cache_key, (predicted_rating, reasoning) in entries.items()
+          if cache_key not in existing_keys
+        ]
+      )
+      self.db.commit()
+
+    # Size-based eviction across all workshops, least recently used first
+    overflow = self.db.query(JudgeResultCacheDB).count() - max_entries
+    if overflow <= 0:
+      return 0
+    stale_ids = [row.id for row in self.db.query(JudgeResultCacheDB.id).order_by(JudgeResultCacheDB.last_used_at.asc()).limit(overflow).all()]
+    self.db.query(JudgeResultCacheDB).filter(JudgeResultCacheDB.id.in_(stale_ids)).delete(synchronize_session=False)
+    self.db.commit()
+    return len(stale_ids)
+
+  def count_judge_cache_entries(self, workshop_id: str) -> int:
+    """Count cached judge outputs for a workshop."""
+    return self.db.query(JudgeResultCacheDB).filter(JudgeResultCacheDB.workshop_id == workshop_id).count()
+
+  def clear_judge_cache(self, workshop_id: str) -> int:
+    """Delete all cached judge outputs for a workshop."""
+    deleted = self.db.query(JudgeResultCacheDB).filter(JudgeResultCacheDB.workshop_id == workshop_id).delete()
     self.db.commit()
+    return deleted
 
   # User trace order operations
   def get_user_trace_order(self, workshop_id: str, user_id: str) -> Optional[UserTraceOrder]:
@@ -1537,6 +2108,7 @@ class DatabaseService:
       mlflow_url=trace.mlflow_url,
       mlflow_host=trace.mlflow_host,
       mlflow_experiment_id=trace.mlflow_experiment_id,
+      token_estimate=estimate_trace_tokens(trace.input, trace.output),
     )
 
   def _trace_from_db(self, db_trace: TraceDB) -> Trace:
@@ -1552,5 +2124,6 @@ class DatabaseService:
       mlflow_url=db_trace.mlflow_url,
       mlflow_host=db_trace.mlflow_host,
       mlflow_experiment_id=db_trace.mlflow_experiment_id,
+      token_estimate=db_trace.token_estimate,
       created_at=db_trace.created_at,
     )
@@ -11,6 +11,10 @@ import requests
 from fastapi import HTTPException
 from openai import OpenAI
 
+from server.services.endpoint_scheduler import get_endpoint_scheduler, is_throttle_error, retry_after_seconds
+from server.services.judge_telemetry import report_response_usage, report_usage
+from server.services.serving_judge import get_http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -119,8 +123,8 @@ class DatabricksService:
       logger.info(f'Calling Databricks serving endpoint: {endpoint_name}')
       logger.debug(f'Request parameters: {request_params}')
 
-      # Make the API call using OpenAI client
-      response = self.client.chat.completions.create(**request_params)
+      # Make the API call using OpenAI client, scheduled per endpoint (the scheduler retries 429s)
+      response = self._scheduled_completion(endpoint_name, request_params)
 
       # Convert response to dictionary format
       result = {
@@ -148,11 +152,26 @@ class DatabricksService:
       return result
 
     except Exception as e:
+      if is_throttle_error(e):
+        # Keep it a 429, so the endpoint scheduler (or an outer scheduled call) backs off and retries
+        retry_after = retry_after_seconds(e)
+        headers = {'Retry-After': f'{retry_after:g}'} if retry_after is not None else None
+        raise HTTPException(status_code=429, detail=f'Serving endpoint throttled the request: {str(e)}', headers=headers) from e
       logger.error(f'Error calling serving endpoint {endpoint_name}: {e}')
       logger.error(f'Error type: {type(e)}')
       logger.error('Full traceback:', exc_info=True)
       raise HTTPException(status_code=500, detail=f'Error calling serving endpoint: {str(e)}')
 
+  def _scheduled_completion(self, endpoint_name: str, request_params: Dict[str, Any]):
+    """Create a chat completion through the endpoint's adaptive scheduler."""
+    # The client's own retries would hide 429s from the scheduler
+    client = self.client.with_options(max_retries=0)
+    response = get_endpoint_scheduler(endpoint_name).call(client.chat.completions.create, **request_params)
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+      report_usage(usage.prompt_tokens, usage.completion_tokens)
+    return response
+
   def list_serving_endpoints(self) -> List[Dict[str, Any]]:
     """List all available serving endpoints.
     Note: This method returns a placeholder since OpenAI client doesn't provide endpoint listing.
@@ -286,8 +305,8 @@ class DatabricksService:
       logger.info(f'Calling Databricks serving endpoint with chat completion: {endpoint_name}')
       logger.debug(f'Request parameters: {request_params}')
 
-      # Make the API call using OpenAI client
-      response = self.client.chat.completions.create(**request_params)
+      # Make the API call using OpenAI client, scheduled per endpoint (the scheduler retries 429s)
+      response = self._scheduled_completion(endpoint_name, request_params)
 
       # Convert response to dictionary format
       result = {
@@ -315,6 +334,11 @@ class DatabricksService:
       return result
 
     except Exception as e:
+      if is_throttle_error(e):
+        # Keep it a 429, so the endpoint scheduler (or an outer scheduled call) backs off and retries
+        retry_after = retry_after_seconds(e)
+        headers = {'Retry-After': f'{retry_after:g}'} if retry_after is not None else None
+        raise HTTPException(status_code=429, detail=f'Serving endpoint throttled the request: {str(e)}', headers=headers) from e
       logger.error(f'Error calling serving endpoint {endpoint_name}: {e}')
       logger.error(f'Error type: {type(e)}')
       logger.error('Full traceback:', exc_info=True)
@@ -367,7 +391,15 @@ class DatabricksService:
       print(f'Using token starting with: {token_prefix}...')
 
       # Make the HTTP request
-      response = requests.post(api_url, headers=headers, json=payload, timeout=60)
+      # Pooled keep-alive session shared with the serving judge backend (retries 5xx)
+      def post() -> requests.Response:
+        response = get_http_session().post(api_url, headers=headers, json=payload, timeout=60)
+        if response.status_code == 429:
+          # Raised so the endpoint scheduler backs off and retries
+          response.raise_for_status()
+        return response
+
+      response = get_endpoint_scheduler(endpoint_name).call(post)
 
       # Add detailed error logging for 403 errors
       if response.status_code == 403:
@@ -382,6 +414,7 @@ class DatabricksService:
 
       # Parse the response
       result = response.json()
+      report_response_usage(result)
 
       logger.info(f'Successfully called serving endpoint: {endpoint_name}')
       logger.debug(f'Response: {result}')
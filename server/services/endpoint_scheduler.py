@@ -0,0 +1,264 @@
+"""Adaptive per-endpoint scheduling of LLM serving calls.
+
+Every model serving endpoint gets one process-wide scheduler. JudgeService and
+DatabricksService both route their calls through it. A scheduler combines:
+
+- a token bucket that caps the request rate (``JUDGE_REQUESTS_PER_MINUTE``, 0 = uncapped);
+- an AIMD concurrency limit. The limit grows by about one slot per window of successful
+  calls and halves on a 429. It shrinks more gently when latency climbs well above the
+  best latency observed, which indicates queueing at the endpoint;
+- ``Retry-After`` handling. A throttled response pauses every caller of the endpoint
+  for the advertised time, or an exponential backoff when none is given, and the
+  call is retried.
+
+Throughput therefore settles near what the endpoint can actually serve. ``stats()``
+exposes throttling, retries, in-flight calls and queue depth. Per-call queue wait and
+retries are also reported to the judge telemetry record of the calling thread.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from server.config import ServerConfig
+from server.services.judge_telemetry import current_call
+
+# AIMD tuning
+DECREASE_FACTOR = 0.5  # Multiplicative decrease on a 429
+LATENCY_DECREASE_FACTOR = 0.9  # Gentler decrease when latency signals queueing
+LATENCY_TOLERANCE = 2.0  # Latency above this multiple of the best observed counts as congestion
+LATENCY_EWMA_ALPHA = 0.2
+MAX_BACKOFF_SECONDS = 60.0
+
+# Substrings identifying throttling in errors that carry no status code (e.g. MLflow judge justifications)
+THROTTLE_MARKERS = ('429', 'too many requests', 'rate limit', 'rate_limit', 'request_limit_exceeded')
+
+
+class EndpointThrottledError(Exception):
+  """A serving endpoint rejected a call because of rate limiting."""
+
+  def __init__(self, message: str, retry_after: Optional[float] = None):
+    super().__init__(message)
+    self.retry_after = retry_after
+
+
+def is_throttle_message(text: Optional[str]) -> bool:
+  """Whether an error message looks like a rate-limit rejection."""
+  lowered = (text or '').lower()
+  return any(marker in lowered for marker in THROTTLE_MARKERS)
+
+
+def _parse_retry_after(value: Any) -> Optional[float]:
+  """Parse a ``Retry-After`` header given in seconds or as an HTTP date."""
+  if value is None:
+    return None
+  try:
+    return max(0.0, float(value))
+  except (TypeError, ValueError):
+    pass
+  try:
+    return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+  except (TypeError, ValueError):
+    return None
+
+
+def is_throttle_error(error: BaseException) -> bool:
+  """Whether an error raised by a serving call is a rate-limit rejection."""
+  if isinstance(error, EndpointThrottledError):
+    return True
+  # requests.HTTPError as well as httpx/OpenAI status errors expose the status code
+  response = getattr(error, 'response', None)
+  return (getattr(error, 'status_code', None) or getattr(response, 'status_code', None)) == 429
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+  """The delay a throttled endpoint asked for, or None if it sent no ``Retry-After``."""
+  if isinstance(error, EndpointThrottledError):
+    return error.retry_after
+  # HTTPException(429) re-raised by a service keeps the endpoint's headers on the error itself
+  headers = getattr(getattr(error, 'response', None), 'headers', None) or getattr(error, 'headers', None) or {}
+  return _parse_retry_after(headers.get('Retry-After') or headers.get('retry-after'))
+
+
+class EndpointScheduler:
+  """Token bucket plus AIMD concurrency limit for one serving endpoint."""
+
+  def __init__(
+    self,
+    endpoint: str,
+    requests_per_minute: float = 0,
+    max_concurrency: int = 32,
+    min_concurrency: int = 1,
+    max_retries: int = 5,
+    backoff_seconds: float = 1.0,
+  ):
+    self.endpoint = endpoint
+    self.max_concurrency = max(1, max_concurrency)
+    self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+    self.max_retries = max_retries
+    self.backoff_seconds = backoff_seconds
+
+    # Start halfway and let additive increase find the ceiling
+    self._limit = float(max(self.min_concurrency, self.max_concurrency // 2))
+    self._rate = requests_per_minute / 60.0 if requests_per_minute else 0.0
+    self._bucket_capacity = max(1.0, self._rate)
+    self._tokens = self._bucket_capacity
+    self._last_refill = time.monotonic()
+    self._paused_until = 0.0
+    self._last_decrease = 0.0
+    self._latency_ewma: Optional[float] = None
+    self._best_latency: Optional[float] = None
+
+    self._in_flight = 0
+    self._waiting = 0
+    self._peak_waiting = 0
+    self._counters = {'requests': 0, 'succeeded': 0, 'failed': 0, 'throttled': 0, 'retries': 0}
+
+    self._cond = threading.Condition()
+    self._local = threading.local()
+
+  def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run ``fn`` under the scheduler, retrying throttled attempts.
+
+    Nested calls for the same endpoint from inside ``fn`` run directly, so wrapping
+    at several layers cannot deadlock on the concurrency limit.
+    """
+    if getattr(self._local, 'active', False):
+      return fn(*args, **kwargs)
+
+    telemetry = current_call()
+    if telemetry is not None:
+      telemetry.endpoint = self.endpoint
+
+    attempt = 0
+    while True:
+      queued = time.monotonic()
+      self._acquire()
+      started = time.monotonic()
+      if telemetry is not None:
+        telemetry.queue_wait += started - queued
+      self._local.active = True
+      try:
+        result = fn(*args, **kwargs)
+      except Exception as e:
+        if not is_throttle_error(e):
+          self._release(failed=True)
+          raise
+        retry_after = retry_after_seconds(e)
+        if retry_after is None:
+          retry_after = min(MAX_BACKOFF_SECONDS, self.backoff_seconds * (2**attempt)) * random.uniform(0.8, 1.2)
+        self._release(throttled=True, pause=retry_after)
+        if attempt >= self.max_retries:
+          raise
+        attempt += 1
+        if telemetry is not None:
+          telemetry.retries += 1
+        with self._cond:
+          self._counters['retries'] += 1
+        continue
+      finally:
+        self._local.active = False
+
+      self._release(latency=time.monotonic() - started)
+      return result
+
+  def _acquire(self) -> None:
+    with self._cond:
+      self._waiting += 1
+      self._peak_waiting = max(self._peak_waiting, self._waiting)
+      try:
+        while True:
+          now = time.monotonic()
+          if now < self._paused_until:
+            self._cond.wait(self._paused_until - now)
+            continue
+          if self._in_flight >= int(self._limit):
+            self._cond.wait()
+            continue
+          if self._rate:
+            self._tokens = min(self._bucket_capacity, self._tokens + (now - self._last_refill) * self._rate)
+            self._last_refill = now
+            if self._tokens < 1.0:
+              self._cond.wait((1.0 - self._tokens) / self._rate)
+              continue
+            self._tokens -= 1.0
+          self._in_flight += 1
+          self._counters['requests'] += 1
+          return
+      finally:
+        self._waiting -= 1
+
+  def _release(self, latency: Optional[float] = None, throttled: bool = False, failed: bool = False, pause: float = 0.0) -> None:
+    with self._cond:
+      self._in_flight -= 1
+      now = time.monotonic()
+      # Calls already in flight when congestion starts report it too; decrease once per round trip
+      window = self._latency_ewma if self._latency_ewma is not None else 1.0
+      can_decrease = now - self._last_decrease >= window
+
+      if throttled:
+        self._counters['throttled'] += 1
+        self._paused_until = max(self._paused_until, now + pause)
+        if can_decrease:
+          self._limit = max(float(self.min_concurrency), self._limit * DECREASE_FACTOR)
+          self._last_decrease = now
+      elif failed:
+        self._counters['failed'] += 1
+      elif latency is not None:
+        self._counters['succeeded'] += 1
+        self._latency_ewma = latency if self._latency_ewma is None else LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * self._latency_ewma
+        self._best_latency = self._latency_ewma if self._best_latency is None else min(self._best_latency, self._latency_ewma)
+        if self._latency_ewma > self._best_latency * LATENCY_TOLERANCE:
+          if can_decrease:
+            self._limit = max(float(self.min_concurrency), self._limit * LATENCY_DECREASE_FACTOR)
+            self._last_decrease = now
+        else:
+          # Additive increase: about one extra slot per window of successful calls
+          self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+
+      self._cond.notify_all()
+
+  def stats(self) -> Dict[str, Any]:
+    """Snapshot of the scheduler state and counters."""
+    with self._cond:
+      return {
+        'endpoint': self.endpoint,
+        'concurrency_limit': round(self._limit, 2),
+        'max_concurrency': self.max_concurrency,
+        'in_flight': self._in_flight,
+        'queue_depth': self._waiting,
+        'peak_queue_depth': self._peak_waiting,
+        'requests_per_minute': self._rate * 60.0,
+        'paused_for_seconds': round(max(0.0, self._paused_until - time.monotonic()), 2),
+        'latency_ewma_ms': round(self._latency_ewma * 1000, 1) if self._latency_ewma is not None else None,
+        **self._counters,
+      }
+
+
+_schedulers: Dict[str, EndpointScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_endpoint_scheduler(endpoint: str) -> EndpointScheduler:
+  """Return the process-wide scheduler for a serving endpoint."""
+  with _schedulers_lock:
+    scheduler = _schedulers.get(endpoint)
+    if scheduler is None:
+      scheduler = EndpointScheduler(
+        endpoint,
+        requests_per_minute=ServerConfig.JUDGE_REQUESTS_PER_MINUTE,
+        max_concurrency=ServerConfig.JUDGE_ENDPOINT_MAX_CONCURRENCY,
+        max_retries=ServerConfig.JUDGE_THROTTLE_MAX_RETRIES,
+        backoff_seconds=ServerConfig.JUDGE_THROTTLE_BACKOFF_SECONDS,
+      )
+      _schedulers[endpoint] = scheduler
+    return scheduler
+
+
+def scheduler_stats() -> List[Dict[str, Any]]:
+  """Stats for every endpoint that has been called."""
+  with _schedulers_lock:
+    schedulers = list(_schedulers.values())
+  return [scheduler.stats() for scheduler in schedulers]
@@ -0,0 +1,211 @@
+"""Diverse few-shot example selection over annotated traces.
+
+Candidates are the annotated traces, grouped into strata by consensus rating (the
+mode of the annotators' ratings, from ``trace_consensus``) and agreement level. Strata are visited
+round-robin. Rating levels are interleaved from the extremes inward, and
+high-agreement strata come before contested ones. Within a stratum, the next example
+is chosen by max-marginal relevance (MMR). An example's relevance is how typical it is
+of its stratum (cosine similarity to the stratum centroid) times its annotator
+agreement. The MMR penalty is its highest similarity to any example already chosen,
+so near-duplicates are skipped even across strata.
+
+Similarity uses TF-IDF vectors over the trace input and output. Terms are hashed
+(``HashingVectorizer``), so there is no vocabulary to refit. Document frequencies are
+kept as running counts. The index is cached per workshop and only vectorizes traces
+annotated since the last selection, so repeat selections on 10k+ traces skip
+re-reading and re-tokenizing the corpus.
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+# Annotator agreement at or above this counts as a high-agreement (clear-cut) example
+HIGH_AGREEMENT = 0.75
+
+
+@dataclass(frozen=True)
+class FewShotCandidate:
+  """An annotated trace that can serve as a few-shot example."""
+
+  trace_id: str
+  rating: int
+  agreement: float
+  annotations: int
+
+
+@dataclass(frozen=True)
+class TraceVectors:
+  """TF-IDF rows of a ``TraceTextIndex`` at one point in time; later syncs do not change it."""
+
+  positions: Dict[str, int]
+  tfidf: sp.csr_matrix
+
+  def vectors(self, trace_ids: Sequence[str]) -> sp.csr_matrix:
+    """L2-normalized TF-IDF rows (sublinear term frequency) for indexed traces."""
+    return self.tfidf[[self.positions[trace_id] for trace_id in trace_ids]]
+
+  def __contains__(self, trace_id: str) -> bool:
+    return trace_id in self.positions
+
+
+class TraceTextIndex:
+  """Hashed TF-IDF index over trace text that is updated incrementally."""
+
+  def __init__(self, n_features: int = 2**18):
+    self._vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None, stop_words='english')
+    self.trace_ids: List[str] = []
+    self._positions: Dict[str, int] = {}
+    self._counts = sp.csr_matrix((0, n_features), dtype=np.float64)
+    self._document_frequency = np.zeros(n_features, dtype=np.float64)
+    self._tfidf: Optional[sp.csr_matrix] = None
+
+  def sync(self, trace_ids: Iterable[str], load_texts: Callable[[List[str]], Dict[str, str]]) -> None:
+    """Make the index cover exactly ``trace_ids``, vectorizing only traces it has not seen."""
+    wanted = list(dict.fromkeys(trace_ids))
+    wanted_set = set(wanted)
+
+    removed = [position for trace_id, position in self._positions.items() if trace_id not in wanted_set]
+    if removed:
+      self._document_frequency -= np.asarray((self._counts[removed] > 0).sum(axis=0)).ravel()
+      keep = np.setdiff1d(np.arange(len(self.trace_ids)), removed)
+      self._counts = self._counts[keep]
+      self.trace_ids = [self.trace_ids[position] for position in keep]
+
+    added = [trace_id for trace_id in wanted if trace_id not in self._positions]
+    if added:
+      texts = load_texts(added)
+      added = [trace_id for trace_id in added if trace_id in texts]
+      counts = self._vectorizer.transform([texts[trace_id] for trace_id in added]).astype(np.float64)
+      self._document_frequency += np.asarray((counts > 0).sum(axis=0)).ravel()
+      self._counts = sp.vstack([self._counts, counts], format='csr')
+      self.trace_ids.extend(added)
+
+    if removed or added:
+      self._positions = {trace_id: position for position, trace_id in enumerate(self.trace_ids)}
+      self._tfidf = None
+
+  def snapshot(self) -> TraceVectors:
+    """TF-IDF rows of the traces indexed now.
+
+    ``sync`` replaces the positions and matrix instead of modifying them, so the
+    snapshot stays valid while the index is synced again.
+    """
+    if self._tfidf is None:
+      documents = len(self.trace_ids)
+      idf = np.log((1 + documents) / (1 + self._document_frequency)) + 1
+      tf = self._counts.copy()
+      tf.data = 1 + np.log(tf.data)
+      self._tfidf = normalize(tf @ sp.diags(idf), norm='l2', copy=False).tocsr()
+    return TraceVectors(self._positions, self._tfidf)
+
+  def vectors(self, trace_ids: Sequence[str]) -> sp.csr_matrix:
+    """L2-normalized TF-IDF rows (sublinear term frequency) for indexed traces."""
+    return self.snapshot().vectors(trace_ids)
+
+  def __contains__(self, trace_id: str) -> bool:
+    return trace_id in self._positions
+
+
+def _spread_order(values: Sequence[int]) -> List[int]:
+  """Order values so each next one is farthest from those already taken (extremes first)."""
+  remaining = sorted(set(values))
+  if not remaining:
+    return []
+  order = [remaining.pop(0)]
+  while remaining:
+    farthest = max(remaining, key=lambda value: min(abs(value - taken) for taken in order))
+    remaining.remove(farthest)
+    order.append(farthest)
+  return order
+
+
+def select_diverse_examples(
+  index: Union[TraceTextIndex, TraceVectors], candidates: List[FewShotCandidate], num_examples: int, diversity: float = 0.5
+) -> List[FewShotCandidate]:
+  """Pick ``num_examples`` candidates by stratified max-marginal relevance.
+
+  ``diversity`` weighs the penalty for resembling chosen examples against relevance:
+  0 picks the most typical, highest-agreement example of each stratum, and 1 only
+  avoids similarity.
+  """
+  candidates = [candidate for candidate in candidates if candidate.trace_id in index]
+  if len(candidates) <= num_examples:
+    return candidates
+
+  strata: Dict[tuple, List[int]] = {}
+  for position, candidate in enumerate(candidates):
+    strata.setdefault((candidate.agreement < HIGH_AGREEMENT, candidate.rating), []).append(position)
+  ratings = _spread_order([candidate.rating for candidate in candidates])
+  stratum_order = [(contested, rating) for contested in (False, True) for rating in ratings if (contested, rating) in strata]
+
+  vectors = index.vectors([candidate.trace_id for candidate in candidates])
+  agreement = np.array([candidate.agreement for candidate in candidates])
+  relevance = np.zeros(len(candidates))
+  for members in strata.values():
+    centroid = np.asarray(vectors[members].mean(axis=0))
+    norm = np.linalg.norm(centroid)
+    if norm > 0:
+      relevance[members] = np.asarray(vectors[members] @ (centroid / norm).ravel()).ravel()
+  relevance *= agreement
+
+  # Highest similarity of each candidate to any selected example
+  redundancy = np.zeros(len(candidates))
+  available = np.ones(len(candidates), dtype=bool)
+  selected: List[int] = []
+  while len(selected) < num_examples:
+    progressed = False
+    for stratum in stratum_order:
+      if len(selected) >= num_examples:
+        break
+      members = np.array([position for position in strata[stratum] if available[position]], dtype=int)
+      if members.size == 0:
+        continue
+      scores = (1 - diversity) * relevance[members] - diversity * redundancy[members]
+      choice = int(members[np.argmax(scores)])
+      selected.append(choice)
+      available[choice] = False
+      similarity = np.asarray((vectors @ vectors[choice].T).todense()).ravel()
+      redundancy = np.maximum(redundancy, similarity)
+      progressed = True
+    if not progressed:
+      break
+
+  return [candidates[position] for position in selected]
+
+
+class FewShotIndexCache:
+  """Process-wide trace text indexes, one per workshop."""
+
+  def __init__(self):
+    self._indexes: Dict[str, TraceTextIndex] = {}
+    self._locks: Dict[str, threading.Lock] = {}
+    self._lock = threading.Lock()
+
+  def synced(self, workshop_id: str, trace_ids: Iterable[str], load_texts: Callable[[List[str]], Dict[str, str]]) -> TraceVectors:
+    """Bring the workshop's index up to date with ``trace_ids`` and return a snapshot of it.
+
+    The snapshot is taken under the workshop's lock, so a concurrent sync for other
+    traces cannot change it while the caller selects examples.
+    """
+    with self._lock:
+      index = self._indexes.setdefault(workshop_id, TraceTextIndex())
+      lock = self._locks.setdefault(workshop_id, threading.Lock())
+    with lock:
+      index.sync(trace_ids, load_texts)
+      return index.snapshot()
+
+  def invalidate(self, workshop_id: str) -> None:
+    """Drop a workshop's index (e.g. after its traces are replaced)."""
+    with self._lock:
+      self._indexes.pop(workshop_id, None)
+      self._locks.pop(workshop_id, None)
+
+
+# Global few-shot index cache
+few_shot_indexes = FewShotIndexCache()
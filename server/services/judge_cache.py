@@ -0,0 +1,63 @@
+"""Content-addressed cache keys and hit/miss statistics for judge outputs.
+
+A judge output is fully determined by the rendered prompt, the model and its
+parameters, and the trace input/output. Hashing those together gives a key that stays
+valid across evaluation runs, so unchanged prompt/trace pairs never reach the model
+twice. Entries live in the ``judge_result_cache`` table.
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+
+def judge_cache_key(
+  prompt_text: str,
+  model_name: str,
+  model_parameters: Optional[Dict[str, Any]],
+  input_text: str,
+  output_text: str,
+  few_shot_examples: Optional[List[str]] = None,
+) -> str:
+  """Hash everything that determines a judge output into a cache key."""
+  material = json.dumps(
+    {
+      'prompt': prompt_text,
+      'few_shot_examples': few_shot_examples or [],
+      'model': model_name,
+      'parameters': model_parameters or {},
+      'input': input_text,
+      'output': output_text,
+    },
+    sort_keys=True,
+    default=str,
+    ensure_ascii=False,
+  )
+  return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class JudgeCacheCounters:
+  """Process-wide hit/miss counters per workshop."""
+
+  def __init__(self):
+    self._counters: Dict[str, Dict[str, int]] = {}
+    self._lock = threading.Lock()
+
+  def record(self, workshop_id: str, hits: int, misses: int) -> None:
+    with self._lock:
+      counters = self._counters.setdefault(workshop_id, {'hits': 0, 'misses': 0})
+      counters['hits'] += hits
+      counters['misses'] += misses
+
+  def get(self, workshop_id: str) -> Dict[str, int]:
+    with self._lock:
+      return dict(self._counters.get(workshop_id, {'hits': 0, 'misses': 0}))
+
+  def reset(self, workshop_id: str) -> None:
+    with self._lock:
+      self._counters.pop(workshop_id, None)
+
+
+# Global stats instance
+judge_cache_stats = JudgeCacheCounters()
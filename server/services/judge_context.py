@@ -0,0 +1,155 @@
+"""Reusable MLflow execution context for judge calls.
+
+Resolving the judge experiment and building the GenAI metric both cost remote round
+trips or non-trivial setup, yet they only depend on the workshop's MLflow config and
+on the prompt, model and parameters. Both are cached per workshop, so they are built
+once and reused across traces and across requests. The cache key covers every
+input, so editing the prompt, model or parameters builds a new metric, and changing
+the MLflow config (host, token or experiment) drops the workshop's context.
+
+MLflow reads the Databricks host and token from the process environment when a call
+runs. ``mlflow_credentials`` therefore lets judge calls for one workspace overlap, but
+makes calls for another workspace wait until they finish.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from server.models import JudgePrompt
+
+
+@dataclass(frozen=True)
+class JudgeContext:
+  """Everything needed to score a trace with a judge prompt."""
+
+  experiment_id: str
+  metric: Any
+
+
+@dataclass
+class _WorkshopContext:
+  config_fingerprint: Optional[Tuple[str, str, str]] = None
+  experiment_id: Optional[str] = None
+  metrics: 'OrderedDict[str, Any]' = field(default_factory=OrderedDict)
+
+
+def config_fingerprint(mlflow_config) -> Tuple[str, str, str]:
+  """Identify an MLflow config by host, token hash and experiment."""
+  experiment = getattr(mlflow_config, 'experiment_id', None) or getattr(mlflow_config, 'experiment_name', None) or ''
+  token_hash = hashlib.sha256((mlflow_config.databricks_token or '').encode('utf-8')).hexdigest()
+  return (mlflow_config.databricks_host.rstrip('/'), token_hash, str(experiment))
+
+
+def metric_key(prompt: JudgePrompt, max_workers: Optional[int]) -> str:
+  """Hash everything the judge metric is built from."""
+  material = json.dumps(
+    {
+      'prompt': prompt.prompt_text,
+      'model': prompt.model_name,
+      'parameters': prompt.model_parameters or {},
+      'max_workers': max_workers,
+    },
+    sort_keys=True,
+    default=str,
+  )
+  return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class MLflowCredentialGate:
+  """Shares the process-wide MLflow credentials between calls for the same workspace."""
+
+  def __init__(self):
+    self._cond = threading.Condition()
+    self._active: Optional[Tuple[str, str]] = None
+    self._holders = 0
+
+  @contextmanager
+  def hold(self, mlflow_config, apply: Callable[[], None]) -> Iterator[None]:
+    """Apply a workshop's credentials with ``apply`` and keep them in place until the block exits.
+
+    Blocks while calls holding other credentials are running. Nested holds of the
+    same credentials do not wait.
+    """
+    credentials = config_fingerprint(mlflow_config)[:2]
+    with self._cond:
+      while self._holders and self._active != credentials:
+        self._cond.wait()
+      # Re-applied even when unchanged, since code outside the gate may have rewritten them
+      apply()
+      self._active = credentials
+      self._holders += 1
+    try:
+      yield
+    finally:
+      with self._cond:
+        self._holders -= 1
+        if not self._holders:
+          self._cond.notify_all()
+
+
+class JudgeContextCache:
+  """Process-wide judge contexts, one per workshop."""
+
+  def __init__(self, max_metrics_per_workshop: int = 32):
+    self.max_metrics_per_workshop = max_metrics_per_workshop
+    self._workshops: Dict[str, _WorkshopContext] = {}
+    self._lock = threading.Lock()
+
+  def get(
+    self,
+    workshop_id: str,
+    prompt: JudgePrompt,
+    mlflow_config,
+    resolve_experiment: Callable[[], str],
+    build_metric: Callable[[], Any],
+    max_workers: Optional[int] = None,
+  ) -> JudgeContext:
+    """Return the cached context, calling ``resolve_experiment``/``build_metric`` on a miss."""
+    fingerprint = config_fingerprint(mlflow_config)
+    key = metric_key(prompt, max_workers)
+
+    with self._lock:
+      context = self._workshops.setdefault(workshop_id, _WorkshopContext())
+      if context.config_fingerprint != fingerprint:
+        # MLflow config changed - nothing built for the old one is valid
+        context.config_fingerprint = fingerprint
+        context.experiment_id = None
+        context.metrics.clear()
+      experiment_id = context.experiment_id
+      metric = context.metrics.get(key)
+      if metric is not None:
+        context.metrics.move_to_end(key)
+
+    # Build outside the lock; concurrent misses may build twice, which is harmless
+    if experiment_id is None:
+      experiment_id = resolve_experiment()
+    if metric is None:
+      metric = build_metric()
+
+    with self._lock:
+      context = self._workshops.setdefault(workshop_id, _WorkshopContext())
+      if context.config_fingerprint == fingerprint:
+        context.experiment_id = experiment_id
+        context.metrics[key] = metric
+        context.metrics.move_to_end(key)
+        while len(context.metrics) > self.max_metrics_per_workshop:
+          context.metrics.popitem(last=False)
+
+    return JudgeContext(experiment_id=experiment_id, metric=metric)
+
+  def invalidate(self, workshop_id: str) -> None:
+    """Drop a workshop's context (e.g. after its MLflow config is replaced)."""
+    with self._lock:
+      self._workshops.pop(workshop_id, None)
+
+
+# Global judge context cache
+judge_contexts = JudgeContextCache()
+
+# Global gate for the MLflow credentials in the process environment
+mlflow_credentials = MLflowCredentialGate()
@@ -0,0 +1,85 @@
+"""Bulk loading of the ground truth and traces needed for judge evaluation.
+
+Ground truth is read from the ``trace_consensus`` table, which keeps each trace's mode
+rating per question up to date on every annotation write, in one indexed query. Every
+referenced trace is then fetched with a single ``IN`` query instead of one
+``get_trace`` per trace. With ``GroundTruthMethod.DAWID_SKENE`` the modes are replaced
+by rater-quality weighted consensus ratings fitted over the workshop's ratings.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Sequence
+
+from server.models import GroundTruthMethod, Trace, TraceConsensus
+from server.services.database_service import DatabaseService
+from server.services.dawid_skene import DawidSkeneResult, dawid_skene_models
+from server.services.trace_consensus import OVERALL_QUESTION_ID
+
+
+@dataclass
+class JudgeDataset:
+  """Consensus ratings per trace and question, plus the traces they refer to.
+
+  Both mappings are in trace order, and only hold annotated traces that still exist.
+  ``weighted_labels`` holds Dawid-Skene ratings per question and trace when they were
+  requested as ground truth.
+  """
+
+  consensus: Dict[str, Dict[str, TraceConsensus]] = field(default_factory=dict)
+  traces: Dict[str, Trace] = field(default_factory=dict)
+  weighted_labels: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+  def ground_truth(self, question_id: str = OVERALL_QUESTION_ID) -> Dict[str, int]:
+    """Ground truth rating per trace for one question: the weighted label if fitted, else the mode."""
+    weighted = self.weighted_labels.get(question_id)
+    return {
+      trace_id: weighted[trace_id] if weighted is not None else by_question[question_id].mode
+      for trace_id, by_question in self.consensus.items()
+      if question_id in by_question
+    }
+
+  def mode_rating(self, trace_id: str, question_id: str = OVERALL_QUESTION_ID) -> Optional[int]:
+    """Most common human rating for a trace (ties go to the rating given first)."""
+    consensus = self.consensus.get(trace_id, {}).get(question_id)
+    return consensus.mode if consensus else None
+
+
+class JudgeDataLoader:
+  """Load judge evaluation inputs for a workshop in a constant number of queries."""
+
+  def __init__(self, db_service: DatabaseService):
+    self.db_service = db_service
+
+  def load(
+    self,
+    workshop_id: str,
+    trace_ids: Optional[Iterable[str]] = None,
+    question_ids: Optional[Sequence[str]] = (OVERALL_QUESTION_ID,),
+    ground_truth: GroundTruthMethod = GroundTruthMethod.MODE,
+  ) -> JudgeDataset:
+    """Load consensus ratings (optionally restricted to ``trace_ids``) and their traces."""
+    consensus: Dict[str, Dict[str, TraceConsensus]] = {}
+    for row in self.db_service.get_trace_consensus(workshop_id, question_ids, trace_ids):
+      consensus.setdefault(row.trace_id, {})[row.question_id] = row
+
+    traces = self.db_service.get_traces_by_ids(list(consensus.keys()))
+    dataset = JudgeDataset(consensus=consensus, traces={trace_id: traces[trace_id] for trace_id in consensus if trace_id in traces})
+
+    if ground_truth == GroundTruthMethod.DAWID_SKENE:
+      fitted_questions = question_ids if question_ids is not None else {q for by_question in consensus.values() for q in by_question}
+      for question_id in fitted_questions:
+        result = self.weighted_consensus(workshop_id, question_id)
+        if result is not None:
+          dataset.weighted_labels[question_id] = {trace_id: label for trace_id, (label, _) in result.consensus().items()}
+    return dataset
+
+  def weighted_consensus(self, workshop_id: str, question_id: str = OVERALL_QUESTION_ID) -> Optional[DawidSkeneResult]:
+    """Fit Dawid-Skene over all of the workshop's ratings for a question (None if there are none).
+
+    The fit always covers the whole workshop, since rater reliabilities are estimated
+    from every trace they rated. It is reused until the workshop's ratings change.
+    """
+    trace_ids, user_ids, ratings = self.db_service.get_rater_ratings(workshop_id, question_id)
+    if not ratings:
+      return None
+    return dawid_skene_models.fit(workshop_id, question_id, trace_ids, user_ids, ratings)
@@ -0,0 +1,81 @@
+"""Concurrent execution of judge calls.
+
+Judge evaluations are dominated by model-serving latency, so traces are evaluated on
+a thread pool. Callers route each call through the serving endpoint's adaptive
+scheduler (see ``endpoint_scheduler``). Results are either collected in input order or
+yielded as each call completes.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from server.config import ServerConfig
+
+
+class ConcurrentEvaluator:
+  """Run a function over many items on a thread pool.
+
+  In fail-fast mode the first exception cancels the calls that have not started yet
+  and is re-raised. Otherwise every item runs and exceptions are returned next to
+  the successful results.
+  """
+
+  def __init__(
+    self,
+    max_workers: Optional[int] = None,
+    fail_fast: bool = True,
+  ):
+    self.max_workers = max(1, max_workers or ServerConfig.JUDGE_MAX_CONCURRENCY)
+    self.fail_fast = fail_fast
+
+  def map(
+    self,
+    fn: Callable[[Any], Any],
+    items: Sequence[Any],
+    on_complete: Optional[Callable[[int, Any, Optional[Exception]], None]] = None,
+  ) -> List[Tuple[Any, Optional[Exception]]]:
+    """Apply ``fn`` to every item.
+
+    ``on_complete(index, result, error)`` is called in the calling thread as each item
+    finishes, e.g. to checkpoint results before the whole batch is done.
+
+    Returns:
+        One ``(result, error)`` pair per item, in input order
+    """
+    if not items:
+      return []
+
+    outcomes: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * len(items)
+    executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)))
+    try:
+      futures = {executor.submit(fn, item): index for index, item in enumerate(items)}
+      for future in as_completed(futures):
+        index = futures[future]
+        error = future.exception()
+        outcomes[index] = (None, error) if error is not None else (future.result(), None)
+        if on_complete is not None:
+          on_complete(index, *outcomes[index])
+        if error is not None and self.fail_fast:
+          raise error
+    finally:
+      executor.shutdown(wait=True, cancel_futures=True)
+
+    return outcomes
+
+  def iter_completed(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> Iterator[Tuple[int, Any, Optional[Exception]]]:
+    """Apply ``fn`` to every item, yielding ``(index, result, error)`` as each call finishes.
+
+    Errors never stop the iteration. Closing the iterator early cancels the calls that
+    have not started yet.
+    """
+    if not items:
+      return
+
+    executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(items)))
+    try:
+      futures = {executor.submit(fn, item): index for index, item in enumerate(items)}
+      for future in as_completed(futures):
+        error = future.exception()
+        yield futures[future], (future.result() if error is None else None), error
+    finally:
+      executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,149 @@
+"""Vectorized agreement metrics between judge and human ratings.
+
+Every metric is derived from the confusion matrix. That covers accuracy, Cohen's kappa,
+quadratic-weighted kappa, and per-rating precision and recall. The matrix is built
+with one ``bincount`` over any integer rating scale.
+
+The confidence intervals are percentile bootstrap intervals. Resampling the
+(human, judge) pairs with replacement is the same as drawing a confusion matrix from
+a multinomial over its cells, with the observed cell frequencies as probabilities.
+So all resamples come from a single ``multinomial`` call as a ``B x K x K`` stack,
+and the statistics are computed on the whole stack at once. The cost depends on the
+number of resamples and rating levels, not on the number of traces.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Likert scale used by the annotation UI; ratings outside it switch to the observed labels
+DEFAULT_RATING_LABELS = (1, 2, 3, 4, 5)
+# Chance agreement this close to 1 leaves kappa undefined
+_EPSILON = 1e-12
+
+
+@dataclass(frozen=True)
+class AgreementMetrics:
+  """Judge-vs-human agreement with bootstrap confidence intervals."""
+
+  labels: List[int]
+  confusion: np.ndarray
+  accuracy: float
+  kappa: float
+  weighted_kappa: float
+  precision: Dict[int, Optional[float]]
+  recall: Dict[int, Optional[float]]
+  intervals: Dict[str, Tuple[float, float]]
+
+
+def rating_labels(human: Sequence[int], predicted: Sequence[int]) -> List[int]:
+  """Rating levels for the confusion matrix: every integer from the lowest to the highest rating.
+
+  The range always covers the 1-5 scale, so levels nobody used still get a row, also
+  when some ratings fall outside the scale.
+  """
+  observed = {int(rating) for rating in human} | {int(rating) for rating in predicted} | set(DEFAULT_RATING_LABELS)
+  return list(range(min(observed), max(observed) + 1))
+
+
+def quadratic_weights(labels: Sequence[int]) -> np.ndarray:
+  """Disagreement weights ``((a - b) / range)^2`` between rating levels."""
+  values = np.asarray(labels, dtype=float)
+  spread = values.max() - values.min() if len(values) > 1 else 0.0
+  if spread == 0:
+    return np.zeros((len(values), len(values)))
+  return ((values[:, None] - values[None, :]) / spread) ** 2
+
+
+def agreement_statistics(confusion: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+  """Accuracy, kappa and weighted kappa of one ``K x K`` matrix or a stack of them.
+
+  Where kappa is undefined because chance agreement is 1 (a single rating level on both
+  sides), it falls back to the observed agreement.
+  """
+  counts = confusion.astype(float)
+  totals = counts.sum(axis=(-2, -1))[..., None, None]
+  observed = counts / totals
+  rows = observed.sum(axis=-1)
+  columns = observed.sum(axis=-2)
+
+  accuracy = np.trace(observed, axis1=-2, axis2=-1)
+  chance = (rows * columns).sum(axis=-1)
+  kappa = np.where(1 - chance > _EPSILON, (accuracy - chance) / np.maximum(1 - chance, _EPSILON), accuracy)
+
+  expected = rows[..., :, None] * columns[..., None, :]
+  observed_disagreement = (weights * observed).sum(axis=(-2, -1))
+  expected_disagreement = (weights * expected).sum(axis=(-2, -1))
+  weighted_kappa = np.where(
+    expected_disagreement > _EPSILON,
+    1 - observed_disagreement / np.maximum(expected_disagreement, _EPSILON),
+    accuracy,
+  )
+  return accuracy, kappa, weighted_kappa
+
+
+def compute_agreement_metrics(
+  human: Sequence[int],
+  predicted: Sequence[int],
+  labels: Optional[Sequence[int]] = None,
+  resamples: int = 2000,
+  confidence: float = 0.95,
+  seed: int = 0,
+) -> AgreementMetrics:
+  """Compute every agreement metric and its bootstrap interval in one pass.
+
+  The bootstrap is seeded, so the same ratings always give the same intervals.
+
+  Raises:
+      ValueError: If there are no ratings, the sequences differ in length, or a rating
+          is not one of ``labels``
+  """
+  human_values = np.asarray(human, dtype=int)
+  predicted_values = np.asarray(predicted, dtype=int)
+  if human_values.size == 0:
+    raise ValueError('No ratings to calculate metrics from')
+  if human_values.shape != predicted_values.shape:
+    raise ValueError('Human and predicted ratings differ in length')
+
+  label_values = np.asarray(sorted(labels) if labels is not None else rating_labels(human, predicted), dtype=int)
+  k = len(label_values)
+  human_index = np.searchsorted(label_values, human_values)
+  predicted_index = np.searchsorted(label_values, predicted_values)
+  for values, index in ((human_values, human_index), (predicted_values, predicted_index)):
+    valid = (index < k) & (label_values[np.minimum(index, k - 1)] == values)
+    if not valid.all():
+      raise ValueError(f'Rating {values[~valid][0]} is not one of the labels {label_values.tolist()}')
+
+  confusion = np.bincount(human_index * k + predicted_index, minlength=k * k).reshape(k, k)
+  weights = quadratic_weights(label_values)
+  accuracy, kappa, weighted_kappa = agreement_statistics(confusion, weights)
+
+  diagonal = np.diag(confusion).astype(float)
+  predicted_totals = confusion.sum(axis=0)
+  human_totals = confusion.sum(axis=1)
+  precision = {
+    int(label): (float(diagonal[i] / predicted_totals[i]) if predicted_totals[i] else None) for i, label in enumerate(label_values)
+  }
+  recall = {int(label): (float(diagonal[i] / human_totals[i]) if human_totals[i] else None) for i, label in enumerate(label_values)}
+
+  intervals = {}
+  if resamples > 0:
+    rng = np.random.default_rng(seed)
+    n = int(human_values.size)
+    samples = rng.multinomial(n, confusion.ravel() / n, size=resamples).reshape(resamples, k, k)
+    tail = (1 - confidence) / 2 * 100
+    for name, values in zip(('accuracy', 'kappa', 'weighted_kappa'), agreement_statistics(samples, weights), strict=True):
+      lower, upper = np.percentile(values, [tail, 100 - tail])
+      intervals[name] = (float(lower), float(upper))
+
+  return AgreementMetrics(
+    labels=label_values.tolist(),
+    confusion=confusion,
+    accuracy=float(accuracy),
+    kappa=float(kappa),
+    weighted_kappa=float(weighted_kappa),
+    precision=precision,
+    recall=recall,
+    intervals=intervals,
+  )
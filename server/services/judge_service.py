@@ -4,22 +4,66 @@ import json
 import os
 import random
 import uuid
-from typing import Any, Dict, List
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-import numpy as np
+import requests
 from fastapi import HTTPException
-from sklearn.metrics import accuracy_score, cohen_kappa_score, confusion_matrix
 
+from server.config import ServerConfig
 from server.models import (
+  FewShotExample,
   JudgeEvaluation,
   JudgeEvaluationDirectRequest,
   JudgeEvaluationRequest,
   JudgeEvaluationResult,
+  JudgeEvaluationRun,
   JudgeExportConfig,
+  JudgeMatrixCell,
+  JudgeMatrixEvaluationRequest,
+  JudgeMatrixEvaluationResult,
+  JudgeMetricInterval,
   JudgePerformanceMetrics,
   JudgePrompt,
+  JudgeRubricEvaluationRequest,
+  JudgeRubricEvaluationResult,
+  JudgeSequentialEvaluationRequest,
+  JudgeSequentialEvaluationResult,
+  JudgeTelemetrySummary,
 )
 from server.services.database_service import DatabaseService
+from server.services.endpoint_scheduler import (
+  EndpointScheduler,
+  EndpointThrottledError,
+  get_endpoint_scheduler,
+  is_throttle_error,
+  is_throttle_message,
+)
+from server.services.few_shot_selection import FewShotCandidate, few_shot_indexes, select_diverse_examples
+from server.services.judge_cache import judge_cache_key, judge_cache_stats
+from server.services.judge_context import JudgeContext, judge_contexts, mlflow_credentials
+from server.services.judge_data_loader import JudgeDataLoader
+from server.services.judge_executor import ConcurrentEvaluator
+from server.services.judge_metrics import compute_agreement_metrics
+from server.services.judge_telemetry import JudgeTelemetryRecorder, report_usage, summarize_telemetry
+from server.services.packed_judge import (
+  estimate_tokens,
+  estimate_trace_tokens,
+  pack_item_id,
+  parse_packed_response,
+  plan_packs,
+  render_packed_prompt,
+)
+from server.services.rubric_judge import parse_rubric_response, render_rubric_prompt, rubric_questions
+from server.services.sequential_evaluation import STOP_EXHAUSTED, SequentialStopRule, planned_looks
+from server.services.serving_judge import (
+  ServingJudgeClient,
+  is_serving_model,
+  parse_judge_reply,
+  render_serving_prompt,
+  serving_endpoint_name,
+)
 
 try:
   import mlflow
@@ -29,6 +73,9 @@ try:
 except ImportError:
   MLFLOW_AVAILABLE = False
 
+# Running metrics are pushed on the evaluation stream after every this many completed traces
+METRICS_EVENT_INTERVAL = 10
+
 
 class JudgeService:
   """Service for judge prompt evaluation and management."""
@@ -37,33 +84,502 @@ class JudgeService:
     self.db_service = db_service
 
   def evaluate_prompt(self, workshop_id: str, evaluation_request: JudgeEvaluationRequest) -> JudgePerformanceMetrics:
-    """Evaluate a judge prompt against human annotations."""
+    """Evaluate a judge prompt against human annotations.
+
+    The evaluation is a checkpointed run. Each judge output is committed as it arrives,
+    so an interrupted run can be finished with :meth:`resume_evaluation_run`.
+    """
     # Get the prompt
     prompt = self.db_service.get_judge_prompt(workshop_id, evaluation_request.prompt_id)
     if not prompt:
       raise ValueError(f'Judge prompt {evaluation_request.prompt_id} not found')
 
-    # Clear old cached evaluations for this prompt to prevent stale data
-    self.db_service.clear_judge_evaluations(workshop_id, evaluation_request.prompt_id)
+    # Load consensus ground truth (filtered to specific traces if requested) and its traces in bulk
+    dataset = JudgeDataLoader(self.db_service).load(workshop_id, evaluation_request.trace_ids or None, ground_truth=evaluation_request.ground_truth)
+    if not dataset.traces:
+      raise ValueError('No annotations found for evaluation')
+
+    mlflow_config = self._resolve_mlflow_config(workshop_id, prompt, evaluation_request.override_model)
+
+    # Persist the manifest of traces to score before any judge call is made
+    trace_ground_truth = dataset.ground_truth()
+    run = self.db_service.create_judge_evaluation_run(
+      workshop_id, prompt.id, list(trace_ground_truth), evaluation_request.model_dump(exclude={'prompt_id', 'trace_ids'})
+    )
+
+    return self._execute_run(workshop_id, prompt, run, trace_ground_truth, dataset.traces, mlflow_config, evaluation_request)
+
+  def resume_evaluation_run(self, workshop_id: str, run_id: str) -> JudgePerformanceMetrics:
+    """Finish an interrupted evaluation run, scoring only traces that have no evaluation yet."""
+    run = self.db_service.get_judge_evaluation_run(workshop_id, run_id)
+    if not run:
+      raise ValueError(f'Evaluation run {run_id} not found')
+    if run.status == 'completed':
+      raise ValueError(f'Evaluation run {run_id} is already completed')
+
+    prompt = self.db_service.get_judge_prompt(workshop_id, run.prompt_id)
+    if not prompt:
+      raise ValueError(f'Judge prompt {run.prompt_id} not found')
+
+    evaluation_request = JudgeEvaluationRequest(prompt_id=run.prompt_id, trace_ids=run.trace_ids, **run.options)
+    mlflow_config = self._resolve_mlflow_config(workshop_id, prompt, evaluation_request.override_model)
+
+    scored = {evaluation.trace_id for evaluation in self.db_service.get_judge_run_evaluations(workshop_id, run.id)}
+    missing = [trace_id for trace_id in run.trace_ids if trace_id not in scored]
+    dataset = JudgeDataLoader(self.db_service).load(workshop_id, missing, ground_truth=evaluation_request.ground_truth)
+    print(f'Resuming evaluation run {run_id}: {len(scored)} traces already scored, {len(missing)} remaining')
+
+    return self._execute_run(workshop_id, prompt, run, dataset.ground_truth(), dataset.traces, mlflow_config, evaluation_request)
+
+  def _execute_run(
+    self,
+    workshop_id: str,
+    prompt: JudgePrompt,
+    run: JudgeEvaluationRun,
+    trace_ground_truth: Dict[str, int],
+    trace_objects: Dict[str, Any],
+    mlflow_config,
+    evaluation_request: JudgeEvaluationRequest,
+  ) -> JudgePerformanceMetrics:
+    """Score traces for a run, committing every evaluation as it arrives, then finish the run."""
+    self.db_service.update_judge_evaluation_run(run.id, 'running')
+    try:
+      _, evaluation_errors = self._evaluate_traces(
+        workshop_id,
+        prompt,
+        prompt.id,
+        trace_ground_truth,
+        trace_objects,
+        mlflow_config,
+        max_concurrency=evaluation_request.max_concurrency,
+        fail_fast=evaluation_request.fail_fast,
+        batch=evaluation_request.batch,
+        use_cache=not evaluation_request.bypass_cache,
+        checkpoint=lambda evaluations: self.db_service.checkpoint_judge_evaluation_run(run.id, evaluations),
+        packed=evaluation_request.packed,
+        run_id=run.id,
+      )
+    except HTTPException as e:
+      self.db_service.update_judge_evaluation_run(run.id, 'failed', error=str(e.detail))
+      raise HTTPException(status_code=e.status_code, detail=f'{e.detail} (evaluation run {run.id} can be resumed)') from e
+    except Exception as e:
+      self.db_service.update_judge_evaluation_run(run.id, 'failed', error=str(e))
+      raise
+
+    # Metrics cover the whole run, including traces scored before an interruption
+    evaluations = self.db_service.get_judge_run_evaluations(workshop_id, run.id)
+    metrics = self._calculate_performance_metrics(evaluations)
+    metrics.evaluation_errors = evaluation_errors
+    metrics.run_id = run.id
+    self.db_service.update_judge_evaluation_run(
+      run.id, 'completed', completed_traces=len(evaluations), failed_traces=len(evaluation_errors), metrics=metrics.model_dump(mode='json')
+    )
+
+    # Update prompt with performance metrics
+    self.db_service.update_judge_prompt_metrics(prompt.id, metrics.model_dump(mode='json'))
+
+    return metrics
+
+  def evaluate_rubric(self, workshop_id: str, evaluation_request: JudgeRubricEvaluationRequest) -> JudgeRubricEvaluationResult:
+    """Judge every rubric question with a single model call per trace.
+
+    Ground truth for each (trace, question) is the mode of the annotators' per-question
+    ``ratings``. Results are not saved to history.
+    """
+    rubric = self.db_service.get_rubric(workshop_id)
+    if not rubric:
+      raise ValueError('No rubric found for workshop')
+
+    questions = rubric_questions(rubric)
+    if evaluation_request.question_ids:
+      questions = [q for q in questions if q['id'] in evaluation_request.question_ids]
+    if not questions:
+      raise ValueError('No rubric questions selected for evaluation')
+    question_ids = [q['id'] for q in questions]
+
+    # Consensus of the annotators' ratings per trace and question
+    dataset = JudgeDataLoader(self.db_service).load(
+      workshop_id, evaluation_request.trace_ids or None, question_ids, ground_truth=evaluation_request.ground_truth
+    )
+    truth_by_question = {question_id: dataset.ground_truth(question_id) for question_id in question_ids}
+    items = []
+    for trace_id, trace in dataset.traces.items():
+      ground_truth = {question_id: truth[trace_id] for question_id, truth in truth_by_question.items() if trace_id in truth}
+      if ground_truth:
+        items.append((trace_id, trace, ground_truth))
+    if not items:
+      raise ValueError('No per-question annotation ratings found for evaluation')
+
+    model_name = evaluation_request.model_name
+    if model_name == 'demo':
+      outcomes = [
+        (
+          {
+            question_id: (
+              self._simulate_judge_rating(evaluation_request.prompt_text, trace.input, trace.output, human_rating),
+              'Test judge evaluation (development mode)',
+            )
+            for question_id, human_rating in ground_truth.items()
+          },
+          None,
+        )
+        for _, trace, ground_truth in items
+      ]
+    else:
+      if not model_name.startswith('databricks-'):
+        raise HTTPException(status_code=400, detail='Multi-question judging requires a Databricks serving endpoint (databricks-*)')
+      try:
+        from server.services.databricks_service import DatabricksService
+
+        databricks_service = DatabricksService(workshop_id=workshop_id, db_service=self.db_service)
+      except ValueError as e:
+        raise HTTPException(status_code=400, detail=f'Databricks configuration required for AI judge evaluation: {str(e)}') from e
+
+      parameters = dict(evaluation_request.model_parameters or {})
+      temperature = parameters.pop('temperature', 0.0)
+      max_tokens = parameters.pop('max_tokens', None)
+
+      def judge(item: Tuple[str, Any, Dict[str, int]]) -> Dict[str, Tuple[int, Optional[str]]]:
+        _, trace, _ = item
+        prompt = render_rubric_prompt(evaluation_request.prompt_text, questions, trace.input, trace.output)
+        response = databricks_service.call_chat_completion(
+          endpoint_name=model_name,
+          messages=[{'role': 'user', 'content': prompt}],
+          temperature=temperature,
+          max_tokens=max_tokens,
+          model_parameters=parameters or None,
+        )
+        return parse_rubric_response(response['choices'][0]['message']['content'] or '', question_ids)
+
+      # DatabricksService schedules its own calls on the endpoint
+      evaluator = ConcurrentEvaluator(max_workers=evaluation_request.max_concurrency, fail_fast=evaluation_request.fail_fast)
+      try:
+        outcomes = evaluator.map(judge, items)
+      except Exception as e:
+        raise HTTPException(status_code=503, detail=f'Judge evaluation failed: {str(e)}') from e
+
+    evaluations: Dict[str, List[JudgeEvaluation]] = {question_id: [] for question_id in question_ids}
+    errors = {}
+    for (trace_id, _, ground_truth), (scores, error) in zip(items, outcomes, strict=True):
+      if error is not None:
+        print(f'Warning: Judge evaluation failed for trace {trace_id}: {error}')
+        errors[trace_id] = str(error)
+        continue
+      for question_id, human_rating in ground_truth.items():
+        predicted_rating, reasoning = scores[question_id]
+        evaluations[question_id].append(self._make_evaluation(workshop_id, 'temp', trace_id, human_rating, predicted_rating, reasoning))
+
+    if not any(evaluations.values()):
+      raise HTTPException(status_code=503, detail=f'Judge evaluation failed for all {len(items)} traces: {next(iter(errors.values()))}')
+
+    metrics = {}
+    for question_id, question_evaluations in evaluations.items():
+      if question_evaluations:
+        metrics[question_id] = self._calculate_performance_metrics(question_evaluations)
+        metrics[question_id].evaluation_errors = errors
+
+    return JudgeRubricEvaluationResult(questions=questions, metrics=metrics, evaluations=evaluations, evaluation_errors=errors)
+
+  def stream_evaluate_prompt(self, workshop_id: str, evaluation_request: JudgeEvaluationRequest) -> Iterator[Dict[str, Any]]:
+    """Evaluate a judge prompt, yielding progress events as traces complete.
+
+    Setup errors (missing prompt, annotations or MLflow config) are raised before the
+    first event. Each completed evaluation is persisted immediately, so a failure late in
+    the run keeps every earlier score.
+
+    Events are dictionaries with ``event`` and ``data`` keys:
+        - ``start``: ``{run_id, total, cached}``
+        - ``evaluation``: a completed ``JudgeEvaluation``
+        - ``error``: ``{trace_id, error}`` for a trace that failed to evaluate
+        - ``metrics``: running ``JudgePerformanceMetrics`` every ``METRICS_EVENT_INTERVAL`` evaluations
+        - ``done``: final metrics (None when nothing was evaluated)
+    """
+    prompt = self.db_service.get_judge_prompt(workshop_id, evaluation_request.prompt_id)
+    if not prompt:
+      raise ValueError(f'Judge prompt {evaluation_request.prompt_id} not found')
+
+    dataset = JudgeDataLoader(self.db_service).load(workshop_id, evaluation_request.trace_ids or None, ground_truth=evaluation_request.ground_truth)
+    if not dataset.traces:
+      raise ValueError('No annotations found for evaluation')
+
+    mlflow_config = self._resolve_mlflow_config(workshop_id, prompt, evaluation_request.override_model)
+    items = self._ground_truth_items(dataset.ground_truth(), dataset.traces)
+
+    # A disconnected stream leaves its run resumable through resume_evaluation_run
+    run = self.db_service.create_judge_evaluation_run(
+      workshop_id, prompt.id, [trace_id for trace_id, _, _ in items], evaluation_request.model_dump(exclude={'prompt_id', 'trace_ids'})
+    )
+
+    return self._iter_evaluation_events(workshop_id, prompt, evaluation_request, run, items, mlflow_config)
+
+  def _iter_evaluation_events(
+    self,
+    workshop_id: str,
+    prompt: JudgePrompt,
+    evaluation_request: JudgeEvaluationRequest,
+    run: JudgeEvaluationRun,
+    items: List[Tuple[str, Any, int]],
+    mlflow_config,
+  ) -> Iterator[Dict[str, Any]]:
+    """Generate the event stream for :meth:`stream_evaluate_prompt`."""
+    prompt_id = evaluation_request.prompt_id
+    use_cache = mlflow_config is not None and not evaluation_request.bypass_cache
+    cache_keys, cached_results, pending = self._lookup_cached_results(workshop_id, prompt, items, use_cache)
+    yield {'event': 'start', 'data': {'run_id': run.id, 'total': len(items), 'cached': len(items) - len(pending)}}
+
+    completed: List[JudgeEvaluation] = []
+    errors: Dict[str, str] = {}
+    new_cache_entries: Dict[str, Tuple[int, Optional[str]]] = {}
+    telemetry = JudgeTelemetryRecorder(workshop_id, run.id)
+
+    def record(evaluation: JudgeEvaluation) -> Iterator[Dict[str, Any]]:
+      self.db_service.checkpoint_judge_evaluation_run(run.id, [evaluation])
+      completed.append(evaluation)
+      yield {'event': 'evaluation', 'data': evaluation.model_dump(mode='json')}
+      if len(completed) % METRICS_EVENT_INTERVAL == 0:
+        yield {'event': 'metrics', 'data': self._calculate_performance_metrics(completed).model_dump(mode='json')}
+
+    try:
+      # Cached and simulated results are available immediately
+      for trace_id, trace, mode_rating in items:
+        if mlflow_config is None:
+          predicted_rating = self._simulate_judge_rating(prompt.prompt_text, trace.input, trace.output, mode_rating)
+          reasoning = 'Test judge evaluation (development mode)'
+        elif cache_keys.get(trace_id) in cached_results:
+          predicted_rating, reasoning = cached_results[cache_keys[trace_id]]
+        else:
+          continue
+        yield from record(self._make_evaluation(workshop_id, prompt_id, trace_id, mode_rating, predicted_rating, reasoning))
+
+      if mlflow_config is not None and pending:
+        scheduler = self._endpoint_scheduler(prompt.model_name)
+        evaluator = ConcurrentEvaluator(max_workers=evaluation_request.max_concurrency, fail_fast=False)
+        outcomes = evaluator.iter_completed(
+          lambda item: telemetry.call(scheduler, prompt, item[0], self._judge_trace, workshop_id, prompt, item[1].input, item[1].output, mlflow_config),
+          pending,
+        )
+        for index, result, error in outcomes:
+          trace_id, _, mode_rating = pending[index]
+          if error is not None:
+            print(f'Warning: Judge evaluation failed for trace {trace_id}: {error}')
+            errors[trace_id] = str(error)
+            yield {'event': 'error', 'data': {'trace_id': trace_id, 'error': str(error)}}
+            continue
+          if use_cache:
+            new_cache_entries[cache_keys[trace_id]] = result
+          predicted_rating, reasoning = result
+          yield from record(self._make_evaluation(workshop_id, prompt_id, trace_id, mode_rating, predicted_rating, reasoning))
+    finally:
+      # Runs on normal completion, on errors and when the client disconnects
+      if new_cache_entries:
+        self.db_service.store_judge_cache_entries(workshop_id, prompt.model_name, new_cache_entries, ServerConfig.JUDGE_CACHE_MAX_ENTRIES)
+      telemetry.flush(self.db_service)
+
+    metrics = None
+    if completed:
+      metrics = self._calculate_performance_metrics(completed)
+      metrics.evaluation_errors = errors
+      metrics.run_id = run.id
+      self.db_service.update_judge_prompt_metrics(prompt_id, metrics.model_dump(mode='json'))
+    self.db_service.update_judge_evaluation_run(
+      run.id,
+      'completed' if completed else 'failed',
+      completed_traces=len(completed),
+      failed_traces=len(errors),
+      metrics=metrics.model_dump(mode='json') if metrics else None,
+    )
+    yield {'event': 'done', 'data': metrics.model_dump(mode='json') if metrics else None}
+
+  def evaluate_matrix(self, workshop_id: str, evaluation_request: JudgeMatrixEvaluationRequest) -> JudgeMatrixEvaluationResult:
+    """Evaluate every combination of saved judge prompts and models in one run.
+
+    Annotations, mode ground truth and traces are loaded once and shared by all
+    combinations. Judge calls for every combination share one thread pool of
+    ``max_concurrency`` workers, rate limited per serving endpoint. Evaluations are not
+    stored and prompt metrics are not updated.
+    """
+    prompts = []
+    for prompt_id in dict.fromkeys(evaluation_request.prompt_ids):
+      prompt = self.db_service.get_judge_prompt(workshop_id, prompt_id)
+      if not prompt:
+        raise ValueError(f'Judge prompt {prompt_id} not found')
+      prompts.append(prompt)
+
+    dataset = JudgeDataLoader(self.db_service).load(workshop_id, evaluation_request.trace_ids or None, ground_truth=evaluation_request.ground_truth)
+    if not dataset.traces:
+      raise ValueError('No annotations found for evaluation')
+    items = self._ground_truth_items(dataset.ground_truth(), dataset.traces)
+
+    # One prompt copy per combination, judged with that combination's model
+    model_names = list(dict.fromkeys(evaluation_request.model_names or []))
+    cell_prompts = [
+      prompt.model_copy(update={'model_name': model_name}) for prompt in prompts for model_name in (model_names or [prompt.model_name])
+    ]
+
+    mlflow_config = None
+    real_prompt = next((prompt for prompt in cell_prompts if prompt.model_name != 'demo'), None)
+    if real_prompt is not None:
+      mlflow_config = self._resolve_mlflow_config(workshop_id, real_prompt, None)
+
+    use_cache = not evaluation_request.bypass_cache
+    lookups = []
+    tasks = []
+    for cell_index, prompt in enumerate(cell_prompts):
+      if prompt.model_name == 'demo' or mlflow_config is None:
+        lookups.append(None)
+        continue
+      cache_keys, cached_results, pending = self._lookup_cached_results(workshop_id, prompt, items, use_cache)
+      lookups.append((cache_keys, cached_results))
+      tasks.extend((cell_index, item) for item in pending)
+
+    telemetry = JudgeTelemetryRecorder(workshop_id)
+
+    def judge(task: Tuple[int, Tuple[str, Any, int]]) -> Tuple[int, str]:
+      cell_index, (trace_id, trace, _) = task
+      prompt = cell_prompts[cell_index]
+      scheduler = self._endpoint_scheduler(prompt.model_name)
+      return telemetry.call(scheduler, prompt, trace_id, self._judge_trace, workshop_id, prompt, trace.input, trace.output, mlflow_config)
+
+    # A failed call only affects its own combination
+    try:
+      outcomes = ConcurrentEvaluator(max_workers=evaluation_request.max_concurrency, fail_fast=False).map(judge, tasks)
+    finally:
+      telemetry.flush(self.db_service)
+    fresh_outcomes: Dict[int, Dict[str, Tuple[Any, Optional[Exception]]]] = {}
+    for (cell_index, (trace_id, _, _)), outcome in zip(tasks, outcomes, strict=True):
+      fresh_outcomes.setdefault(cell_index, {})[trace_id] = outcome
+
+    cells = []
+    for cell_index, prompt in enumerate(cell_prompts):
+      cell = JudgeMatrixCell(prompt_id=prompt.id, prompt_version=prompt.version, model_name=prompt.model_name)
+      if lookups[cell_index] is None:
+        evaluations, errors = self._simulate_evaluations(workshop_id, prompt, prompt.id, items), {}
+      else:
+        cache_keys, cached_results = lookups[cell_index]
+        fresh = fresh_outcomes.get(cell_index, {})
+        cell.cached = len(items) - len(fresh)
+        evaluations, errors = self._assemble_evaluations(workshop_id, prompt, prompt.id, items, cache_keys, cached_results, fresh, use_cache)
+
+      if evaluations:
+        cell.metrics = self._calculate_performance_metrics(evaluations)
+        cell.metrics.evaluation_errors = errors
+      elif errors:
+        cell.error = f'Judge evaluation failed for all {len(items)} traces: {next(iter(errors.values()))}'
+      else:
+        cell.error = 'No traces to evaluate'
+      cells.append(cell)
+
+    return JudgeMatrixEvaluationResult(total_traces=len(items), cells=cells)
+
+  def evaluate_prompt_sequential(self, workshop_id: str, evaluation_request: JudgeSequentialEvaluationRequest) -> JudgeSequentialEvaluationResult:
+    """Evaluate a judge prompt on randomly ordered traces, stopping as soon as the result is clear.
+
+    Traces are scored in batches. After each batch the stopping rule checks whether the
+    accuracy and kappa intervals are narrow enough, or whether they show the prompt to be
+    better or worse than the baseline prompt's stored metrics. Only the traces scored so
+    far count. Evaluations are not stored and prompt metrics are not updated, but the
+    judge outputs go to the result cache, so a later full evaluation reuses them.
+    """
+    prompt = self.db_service.get_judge_prompt(workshop_id, evaluation_request.prompt_id)
+    if not prompt:
+      raise ValueError(f'Judge prompt {evaluation_request.prompt_id} not found')
 
-    # Get annotations for evaluation
-    annotations = self.db_service.get_annotations(workshop_id)
-    if not annotations:
+    baseline_accuracy = baseline_kappa = None
+    if evaluation_request.baseline_prompt_id:
+      baseline = self.db_service.get_judge_prompt(workshop_id, evaluation_request.baseline_prompt_id)
+      if not baseline:
+        raise ValueError(f'Judge prompt {evaluation_request.baseline_prompt_id} not found')
+      if not baseline.performance_metrics:
+        raise ValueError(f'Baseline prompt {baseline.id} has not been evaluated yet')
+      baseline_accuracy = baseline.performance_metrics.get('accuracy')
+      baseline_kappa = baseline.performance_metrics.get('correlation')
+
+    dataset = JudgeDataLoader(self.db_service).load(workshop_id, evaluation_request.trace_ids or None, ground_truth=evaluation_request.ground_truth)
+    if not dataset.traces:
       raise ValueError('No annotations found for evaluation')
 
-    # Filter to specific traces if requested
-    if evaluation_request.trace_ids:
-      annotations = [a for a in annotations if a.trace_id in evaluation_request.trace_ids]
+    mlflow_config = self._resolve_mlflow_config(workshop_id, prompt, evaluation_request.override_model)
+    trace_ground_truth = dataset.ground_truth()
+    trace_ids = list(trace_ground_truth)
+    random.Random(evaluation_request.seed).shuffle(trace_ids)
+
+    batch_size = evaluation_request.batch_size or evaluation_request.max_concurrency or ServerConfig.JUDGE_MAX_CONCURRENCY
+    min_traces = min(evaluation_request.min_traces, len(trace_ids))
+    stop_rule = SequentialStopRule(
+      evaluation_request.target_ci_width,
+      evaluation_request.confidence,
+      planned_looks(len(trace_ids), min_traces, batch_size),
+      baseline_accuracy=baseline_accuracy,
+      baseline_kappa=baseline_kappa,
+    )
 
+    evaluations: List[JudgeEvaluation] = []
+    evaluation_errors: Dict[str, str] = {}
+    check = None
+    position = 0
+    while position < len(trace_ids):
+      # Fill up to min_traces before the first check, then one batch per check
+      size = max(batch_size, min_traces - position)
+      batch = trace_ids[position : position + size]
+      position += len(batch)
+
+      batch_evaluations, batch_errors = self._evaluate_traces(
+        workshop_id,
+        prompt,
+        prompt.id,
+        {trace_id: trace_ground_truth[trace_id] for trace_id in batch},
+        {trace_id: dataset.traces[trace_id] for trace_id in batch},
+        mlflow_config,
+        max_concurrency=evaluation_request.max_concurrency,
+        fail_fast=False,
+        use_cache=not evaluation_request.bypass_cache,
+      )
+      evaluations.extend(batch_evaluations)
+      evaluation_errors.update(batch_errors)
+
+      if evaluations:
+        check = stop_rule.check([e.human_rating for e in evaluations], [e.predicted_rating for e in evaluations])
+        if check.stop_reason:
+          break
+
+    if not evaluations:
+      raise ValueError('No traces could be evaluated')
+
+    metrics = self._calculate_performance_metrics(evaluations)
+    metrics.evaluation_errors = evaluation_errors
+    print(f'Sequential evaluation of prompt {prompt.id}: {len(evaluations)}/{len(trace_ids)} traces, {check.stop_reason or STOP_EXHAUSTED}')
+
+    return JudgeSequentialEvaluationResult(
+      prompt_id=prompt.id,
+      baseline_prompt_id=evaluation_request.baseline_prompt_id,
+      stop_reason=check.stop_reason or STOP_EXHAUSTED,
+      traces_evaluated=len(evaluations),
+      total_traces=len(trace_ids),
+      accuracy=JudgeMetricInterval(**asdict(check.accuracy)),
+      kappa=JudgeMetricInterval(**asdict(check.kappa)),
+      baseline_accuracy=baseline_accuracy,
+      baseline_kappa=baseline_kappa,
+      metrics=metrics,
+    )
+
+  def get_telemetry_summary(
+    self, workshop_id: str, group_by: str = 'prompt_version', prompt_id: Optional[str] = None, run_id: Optional[str] = None
+  ) -> List[JudgeTelemetrySummary]:
+    """Latency, token, retry and cost aggregates of judge calls per prompt version, run or endpoint."""
+    rows = self.db_service.get_judge_call_telemetry(workshop_id, prompt_id=prompt_id, run_id=run_id)
+    return summarize_telemetry(rows, group_by)
+
+  def _resolve_mlflow_config(self, workshop_id: str, prompt: JudgePrompt, override_model: Optional[str]):
+    """Return the MLflow config for judging a saved prompt, or None for demo simulation."""
     # Check if we should use real MLflow or simulation
     # IMPORTANT: Use override_model from UI if provided (e.g., user selected 'demo')
-    effective_model = evaluation_request.override_model if evaluation_request.override_model else prompt.model_name
-    use_mlflow = effective_model != 'demo' and MLFLOW_AVAILABLE
+    effective_model = override_model if override_model else prompt.model_name
+    use_mlflow = effective_model != 'demo' and (MLFLOW_AVAILABLE or is_serving_model(effective_model))
 
     # Add debug logging to track what's happening
     print(
       f"""Judge evaluation: saved_model='{prompt.model_name}',
-      override_model='{evaluation_request.override_model}', effective_model='{effective_model}',
+      override_model='{override_model}', effective_model='{effective_model}',
       use_mlflow={use_mlflow}, MLFLOW_AVAILABLE={MLFLOW_AVAILABLE}"""
     )
 
@@ -102,67 +618,7 @@ class JudgeService:
           detail='Cannot use MLflow evaluation with demo model. Select a real model (databricks-*, openai-*)',
         )
 
-    # Calculate mode-based ground truth at the evaluate_prompt level for meaningful aggregation
-    from collections import Counter
-
-    # Group annotations by trace_id and calculate mode (most common rating) as ground truth
-    trace_ground_truth = {}
-    trace_objects = {}
-
-    for annotation in annotations:
-      trace_id = annotation.trace_id
-      if trace_id not in trace_ground_truth:
-        trace_ground_truth[trace_id] = []
-        # Get trace object
-        trace = self.db_service.get_trace(trace_id)
-        if trace:
-          trace_objects[trace_id] = trace
-
-      trace_ground_truth[trace_id].append(annotation.rating)
-
-    # Calculate mode for each trace and create unique evaluations
-    unique_evaluations = []
-    for trace_id, ratings in trace_ground_truth.items():
-      if trace_id in trace_objects:
-        # Calculate mode (most common rating)
-        rating_counts = Counter(ratings)
-        mode_rating = rating_counts.most_common(1)[0][0]  # Most frequent rating
-
-        trace = trace_objects[trace_id]
-
-        # Evaluate using either MLflow or simulation
-        if use_mlflow:
-          try:
-            predicted_rating, reasoning = self._evaluate_with_mlflow(workshop_id, prompt, trace.input, trace.output, mlflow_config)
-          except Exception as e:
-            # Don't fallback - propagate the error
-            raise HTTPException(status_code=503, detail=f'MLflow evaluation failed: {str(e)}')
-        else:
-          predicted_rating = self._simulate_judge_rating(prompt.prompt_text, trace.input, trace.output, mode_rating)
-          reasoning = 'Test judge evaluation (development mode)'
-
-        evaluation = JudgeEvaluation(
-          id=str(uuid.uuid4()),
-          workshop_id=workshop_id,
-          prompt_id=evaluation_request.prompt_id,
-          trace_id=trace_id,
-          predicted_rating=predicted_rating,
-          human_rating=mode_rating,  # Use mode-based ground truth
-          confidence=None,  # Don't fake confidence values
-          reasoning=reasoning,
-        )
-        unique_evaluations.append(evaluation)
-
-    # Store evaluations in database
-    self.db_service.store_judge_evaluations(unique_evaluations)
-
-    # Calculate performance metrics
-    metrics = self._calculate_performance_metrics(unique_evaluations)
-
-    # Update prompt with performance metrics
-    self.db_service.update_judge_prompt_metrics(evaluation_request.prompt_id, metrics.__dict__)
-
-    return metrics
+    return mlflow_config if use_mlflow else None
 
   def evaluate_prompt_direct(self, workshop_id: str, evaluation_request: JudgeEvaluationDirectRequest) -> JudgeEvaluationResult:
     """Evaluate a judge prompt without saving it to history."""
@@ -182,17 +638,13 @@ class JudgeService:
       performance_metrics=None,
     )
 
-    # Get annotations for evaluation
-    annotations = self.db_service.get_annotations(workshop_id)
-    if not annotations:
+    # Load consensus ground truth (filtered to specific traces if requested) and its traces in bulk
+    dataset = JudgeDataLoader(self.db_service).load(workshop_id, evaluation_request.trace_ids or None, ground_truth=evaluation_request.ground_truth)
+    if not dataset.traces:
       raise ValueError('No annotations found for evaluation')
 
-    # Filter to specific traces if requested
-    if evaluation_request.trace_ids:
-      annotations = [a for a in annotations if a.trace_id in evaluation_request.trace_ids]
-
     # Use the model from the request
-    use_mlflow = evaluation_request.model_name != 'demo' and MLFLOW_AVAILABLE
+    use_mlflow = evaluation_request.model_name != 'demo' and (MLFLOW_AVAILABLE or is_serving_model(evaluation_request.model_name))
 
     # Get MLflow configuration if needed
     mlflow_config = None
@@ -208,81 +660,536 @@ class JudgeService:
       if not mlflow_config.databricks_host or not mlflow_config.databricks_token:
         raise HTTPException(status_code=400, detail='Invalid MLflow configuration: missing Databricks host or token')
 
-    # Calculate mode-based ground truth
-    from collections import Counter
-
-    # Group annotations by trace_id and calculate mode (most common rating) as ground truth
-    trace_ground_truth = {}
-    trace_objects = {}
-
-    for annotation in annotations:
-      trace_id = annotation.trace_id
-      if trace_id not in trace_ground_truth:
-        trace_ground_truth[trace_id] = []
-        # Get trace object
-        trace = self.db_service.get_trace(trace_id)
-        if trace:
-          trace_objects[trace_id] = trace
-
-      trace_ground_truth[trace_id].append(annotation.rating)
-
-    # Calculate mode for each trace and create unique evaluations
-    unique_evaluations = []
-    for trace_id, ratings in trace_ground_truth.items():
-      if trace_id in trace_objects:
-        # Calculate mode (most common rating)
-        rating_counts = Counter(ratings)
-        mode_rating = rating_counts.most_common(1)[0][0]
-
-        trace = trace_objects[trace_id]
-
-        # Evaluate using either MLflow or simulation
-        if use_mlflow:
-          try:
-            predicted_rating, reasoning = self._evaluate_with_mlflow(workshop_id, temp_prompt, trace.input, trace.output, mlflow_config)
-          except Exception as e:
-            raise HTTPException(status_code=503, detail=f'MLflow evaluation failed: {str(e)}')
-        else:
-          predicted_rating = self._simulate_judge_rating(temp_prompt.prompt_text, trace.input, trace.output, mode_rating)
-          reasoning = 'Test judge evaluation (development mode)'
-
-        evaluation = JudgeEvaluation(
-          id=str(uuid.uuid4()),
-          workshop_id=workshop_id,
-          prompt_id='temp',  # Temporary prompt ID
-          trace_id=trace_id,
-          predicted_rating=predicted_rating,
-          human_rating=mode_rating,
-          confidence=None,
-          reasoning=reasoning,
-        )
-        unique_evaluations.append(evaluation)
+    # Evaluate every trace (concurrently when calling a real model)
+    unique_evaluations, evaluation_errors = self._evaluate_traces(
+      workshop_id,
+      temp_prompt,
+      'temp',  # Temporary prompt ID
+      dataset.ground_truth(),
+      dataset.traces,
+      mlflow_config if use_mlflow else None,
+      max_concurrency=evaluation_request.max_concurrency,
+      fail_fast=evaluation_request.fail_fast,
+      batch=evaluation_request.batch,
+      use_cache=not evaluation_request.bypass_cache,
+    )
 
     # Calculate performance metrics (don't store evaluations)
     metrics = self._calculate_performance_metrics(unique_evaluations)
     metrics.prompt_id = 'temp'  # Set temporary prompt ID for metrics
+    metrics.evaluation_errors = evaluation_errors
 
     # Return both metrics and evaluations for UI display
     return JudgeEvaluationResult(metrics=metrics, evaluations=unique_evaluations)
 
+  def _ground_truth_items(self, trace_ground_truth: Dict[str, int], trace_objects: Dict[str, Any]) -> List[Tuple[str, Any, int]]:
+    """Pair each trace with its mode (most common) human rating as ground truth."""
+    return [
+      (trace_id, trace_objects[trace_id], mode_rating) for trace_id, mode_rating in trace_ground_truth.items() if trace_id in trace_objects
+    ]
+
+  def _make_evaluation(
+    self, workshop_id: str, prompt_id: str, trace_id: str, mode_rating: int, predicted_rating: int, reasoning: str
+  ) -> JudgeEvaluation:
+    return JudgeEvaluation(
+      id=str(uuid.uuid4()),
+      workshop_id=workshop_id,
+      prompt_id=prompt_id,
+      trace_id=trace_id,
+      predicted_rating=predicted_rating,
+      human_rating=mode_rating,  # Use mode-based ground truth
+      confidence=None,  # Don't fake confidence values
+      reasoning=reasoning,
+    )
+
+  def _lookup_cached_results(
+    self, workshop_id: str, prompt: JudgePrompt, items: List[Tuple[str, Any, int]], use_cache: bool
+  ) -> Tuple[Dict[str, str], Dict[str, Tuple[int, Optional[str]]], List[Tuple[str, Any, int]]]:
+    """Look up cached judge outputs for the items.
+
+    Returns:
+        Tuple of (cache key per trace ID, cached results by cache key, items still to evaluate)
+    """
+    if not use_cache:
+      return {}, {}, list(items)
+
+    cache_keys = {
+      trace_id: judge_cache_key(prompt.prompt_text, prompt.model_name, prompt.model_parameters, trace.input, trace.output, prompt.few_shot_examples)
+      for trace_id, trace, _ in items
+    }
+    cached_results = self.db_service.get_judge_cache_entries(workshop_id, list(cache_keys.values()))
+    pending = [item for item in items if cache_keys[item[0]] not in cached_results]
+    judge_cache_stats.record(workshop_id, hits=len(items) - len(pending), misses=len(pending))
+    return cache_keys, cached_results, pending
+
+  def _evaluate_traces(
+    self,
+    workshop_id: str,
+    prompt: JudgePrompt,
+    prompt_id: str,
+    trace_ground_truth: Dict[str, int],
+    trace_objects: Dict[str, Any],
+    mlflow_config=None,
+    max_concurrency: Optional[int] = None,
+    fail_fast: bool = True,
+    batch: bool = False,
+    use_cache: bool = True,
+    checkpoint: Optional[Callable[[List[JudgeEvaluation]], None]] = None,
+    packed: bool = False,
+    run_id: Optional[str] = None,
+  ) -> Tuple[List[JudgeEvaluation], Dict[str, str]]:
+    """Judge every annotated trace against its mode human rating.
+
+    With an MLflow config the judge model is called concurrently (rate limited per
+    serving endpoint), or for ``batch`` in a single ``mlflow.evaluate`` run; without
+    one the demo simulation is used. Judge outputs for unchanged prompt/trace pairs
+    are reused from the result cache unless ``use_cache`` is False.
+
+    ``checkpoint`` receives every evaluation exactly once: fresh judge outputs as soon
+    as each call completes, and cached or simulated ones at the end.
+
+    With ``packed``, short traces are judged several per model call when the backend
+    returns plain chat completions (``serving:*`` and ``databricks-*`` models).
+
+    Telemetry of every scheduled judge call is stored, tagged with ``run_id``.
+
+    Returns:
+        Tuple of (evaluations in trace order, error message per failed trace ID)
+    """
+    items = self._ground_truth_items(trace_ground_truth, trace_objects)
+
+    if mlflow_config is None:
+      evaluations = self._simulate_evaluations(workshop_id, prompt, prompt_id, items)
+      if checkpoint is not None:
+        checkpoint(evaluations)
+      return evaluations, {}
+
+    # Serve unchanged prompt/trace pairs from the judge result cache
+    cache_keys, cached_results, pending = self._lookup_cached_results(workshop_id, prompt, items, use_cache)
+
+    checkpointed: Dict[str, JudgeEvaluation] = {}
+    telemetry = JudgeTelemetryRecorder(workshop_id, run_id)
+
+    def on_complete(index: int, result: Optional[Tuple[int, str]], error: Optional[Exception]) -> None:
+      if checkpoint is None or error is not None:
+        return
+      trace_id, _, mode_rating = pending[index]
+      evaluation = self._make_evaluation(workshop_id, prompt_id, trace_id, mode_rating, *result)
+      checkpoint([evaluation])
+      checkpointed[trace_id] = evaluation
+
+    try:
+      if not pending:
+        outcomes = []
+      elif batch and not is_serving_model(prompt.model_name):
+        rows = [(trace.input, trace.output) for _, trace, _ in pending]
+        outcomes = self._evaluate_batch_with_mlflow(workshop_id, prompt, rows, mlflow_config, max_workers=max_concurrency)
+        first_error = next((error for _, error in outcomes if error is not None), None)
+        if fail_fast and first_error is not None:
+          raise first_error
+      elif packed and self._supports_packing(prompt.model_name):
+        outcomes = self._judge_packed(workshop_id, prompt, pending, mlflow_config, max_concurrency, fail_fast, on_complete, telemetry)
+      else:
+        scheduler = self._endpoint_scheduler(prompt.model_name)
+        evaluator = ConcurrentEvaluator(max_workers=max_concurrency, fail_fast=fail_fast)
+        outcomes = evaluator.map(
+          lambda item: telemetry.call(scheduler, prompt, item[0], self._judge_trace, workshop_id, prompt, item[1].input, item[1].output, mlflow_config),
+          pending,
+          on_complete=on_complete,
+        )
+    except Exception as e:
+      # Don't fallback - propagate the error
+      raise HTTPException(status_code=503, detail=f'MLflow evaluation failed: {str(e)}') from e
+    finally:
+      telemetry.flush(self.db_service)
+
+    fresh_outcomes = {trace_id: outcome for (trace_id, _, _), outcome in zip(pending, outcomes, strict=True)}
+    evaluations, errors = self._assemble_evaluations(workshop_id, prompt, prompt_id, items, cache_keys, cached_results, fresh_outcomes, use_cache)
+    if checkpoint is not None:
+      evaluations = [checkpointed.get(evaluation.trace_id, evaluation) for evaluation in evaluations]
+      checkpoint([evaluation for evaluation in evaluations if evaluation.trace_id not in checkpointed])
+
+    if items and not evaluations:
+      raise HTTPException(status_code=503, detail=f'MLflow evaluation failed for all {len(items)} traces: {next(iter(errors.values()))}')
+
+    return evaluations, errors
+
+  def _supports_packing(self, model_name: str) -> bool:
+    """Whether the judge backend returns plain chat completions that can hold several scores."""
+    return is_serving_model(model_name) or model_name.startswith('databricks-')
+
+  def _packed_chat(self, workshop_id: str, prompt: JudgePrompt, mlflow_config) -> Callable[[str], str]:
+    """Return a function sending one user message to the prompt's model and returning the reply text."""
+    if is_serving_model(prompt.model_name):
+      client = ServingJudgeClient.for_workspace(mlflow_config.databricks_host, mlflow_config.databricks_token)
+      endpoint_name = serving_endpoint_name(prompt.model_name)
+      parameters = prompt.model_parameters or {'temperature': 0.0}
+      return lambda content: client.chat(endpoint_name, [{'role': 'user', 'content': content}], parameters)
+
+    from server.services.databricks_service import DatabricksService
+
+    databricks_service = DatabricksService(workshop_id=workshop_id, db_service=self.db_service)
+    parameters = dict(prompt.model_parameters or {})
+    temperature = parameters.pop('temperature', 0.0)
+    max_tokens = parameters.pop('max_tokens', None)
+
+    def chat(content: str) -> str:
+      response = databricks_service.call_chat_completion(
+        endpoint_name=prompt.model_name,
+        messages=[{'role': 'user', 'content': content}],
+        temperature=temperature,
+        max_tokens=max_tokens,
+        model_parameters=parameters or None,
+      )
+      return response['choices'][0]['message']['content'] or ''
+
+    return chat
+
+  def _judge_packed(
+    self,
+    workshop_id: str,
+    prompt: JudgePrompt,
+    pending: List[Tuple[str, Any, int]],
+    mlflow_config,
+    max_concurrency: Optional[int],
+    fail_fast: bool,
+    on_complete: Callable[[int, Optional[Tuple[int, str]], Optional[Exception]], None],
+    telemetry: JudgeTelemetryRecorder,
+  ) -> List[Tuple[Any, Optional[Exception]]]:
+    """Judge items in token-budgeted packs, one model call per pack.
+
+    Items the packed reply has no usable score for are re-judged with a single-trace
+    call. That includes every item of a pack whose reply is not valid JSON.
+
+    Returns:
+        One ``(result, error)`` pair per item, in input order
+    """
+    chat = self._packed_chat(workshop_id, prompt, mlflow_config)
+    token_counts = [
+      trace.token_estimate if trace.token_estimate is not None else estimate_trace_tokens(trace.input, trace.output) for _, trace, _ in pending
+    ]
+    packs = plan_packs(
+      token_counts,
+      ServerConfig.JUDGE_PACK_TOKEN_BUDGET - estimate_tokens(prompt.prompt_text),
+      ServerConfig.JUDGE_PACK_MAX_ITEMS,
+      ServerConfig.JUDGE_PACK_MAX_TRACE_TOKENS,
+    )
+
+    def judge_single(index: int) -> Tuple[int, str]:
+      trace = pending[index][1]
+      return self._judge_trace(workshop_id, prompt, trace.input, trace.output, mlflow_config)
+
+    def judge_pack(indexes: List[int]) -> List[Tuple[Any, Optional[Exception]]]:
+      if len(indexes) == 1:
+        return [(judge_single(indexes[0]), None)]
+
+      item_ids = [pack_item_id(pending[index][0]) for index in indexes]
+      reply = chat(render_packed_prompt(prompt.prompt_text, [(item_id, pending[index][1].input, pending[index][1].output) for item_id, index in zip(item_ids, indexes, strict=True)]))
+      try:
+        scores = parse_packed_response(reply, item_ids)
+      except ValueError as e:
+        print(f'Warning: Could not parse packed judge response for {len(indexes)} traces, judging them one by one: {e}')
+        scores = {}
+
+      results = []
+      for item_id, index in zip(item_ids, indexes, strict=True):
+        if item_id in scores:
+          score, justification = scores[item_id]
+          results.append(((self._score_to_rating(score), justification or ''), None))
+          continue
+        try:
+          results.append((judge_single(index), None))
+        except Exception as e:
+          if is_throttle_error(e):
+            # Let the endpoint scheduler back off and retry the pack
+            raise
+          results.append((None, e))
+      return results
+
+    outcomes: List[Tuple[Any, Optional[Exception]]] = [(None, None)] * len(pending)
+
+    def on_pack_complete(pack_index: int, results: Optional[List[Tuple[Any, Optional[Exception]]]], error: Optional[Exception]) -> None:
+      for position, index in enumerate(packs[pack_index]):
+        outcomes[index] = results[position] if error is None else (None, error)
+        on_complete(index, *outcomes[index])
+        if fail_fast and outcomes[index][1] is not None:
+          raise outcomes[index][1]
+
+    scheduler = self._endpoint_scheduler(prompt.model_name)
+    evaluator = ConcurrentEvaluator(max_workers=max_concurrency, fail_fast=False)
+    evaluator.map(
+      lambda indexes: telemetry.call(scheduler, prompt, pending[indexes[0]][0], judge_pack, indexes, traces=len(indexes)),
+      packs,
+      on_complete=on_pack_complete,
+    )
+    print(f'Packed judging: {len(pending)} traces in {len(packs)} packs')
+    return outcomes
+
+  def _simulate_evaluations(self, workshop_id: str, prompt: JudgePrompt, prompt_id: str, items: List[Tuple[str, Any, int]]) -> List[JudgeEvaluation]:
+    """Demo-mode evaluations for every item."""
+    return [
+      self._make_evaluation(
+        workshop_id,
+        prompt_id,
+        trace_id,
+        mode_rating,
+        self._simulate_judge_rating(prompt.prompt_text, trace.input, trace.output, mode_rating),
+        'Test judge evaluation (development mode)',
+      )
+      for trace_id, trace, mode_rating in items
+    ]
+
+  def _assemble_evaluations(
+    self,
+    workshop_id: str,
+    prompt: JudgePrompt,
+    prompt_id: str,
+    items: List[Tuple[str, Any, int]],
+    cache_keys: Dict[str, str],
+    cached_results: Dict[str, Tuple[int, Optional[str]]],
+    fresh_outcomes: Dict[str, Tuple[Any, Optional[Exception]]],
+    use_cache: bool,
+  ) -> Tuple[List[JudgeEvaluation], Dict[str, str]]:
+    """Build evaluations in trace order from cached and fresh judge outputs.
+
+    Fresh outputs are written to the judge result cache when ``use_cache`` is set.
+
+    Returns:
+        Tuple of (evaluations, error message per failed trace ID)
+    """
+    evaluations = []
+    errors = {}
+    new_cache_entries = {}
+    for trace_id, _, mode_rating in items:
+      if trace_id in fresh_outcomes:
+        result, error = fresh_outcomes[trace_id]
+        if error is not None:
+          print(f'Warning: Judge evaluation failed for trace {trace_id}: {error}')
+          errors[trace_id] = str(error)
+          continue
+        if use_cache:
+          new_cache_entries[cache_keys[trace_id]] = result
+      else:
+        result = cached_results[cache_keys[trace_id]]
+      predicted_rating, reasoning = result
+      evaluations.append(self._make_evaluation(workshop_id, prompt_id, trace_id, mode_rating, predicted_rating, reasoning))
+
+    if use_cache and new_cache_entries:
+      self.db_service.store_judge_cache_entries(workshop_id, prompt.model_name, new_cache_entries, ServerConfig.JUDGE_CACHE_MAX_ENTRIES)
+
+    return evaluations, errors
+
+  def _endpoint_scheduler(self, model_name: str) -> EndpointScheduler:
+    """Adaptive scheduler for the serving endpoint behind a judge model name."""
+    return get_endpoint_scheduler(serving_endpoint_name(model_name) if is_serving_model(model_name) else model_name)
+
+  def _judge_trace(self, workshop_id: str, prompt: JudgePrompt, input_text: str, output_text: str, mlflow_config) -> tuple[int, str]:
+    """Score one trace with the backend selected by the prompt's model name."""
+    if is_serving_model(prompt.model_name):
+      return self._evaluate_with_serving(prompt, input_text, output_text, mlflow_config)
+    return self._evaluate_with_mlflow(workshop_id, prompt, input_text, output_text, mlflow_config)
+
+  def _evaluate_with_serving(self, prompt: JudgePrompt, input_text: str, output_text: str, mlflow_config) -> tuple[int, str]:
+    """Evaluate by calling the serving endpoint directly and parsing the score from the reply."""
+    client = ServingJudgeClient.for_workspace(mlflow_config.databricks_host, mlflow_config.databricks_token)
+    judge_prompt = render_serving_prompt(prompt.prompt_text, input_text, output_text)
+    try:
+      reply = client.chat(
+        serving_endpoint_name(prompt.model_name),
+        [{'role': 'user', 'content': judge_prompt}],
+        prompt.model_parameters or {'temperature': 0.0},
+      )
+    except requests.RequestException as e:
+      if is_throttle_error(e):
+        # Left for the endpoint scheduler to back off and retry
+        raise
+      raise ValueError(f'Serving endpoint call failed: {str(e)}') from e
+
+    score, justification = parse_judge_reply(reply)
+    return self._score_to_rating(score), justification or reply.strip()
+
   def _evaluate_with_mlflow(self, workshop_id: str, prompt: JudgePrompt, input_text: str, output_text: str, mlflow_config) -> tuple[int, str]:
     """Evaluate using real MLflow LLM judge."""
-    # Set up MLflow with Databricks credentials
-    os.environ['DATABRICKS_HOST'] = mlflow_config.databricks_host.rstrip('/')
-    os.environ['DATABRICKS_TOKEN'] = mlflow_config.databricks_token
+    # Evaluate single trace using MLflow
+    import pandas as pd
+
+    # Create single-row evaluation dataset
+    # Use 'input' and 'output' (singular) as column names
+    eval_df = pd.DataFrame([{'input': input_text, 'output': output_text}])
+
+    with self._judge_context(workshop_id, prompt, mlflow_config) as context:
+      try:
+        # Run MLflow evaluation with explicit column mapping
+        # Log to the cached experiment explicitly instead of re-activating it for every call
+        with mlflow.start_run(experiment_id=context.experiment_id):
+          results = mlflow.evaluate(
+            data=eval_df,
+            predictions='output',
+            model_type='text',
+            extra_metrics=[context.metric],
+            evaluator_config={
+              'col_mapping': {
+                'inputs': 'input',  # Map 'inputs' in prompt to 'input' column
+                'outputs': 'output',  # Map 'outputs' in prompt to 'output' column
+              }
+            },
+          )
+      except Exception as e:
+        if is_throttle_error(e) or is_throttle_message(str(e)):
+          raise EndpointThrottledError(f'Judge endpoint throttled the request: {str(e)}') from e
+        raise ValueError(f'MLflow evaluation failed: {str(e)}') from e
+
+    # Extract rating from results - fail explicitly if not found
+    if not hasattr(results, 'metrics') or not results.metrics:
+      raise ValueError('MLflow evaluation returned no metrics')
+
+    metric_results = results.metrics
+
+    # Debug: Log what MLflow returned
+    print(f'MLflow metrics available: {list(metric_results.keys())}')
+    print(f'Full metrics: {metric_results}')
+
+    # Look for the specific workshop_judge/mean key
+    expected_key = 'workshop_judge/mean'
+
+    if expected_key not in metric_results:
+      # Log all available keys for debugging
+      available_keys = list(metric_results.keys())
+      raise ValueError(
+        f"Expected '{expected_key}' not found in MLflow results. "
+        f'Available keys: {available_keys}. '
+        f'This indicates either a bug in our metric creation or an MLflow API change.'
+      )
+
+    score = metric_results[expected_key]
+    print(f'MLflow score for trace: {score}')
+
+    # MLflow reports a failed judge call as a missing score with the error as justification
+    if isinstance(score, float) and score != score:
+      justification = self._first_justification(results)
+      if is_throttle_message(justification):
+        raise EndpointThrottledError(f'Judge endpoint throttled the request: {justification}')
+
+    # MLflow does not surface the judge's token usage
+    report_usage(
+      estimate_tokens(prompt.prompt_text) + estimate_trace_tokens(input_text, output_text),
+      estimate_tokens(self._first_justification(results)),
+      estimated=True,
+    )
+
+    rating = self._score_to_rating(score)
+    reasoning = f'MLflow judge evaluation (score: {score:.2f})'
+
+    return rating, reasoning
+
+  def _first_justification(self, results) -> Optional[str]:
+    """Justification of the first row of an MLflow evaluation results table."""
+    try:
+      justification = results.tables['eval_results_table']['workshop_judge/justification'].iloc[0]
+    except (AttributeError, KeyError, IndexError, TypeError):
+      return None
+    return justification if isinstance(justification, str) else None
+
+  def _evaluate_batch_with_mlflow(
+    self, workshop_id: str, prompt: JudgePrompt, rows: List[Tuple[str, str]], mlflow_config, max_workers: Optional[int] = None
+  ) -> List[Tuple[Optional[Tuple[int, str]], Optional[Exception]]]:
+    """Evaluate many (input, output) pairs in a single MLflow run.
+
+    The experiment is set up and the metric built once, and one ``mlflow.evaluate``
+    call scores the whole DataFrame. Per-row scores and justifications are read back
+    from the evaluation results table.
+
+    Returns:
+        One ``((rating, reasoning), error)`` pair per row, in input order
+    """
+    import pandas as pd
+
+    eval_df = pd.DataFrame([{'input': input_text, 'output': output_text} for input_text, output_text in rows])
+
+    with self._judge_context(workshop_id, prompt, mlflow_config, max_workers=max_workers) as context:
+      try:
+        # Log to the cached experiment explicitly instead of re-activating it for every call
+        with mlflow.start_run(experiment_id=context.experiment_id):
+          results = mlflow.evaluate(
+            data=eval_df,
+            predictions='output',
+            model_type='text',
+            extra_metrics=[context.metric],
+            evaluator_config={
+              'col_mapping': {
+                'inputs': 'input',  # Map 'inputs' in prompt to 'input' column
+                'outputs': 'output',  # Map 'outputs' in prompt to 'output' column
+              }
+            },
+          )
+        results_table = results.tables['eval_results_table']
+      except Exception as e:
+        raise ValueError(f'MLflow evaluation failed: {str(e)}') from e
+
+    score_column = 'workshop_judge/score'
+    justification_column = 'workshop_judge/justification'
+    if score_column not in results_table.columns or len(results_table) != len(rows):
+      raise ValueError(
+        f"Expected '{score_column}' for {len(rows)} rows in the MLflow results table. "
+        f'Got columns {list(results_table.columns)} with {len(results_table)} rows.'
+      )
+
+    scores = results_table[score_column].tolist()
+    justifications = results_table[justification_column].tolist() if justification_column in results_table.columns else [None] * len(rows)
+
+    outcomes: List[Tuple[Optional[Tuple[int, str]], Optional[Exception]]] = []
+    for score, justification in zip(scores, justifications, strict=True):
+      try:
+        rating = self._score_to_rating(float(score) if score is not None else float('nan'))
+      except (TypeError, ValueError) as e:
+        outcomes.append((None, e))
+        continue
+      reasoning = justification if isinstance(justification, str) and justification else f'MLflow judge evaluation (score: {score:.2f})'
+      outcomes.append(((rating, reasoning), None))
+    return outcomes
+
+  @contextmanager
+  def _judge_context(self, workshop_id: str, prompt: JudgePrompt, mlflow_config, max_workers: Optional[int] = None) -> Iterator[JudgeContext]:
+    """Point MLflow at the workshop and yield its cached experiment and judge metric.
+
+    The workshop's credentials stay in place until the block exits, so run the MLflow
+    calls inside it.
+    """
+    with mlflow_credentials.hold(mlflow_config, lambda: self._apply_mlflow_credentials(mlflow_config)):
+      yield judge_contexts.get(
+        workshop_id,
+        prompt,
+        mlflow_config,
+        resolve_experiment=lambda: self._setup_mlflow_experiment(mlflow_config),
+        build_metric=lambda: self._build_judge_metric(prompt, max_workers=max_workers),
+        max_workers=max_workers,
+      )
 
+  def _apply_mlflow_credentials(self, mlflow_config) -> None:
+    """Set the Databricks credentials and tracking URI (local state only, no remote calls)."""
     # Validate credentials format
     if not mlflow_config.databricks_host.startswith('https://'):
       raise ValueError('Databricks host must start with https://')
+
+    # Other services rewrite these for their own workspace, so they are applied on every call
+    os.environ['DATABRICKS_HOST'] = mlflow_config.databricks_host.rstrip('/')
+    os.environ['DATABRICKS_TOKEN'] = mlflow_config.databricks_token
+
+    # Use same method as intake service - "databricks" URI with environment variables
+    # This leverages databricks-sdk for authentication which works reliably
+    mlflow.set_tracking_uri('databricks')
+
+  def _setup_mlflow_experiment(self, mlflow_config) -> str:
+    """Resolve and activate the workshop's MLflow experiment.
+
+    Returns:
+        The experiment ID
+    """
     if not mlflow_config.databricks_token.startswith('dapi'):
       print(f"Warning: Databricks token should typically start with 'dapi'. Current token starts with: {mlflow_config.databricks_token[:10]}...")
 
     # Initialize MLflow with proper experiment context
     try:
-      # Use same method as intake service - "databricks" URI with environment variables
-      # This leverages databricks-sdk for authentication which works reliably
-      mlflow.set_tracking_uri('databricks')
-
       # Use existing experiment from MLflow config instead of creating new ones
       # NOTE: Default experiment ID '0' often requires special permissions in Databricks
       if hasattr(mlflow_config, 'experiment_id') and mlflow_config.experiment_id:
@@ -331,6 +1238,10 @@ class JudgeService:
       else:
         raise ValueError(f'Failed to initialize MLflow experiment: {error_msg}')
 
+    return experiment_id
+
+  def _build_judge_metric(self, prompt: JudgePrompt, max_workers: Optional[int] = None):
+    """Create the MLflow GenAI metric for a judge prompt."""
     # Determine model URI based on model name
     if prompt.model_name.startswith('databricks-'):
       model_uri = f'databricks:/{prompt.model_name}'
@@ -351,59 +1262,15 @@ class JudgeService:
         judge_prompt=mlflow_prompt_template,  # Pass template, not formatted prompt!
         model=model_uri,
         parameters=prompt.model_parameters or {'temperature': 0.0, 'max_tokens': 10},
+        max_workers=max_workers or ServerConfig.JUDGE_MAX_CONCURRENCY,
       )
     except Exception as e:
       raise ValueError(f'Failed to create MLflow metric: {str(e)}')
 
-    # Evaluate single trace using MLflow
-    import pandas as pd
-
-    # Create single-row evaluation dataset
-    # Use 'input' and 'output' (singular) as column names
-    eval_df = pd.DataFrame([{'input': input_text, 'output': output_text}])
-
-    try:
-      # Run MLflow evaluation with explicit column mapping
-      results = mlflow.evaluate(
-        data=eval_df,
-        predictions='output',
-        model_type='text',
-        extra_metrics=[metric],
-        evaluator_config={
-          'col_mapping': {
-            'inputs': 'input',  # Map 'inputs' in prompt to 'input' column
-            'outputs': 'output',  # Map 'outputs' in prompt to 'output' column
-          }
-        },
-      )
-    except Exception as e:
-      raise ValueError(f'MLflow evaluation failed: {str(e)}')
-
-    # Extract rating from results - fail explicitly if not found
-    if not hasattr(results, 'metrics') or not results.metrics:
-      raise ValueError('MLflow evaluation returned no metrics')
-
-    metric_results = results.metrics
-
-    # Debug: Log what MLflow returned
-    print(f'MLflow metrics available: {list(metric_results.keys())}')
-    print(f'Full metrics: {metric_results}')
-
-    # Look for the specific workshop_judge/mean key
-    expected_key = 'workshop_judge/mean'
-
-    if expected_key not in metric_results:
-      # Log all available keys for debugging
-      available_keys = list(metric_results.keys())
-      raise ValueError(
-        f"Expected '{expected_key}' not found in MLflow results. "
-        f'Available keys: {available_keys}. '
-        f'This indicates either a bug in our metric creation or an MLflow API change.'
-      )
-
-    score = metric_results[expected_key]
-    print(f'MLflow score for trace: {score}')
+    return metric
 
+  def _score_to_rating(self, score: Any) -> int:
+    """Validate a judge score returned by MLflow and convert it to an integer rating."""
     # Validate score is numeric (but don't assume range - user controls this)
     if not isinstance(score, (int, float)):
       raise ValueError(f'Expected numeric score, got {type(score)}: {score}')
@@ -419,10 +1286,7 @@ class JudgeService:
       )
 
     # Convert to integer rating (user's prompt should produce appropriate range)
-    rating = int(round(score))
-    reasoning = f'MLflow judge evaluation (score: {score:.2f})'
-
-    return rating, reasoning
+    return int(round(score))
 
   def _simulate_judge_rating(self, prompt: str, input_text: str, output_text: str, human_rating: int) -> int:
     """Simulate an LLM judge rating for demo mode."""
@@ -459,57 +1323,34 @@ class JudgeService:
     if not evaluations:
       raise ValueError('No evaluations to calculate metrics from')
 
-    human_ratings = [e.human_rating for e in evaluations]
-    predicted_ratings = [e.predicted_rating for e in evaluations]
-
-    # Debug logging
-    print(f'🔍 Calculating metrics for {len(evaluations)} evaluations')
-    print(f'🔍 Human ratings: {human_ratings}')
-    print(f'🔍 Predicted ratings: {predicted_ratings}')
-    print(f'🔍 Human ratings variance: {np.var(human_ratings)}')
-    print(f'🔍 Predicted ratings variance: {np.var(predicted_ratings)}')
-
-    # Calculate Cohen's kappa (inter-rater reliability for categorical data)
-    try:
-      kappa = cohen_kappa_score(human_ratings, predicted_ratings)
-      print(f"🔍 Cohen's kappa: {kappa}")
-
-      # Handle edge cases where kappa might be NaN or undefined
-      if np.isnan(kappa):
-        # Fallback to simple agreement when kappa is undefined
-        matches = sum(1 for h, p in zip(human_ratings, predicted_ratings) if h == p)
-        kappa = matches / len(evaluations)  # Simple agreement ratio
-        print(f'🔍 Kappa undefined, using agreement ratio: {kappa}')
-    except Exception as e:
-      # If kappa calculation fails for any reason, use simple agreement
-      print(f'🔍 Kappa calculation failed: {e}, using agreement ratio')
-      matches = sum(1 for h, p in zip(human_ratings, predicted_ratings) if h == p)
-      kappa = matches / len(evaluations)  # Simple agreement ratio
-
-    # Calculate accuracy (exact match)
-    accuracy = accuracy_score(human_ratings, predicted_ratings)
-
-    # Calculate agreement by rating level
-    agreement_by_rating = {}
-    for rating in range(1, 6):
-      human_at_rating = [h for h, p in zip(human_ratings, predicted_ratings) if h == rating]
-      predicted_at_rating = [p for h, p in zip(human_ratings, predicted_ratings) if h == rating]
-      if human_at_rating:
-        agreement_by_rating[str(rating)] = accuracy_score(human_at_rating, predicted_at_rating)
-      else:
-        agreement_by_rating[str(rating)] = 0.0
-
-    # Calculate confusion matrix
-    cm = confusion_matrix(human_ratings, predicted_ratings, labels=[1, 2, 3, 4, 5])
+    agreement = compute_agreement_metrics(
+      [e.human_rating for e in evaluations],
+      [e.predicted_rating for e in evaluations],
+      resamples=ServerConfig.JUDGE_METRICS_BOOTSTRAP_RESAMPLES,
+      confidence=ServerConfig.JUDGE_METRICS_CONFIDENCE,
+    )
+    print(
+      f'🔍 Metrics for {len(evaluations)} evaluations: accuracy={agreement.accuracy:.3f}, '
+      f'kappa={agreement.kappa:.3f}, weighted_kappa={agreement.weighted_kappa:.3f}'
+    )
 
+    estimates = {'accuracy': agreement.accuracy, 'kappa': agreement.kappa, 'weighted_kappa': agreement.weighted_kappa}
     return JudgePerformanceMetrics(
       prompt_id=evaluations[0].prompt_id,
-      correlation=float(kappa) if not np.isnan(kappa) else 0.0,  # Using kappa instead of correlation
-      accuracy=float(accuracy),
+      correlation=agreement.kappa,  # Using kappa instead of correlation
+      accuracy=agreement.accuracy,
       mean_absolute_error=0.0,  # Deprecated, kept for backwards compatibility
-      agreement_by_rating=agreement_by_rating,
-      confusion_matrix=cm.tolist(),
+      # Share of each human rating the judge matched (recall), 0.0 for ratings humans never gave
+      agreement_by_rating={str(label): recall or 0.0 for label, recall in agreement.recall.items()},
+      confusion_matrix=agreement.confusion.tolist(),
       total_evaluations=len(evaluations),
+      weighted_kappa=agreement.weighted_kappa,
+      rating_labels=agreement.labels,
+      precision_by_rating={str(label): value for label, value in agreement.precision.items()},
+      recall_by_rating={str(label): value for label, value in agreement.recall.items()},
+      confidence_intervals={
+        name: JudgeMetricInterval(estimate=estimates[name], lower=lower, upper=upper) for name, (lower, upper) in agreement.intervals.items()
+      },
     )
 
   def export_judge(self, workshop_id: str, export_config: JudgeExportConfig) -> Dict[str, Any]:
@@ -525,15 +1366,12 @@ class JudgeService:
     # Get few-shot examples if requested
     few_shot_examples = []
     if export_config.include_examples and prompt.few_shot_examples:
+      dataset = JudgeDataLoader(self.db_service).load(workshop_id, prompt.few_shot_examples)
       for trace_id in prompt.few_shot_examples:
-        trace = self.db_service.get_trace(trace_id)
-        annotations = self.db_service.get_annotations(workshop_id, user_id=None)
-        trace_annotations = [a for a in annotations if a.trace_id == trace_id]
+        trace = dataset.traces.get(trace_id)
+        most_common_rating = dataset.mode_rating(trace_id)
 
-        if trace and trace_annotations:
-          # Use the most common rating if multiple annotations
-          ratings = [a.rating for a in trace_annotations]
-          most_common_rating = max(set(ratings), key=ratings.count)
+        if trace and most_common_rating is not None:
 
           few_shot_examples.append(
             {
@@ -672,35 +1510,22 @@ examples = {json.dumps(few_shot_examples[:3], indent=4)}
     else:
       raise ValueError(f'Unsupported export format: {export_config.export_format}')
 
-  def select_few_shot_examples(self, workshop_id: str, num_examples: int = 3) -> List[str]:
-    """Intelligently select few-shot examples from annotations."""
-    annotations = self.db_service.get_annotations(workshop_id)
-
-    if len(annotations) < num_examples:
-      return [a.trace_id for a in annotations]
-
-    # Group by rating to get diverse examples
-    by_rating = {}
-    for annotation in annotations:
-      if annotation.rating not in by_rating:
-        by_rating[annotation.rating] = []
-      by_rating[annotation.rating].append(annotation)
-
-    selected = []
-    ratings = sorted(by_rating.keys())
-
-    # Try to get examples from different rating levels
-    for rating in ratings:
-      if len(selected) >= num_examples:
-        break
-      # Select one example from this rating level
-      examples_at_rating = by_rating[rating]
-      selected.append(random.choice(examples_at_rating).trace_id)
-
-    # Fill remaining slots randomly if needed
-    remaining_annotations = [a for a in annotations if a.trace_id not in selected]
-    while len(selected) < num_examples and remaining_annotations:
-      selected.append(random.choice(remaining_annotations).trace_id)
-      remaining_annotations = [a for a in remaining_annotations if a.trace_id != selected[-1]]
-
-    return selected
+  def select_few_shot_examples(self, workshop_id: str, num_examples: int = 3, diversity: float = 0.5) -> List[FewShotExample]:
+    """Select representative, mutually dissimilar few-shot examples from annotated traces.
+
+    Examples are spread over consensus rating levels, with high-agreement traces
+    before contested ones. Within a level, max-marginal relevance over the workshop's
+    cached TF-IDF index picks typical traces unlike those already chosen.
+    """
+    candidates = [
+      FewShotCandidate(consensus.trace_id, consensus.mode, consensus.agreement, consensus.count)
+      for consensus in self.db_service.get_trace_consensus(workshop_id)
+    ]
+
+    def load_texts(trace_ids: List[str]) -> Dict[str, str]:
+      traces = self.db_service.get_traces_by_ids(trace_ids)
+      return {trace_id: f'{trace.input}\n{trace.output}' for trace_id, trace in traces.items()}
+
+    index = few_shot_indexes.synced(workshop_id, [candidate.trace_id for candidate in candidates], load_texts)
+    selected = select_diverse_examples(index, candidates, num_examples, diversity=diversity)
+    return [FewShotExample(**asdict(candidate)) for candidate in selected]
@@ -0,0 +1,188 @@
+"""Per-call telemetry for judge model calls.
+
+Every judge call records its endpoint, wall latency, scheduler queue wait, throttled
+retries and prompt/completion tokens. The values come from several layers. The
+endpoint scheduler knows the queue wait and retries, and the backend knows the token
+usage. They meet in a ``CallTelemetry`` record bound to the calling thread for the
+duration of the call. ``JudgeTelemetryRecorder`` wraps each scheduled call, collects
+one row per call from the worker threads and writes the rows from the request thread.
+Aggregates per prompt version, run or endpoint are computed by ``summarize_telemetry``.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from server.config import ServerConfig
+from server.models import JudgePrompt, JudgeTelemetrySummary
+
+TELEMETRY_GROUP_KEYS = {
+  'prompt_version': ('prompt_id', 'prompt_version'),
+  'run': ('run_id',),
+  'endpoint': ('endpoint',),
+}
+
+
+@dataclass
+class CallTelemetry:
+  """Measurements collected while one judge call runs."""
+
+  endpoint: Optional[str] = None
+  queue_wait: float = 0.0
+  retries: int = 0
+  prompt_tokens: Optional[int] = None
+  completion_tokens: Optional[int] = None
+  tokens_estimated: bool = False
+
+
+_local = threading.local()
+
+
+@contextmanager
+def capture_call() -> Iterator[CallTelemetry]:
+  """Bind a fresh telemetry record to the current thread for the duration of a call."""
+  previous = getattr(_local, 'call', None)
+  call = CallTelemetry()
+  _local.call = call
+  try:
+    yield call
+  finally:
+    _local.call = previous
+
+
+def current_call() -> Optional[CallTelemetry]:
+  """The telemetry record of the call running on this thread, if one is being captured."""
+  return getattr(_local, 'call', None)
+
+
+def report_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int], estimated: bool = False) -> None:
+  """Add token usage to the current call. Calls made while judging (e.g. fallbacks) add up."""
+  call = current_call()
+  if call is None:
+    return
+  if prompt_tokens is not None:
+    call.prompt_tokens = (call.prompt_tokens or 0) + int(prompt_tokens)
+  if completion_tokens is not None:
+    call.completion_tokens = (call.completion_tokens or 0) + int(completion_tokens)
+  call.tokens_estimated = call.tokens_estimated or estimated
+
+
+def report_response_usage(body: Any) -> None:
+  """Add the ``usage`` block of an OpenAI-compatible chat completion response."""
+  usage = body.get('usage') if isinstance(body, dict) else None
+  if isinstance(usage, dict):
+    report_usage(usage.get('prompt_tokens'), usage.get('completion_tokens'))
+
+
+class JudgeTelemetryRecorder:
+  """Record one telemetry row per scheduled judge call, for writing to the database later."""
+
+  def __init__(self, workshop_id: str, run_id: Optional[str] = None):
+    self.workshop_id = workshop_id
+    self.run_id = run_id
+    self._rows: List[Dict[str, Any]] = []
+    self._lock = threading.Lock()
+
+  def call(self, scheduler, prompt: JudgePrompt, trace_id: Optional[str], fn: Callable[..., Any], *args: Any, traces: int = 1) -> Any:
+    """Run ``fn`` through the endpoint ``scheduler`` and record its telemetry."""
+    started = time.monotonic()
+    error = None
+    with capture_call() as call:
+      try:
+        return scheduler.call(fn, *args)
+      except Exception as e:
+        error = e
+        raise
+      finally:
+        row = {
+          'workshop_id': self.workshop_id,
+          'prompt_id': prompt.id,
+          'prompt_version': prompt.version,
+          'run_id': self.run_id,
+          'trace_id': trace_id,
+          'endpoint': call.endpoint or scheduler.endpoint,
+          'traces': traces,
+          'status': 'failed' if error is not None else 'succeeded',
+          'retries': call.retries,
+          'latency_ms': (time.monotonic() - started) * 1000,
+          'queue_wait_ms': call.queue_wait * 1000,
+          'prompt_tokens': call.prompt_tokens,
+          'completion_tokens': call.completion_tokens,
+          'tokens_estimated': call.tokens_estimated,
+          'error': str(error)[:1000] if error is not None else None,
+        }
+        with self._lock:
+          self._rows.append(row)
+
+  def flush(self, db_service) -> None:
+    """Write the rows recorded so far. Must be called from the thread owning the DB session."""
+    with self._lock:
+      rows, self._rows = self._rows, []
+    if rows:
+      db_service.add_judge_call_telemetry(rows)
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+  return round(float(np.percentile(values, q)), 1) if values else None
+
+
+def _cost(endpoint: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+  """Cost in USD from ``JUDGE_TOKEN_PRICES`` (USD per million input/output tokens per endpoint)."""
+  prices = ServerConfig.JUDGE_TOKEN_PRICES.get(endpoint)
+  if not prices:
+    return None
+  return (prompt_tokens * prices.get('input', 0.0) + completion_tokens * prices.get('output', 0.0)) / 1_000_000
+
+
+def summarize_telemetry(rows: List[Dict[str, Any]], group_by: str) -> List[JudgeTelemetrySummary]:
+  """Aggregate call telemetry rows per prompt version, run or endpoint.
+
+  Raises:
+      ValueError: If ``group_by`` is not a known grouping
+  """
+  if group_by not in TELEMETRY_GROUP_KEYS:
+    raise ValueError(f'Unknown telemetry grouping {group_by!r}, expected one of {sorted(TELEMETRY_GROUP_KEYS)}')
+  keys = TELEMETRY_GROUP_KEYS[group_by]
+
+  groups: Dict[tuple, List[Dict[str, Any]]] = {}
+  for row in rows:
+    groups.setdefault(tuple(row[key] for key in keys), []).append(row)
+
+  summaries = []
+  for group_key, group_rows in groups.items():
+    latencies = [row['latency_ms'] for row in group_rows]
+    queue_waits = [row['queue_wait_ms'] or 0.0 for row in group_rows]
+    prompt_tokens = sum(row['prompt_tokens'] or 0 for row in group_rows)
+    completion_tokens = sum(row['completion_tokens'] or 0 for row in group_rows)
+
+    costs = [_cost(row['endpoint'], row['prompt_tokens'] or 0, row['completion_tokens'] or 0) for row in group_rows]
+    known_costs = [cost for cost in costs if cost is not None]
+
+    summaries.append(
+      JudgeTelemetrySummary(
+        **dict(zip(keys, group_key, strict=True)),
+        endpoints=sorted({row['endpoint'] for row in group_rows}),
+        calls=len(group_rows),
+        failed_calls=sum(1 for row in group_rows if row['status'] == 'failed'),
+        traces=sum(row['traces'] or 1 for row in group_rows),
+        retries=sum(row['retries'] or 0 for row in group_rows),
+        latency_ms_mean=round(float(np.mean(latencies)), 1),
+        latency_ms_p50=_percentile(latencies, 50),
+        latency_ms_p95=_percentile(latencies, 95),
+        queue_wait_ms_mean=round(float(np.mean(queue_waits)), 1),
+        queue_wait_ms_p95=_percentile(queue_waits, 95),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        tokens_estimated=any(row['tokens_estimated'] for row in group_rows),
+        cost_usd=round(sum(known_costs), 6) if known_costs else None,
+        first_call_at=min(row['created_at'] for row in group_rows),
+        last_call_at=max(row['created_at'] for row in group_rows),
+      )
+    )
+
+  summaries.sort(key=lambda summary: summary.last_call_at, reverse=True)
+  return summaries
@@ -1,12 +1,82 @@
 """MLflow intake service for pulling traces from MLflow experiments."""
 
-from typing import Any, Dict, List
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import mlflow
 import mlflow.genai
 
-from server.models import MLflowIntakeConfig, MLflowTraceInfo, TraceUpload
+from server.models import MLflowIntakeConfig, MLflowTraceInfo, SpanCompactionConfig, TraceUpload
+from server.services.content_extraction import extract_content
 from server.services.database_service import DatabaseService
+from server.services.span_compaction import SpanCompactor
+
+# How long trace previews for an experiment/filter are reused before MLflow is queried again
+PREVIEW_CACHE_TTL_SECONDS = 60
+
+# Most preview searches kept; the least recently used is evicted beyond this
+PREVIEW_CACHE_MAX_ENTRIES = 32
+
+# Trace previews keyed by (host, token digest, experiment_id, filter_string, max_traces), with the fetch time,
+# in least to most recently used order
+_preview_cache: 'OrderedDict[Tuple[str, str, str, Optional[str], int], Tuple[List[MLflowTraceInfo], float]]' = OrderedDict()
+_preview_cache_lock = threading.Lock()
+
+
+def _cached_previews(cache_key: Tuple[str, str, str, Optional[str], int]) -> Optional[List[MLflowTraceInfo]]:
+  """Previews for a search that were fetched within the TTL, or None."""
+  with _preview_cache_lock:
+    cached = _preview_cache.get(cache_key)
+    if cached is None:
+      return None
+    previews, timestamp = cached
+    if time.time() - timestamp >= PREVIEW_CACHE_TTL_SECONDS:
+      del _preview_cache[cache_key]
+      return None
+    _preview_cache.move_to_end(cache_key)
+    return previews
+
+
+def _store_previews(cache_key: Tuple[str, str, str, Optional[str], int], previews: List[MLflowTraceInfo]) -> None:
+  """Cache previews, dropping expired searches and the least recently used beyond the size cap."""
+  now = time.time()
+  with _preview_cache_lock:
+    for key in [key for key, (_, timestamp) in _preview_cache.items() if now - timestamp >= PREVIEW_CACHE_TTL_SECONDS]:
+      del _preview_cache[key]
+    _preview_cache[cache_key] = (previews, now)
+    _preview_cache.move_to_end(cache_key)
+    while len(_preview_cache) > PREVIEW_CACHE_MAX_ENTRIES:
+      _preview_cache.popitem(last=False)
+
+
+# Most extracted trace contents kept across requests; the least recently used is evicted beyond this
+CONTENT_CACHE_MAX_ENTRIES = 5000
+
+# Extracted (input, output) keyed by (host, MLflow trace ID), in least to most recently used order.
+# Shared by search and ingest, so ingesting traces just searched does not parse them again.
+_content_cache: 'OrderedDict[Tuple[str, str], Tuple[str, str]]' = OrderedDict()
+_content_cache_lock = threading.Lock()
+
+
+def _cached_content(cache_key: Tuple[str, str]) -> Optional[Tuple[str, str]]:
+  """Extracted content of a trace, or None if it is not cached."""
+  with _content_cache_lock:
+    cached = _content_cache.get(cache_key)
+    if cached is not None:
+      _content_cache.move_to_end(cache_key)
+    return cached
+
+
+def _store_content(cache_key: Tuple[str, str], content: Tuple[str, str]) -> None:
+  """Cache a trace's extracted content, dropping the least recently used beyond the size cap."""
+  with _content_cache_lock:
+    _content_cache[cache_key] = content
+    _content_cache.move_to_end(cache_key)
+    while len(_content_cache) > CONTENT_CACHE_MAX_ENTRIES:
+      _content_cache.popitem(last=False)
 
 
 class MLflowIntakeService:
@@ -57,19 +127,9 @@ class MLflowIntakeService:
         try:
           if hasattr(trace, 'info') and hasattr(trace.info, 'request_id'):
             # Extract content from JSON for previews
-            input_content = self._extract_content_from_json(trace.data.request)
-            output_content = self._extract_content_from_json(trace.data.response)
-
-            trace_info = MLflowTraceInfo(
-              trace_id=trace.info.request_id,
-              request_preview=self._truncate_text(input_content, 200),
-              response_preview=self._truncate_text(output_content, 200),
-              execution_time_ms=getattr(trace.info, 'execution_time_ms', None),
-              status=getattr(trace.info, 'status', 'UNKNOWN'),
-              timestamp_ms=getattr(trace.info, 'timestamp_ms', 0),
-              tags=dict(trace.info.tags) if hasattr(trace.info, 'tags') and trace.info.tags else None,
-              mlflow_url=self._generate_mlflow_url(config.databricks_host, config.experiment_id, trace.info.request_id),
-            )
+            input_content, output_content = self._extract_trace_content(trace, config.databricks_host)
+
+            trace_info = self._to_trace_info(trace, config, input_content, output_content)
             trace_info_list.append(trace_info)
         except Exception as trace_error:
           # Log individual trace processing errors but continue
@@ -87,6 +147,64 @@ class MLflowIntakeService:
       else:
         raise ValueError(f'Failed to search MLflow traces: {error_msg}')
 
+  def search_trace_previews(self, config: MLflowIntakeConfig) -> Tuple[List[MLflowTraceInfo], bool]:
+    """Search for trace previews without downloading span data.
+
+    Results are cached per (host, experiment, filter, max traces) for
+    ``PREVIEW_CACHE_TTL_SECONDS`` so paging through candidates does not hit MLflow again.
+    At most ``PREVIEW_CACHE_MAX_ENTRIES`` searches are kept.
+
+    Returns:
+        Tuple of (trace previews, whether they were served from the cache)
+    """
+    # The token digest keeps one caller's credentials from serving another caller's previews
+    token_digest = hashlib.sha256(config.databricks_token.encode('utf-8')).hexdigest()
+    cache_key = (config.databricks_host.rstrip('/'), token_digest, config.experiment_id, config.filter_string, config.max_traces or 100)
+    cached = _cached_previews(cache_key)
+    if cached is not None:
+      return cached, True
+
+    try:
+      self.configure_mlflow(config)
+
+      search_kwargs = {
+        'experiment_ids': [config.experiment_id],
+        'max_results': config.max_traces or 100,
+        'filter_string': config.filter_string,
+        'return_type': 'list',
+      }
+      try:
+        # Previews only need trace info - skip the span payloads
+        traces = mlflow.search_traces(**search_kwargs, include_spans=False)
+      except TypeError:
+        # Older MLflow versions always return spans
+        traces = mlflow.search_traces(**search_kwargs)
+
+      previews = []
+      for trace in traces:
+        try:
+          if trace.data.spans:
+            input_content, output_content = self._extract_trace_content(trace, config.databricks_host)
+          else:
+            input_content = self._extract_content_from_json(getattr(trace.info, 'request_preview', None) or '')
+            output_content = self._extract_content_from_json(getattr(trace.info, 'response_preview', None) or '')
+          previews.append(self._to_trace_info(trace, config, input_content, output_content))
+        except Exception as trace_error:
+          print(f'Warning: Failed to process trace {getattr(trace.info, "request_id", "unknown")}: {str(trace_error)}')
+          continue
+
+    except Exception as e:
+      error_msg = str(e)
+      if '401' in error_msg or 'Credential' in error_msg:
+        raise ValueError(f'MLflow authentication failed. Please check your Databricks token: {error_msg}') from e
+      elif '404' in error_msg:
+        raise ValueError(f'MLflow experiment not found. Please check your experiment ID: {error_msg}') from e
+      else:
+        raise ValueError(f'Failed to search MLflow traces: {error_msg}') from e
+
+    _store_previews(cache_key, previews)
+    return previews, False
+
   def ingest_traces(self, workshop_id: str, config: MLflowIntakeConfig) -> int:
     """Ingest traces from MLflow into the workshop."""
     try:
@@ -96,6 +214,10 @@ class MLflowIntakeService:
       if not trace_infos:
         return 0  # No traces found, return 0 instead of erroring
 
+      # Span payloads are compacted against the configured byte budgets
+      compactor = SpanCompactor(config.span_compaction or SpanCompactionConfig())
+      overflow_payloads = {}
+
       # Convert to TraceUpload objects
       trace_uploads = []
       for trace_info in trace_infos:
@@ -103,25 +225,29 @@ class MLflowIntakeService:
           # Get full trace data
           full_trace = mlflow.get_trace(trace_info.trace_id)
 
-          # Extract content from JSON input/output
-          input_content = self._extract_content_from_json(full_trace.data.request)
-          output_content = self._extract_content_from_json(full_trace.data.response)
+          # Extract content from JSON input/output (already parsed by search_traces)
+          input_content, output_content = self._extract_trace_content(full_trace, config.databricks_host)
+
+          spans, trace_overflow, compaction_stats = compactor.compact(
+            [
+              {
+                'name': span.name,
+                'span_type': span.span_type,
+                'inputs': span.inputs,
+                'outputs': span.outputs,
+                'start_time_ns': span.start_time_ns,
+                'end_time_ns': span.end_time_ns,
+              }
+              for span in full_trace.data.spans
+            ]
+          )
 
           trace_upload = TraceUpload(
             input=input_content,
             output=output_content,
             context={
-              'spans': [
-                {
-                  'name': span.name,
-                  'span_type': span.span_type,
-                  'inputs': span.inputs,
-                  'outputs': span.outputs,
-                  'start_time_ns': span.start_time_ns,
-                  'end_time_ns': span.end_time_ns,
-                }
-                for span in full_trace.data.spans
-              ],
+              'spans': spans,
+              'span_compaction': compaction_stats,
               'execution_time_ms': full_trace.info.execution_time_ms,
               'status': full_trace.info.status,
               'tags': dict(full_trace.info.tags) if full_trace.info.tags else {},
@@ -137,14 +263,16 @@ class MLflowIntakeService:
             mlflow_experiment_id=config.experiment_id,
           )
           trace_uploads.append(trace_upload)
+          overflow_payloads.update(trace_overflow)
 
         except Exception as trace_error:
           # Log individual trace processing errors but continue
           print(f'Warning: Failed to process trace {trace_info.trace_id}: {str(trace_error)}')
           continue
 
-      # Add traces to workshop
+      # Add traces to workshop (overflow payloads first so every reference resolves)
       if trace_uploads:
+        self.db_service.add_trace_payloads(workshop_id, overflow_payloads)
         self.db_service.add_traces(workshop_id, trace_uploads)
 
       return len(trace_uploads)
@@ -159,6 +287,19 @@ class MLflowIntakeService:
       else:
         raise ValueError(f'Failed to ingest traces: {error_msg}')
 
+  def _to_trace_info(self, trace: Any, config: MLflowIntakeConfig, input_content: str, output_content: str) -> MLflowTraceInfo:
+    """Build the preview model for a trace from its extracted content."""
+    return MLflowTraceInfo(
+      trace_id=trace.info.request_id,
+      request_preview=self._truncate_text(input_content, 200),
+      response_preview=self._truncate_text(output_content, 200),
+      execution_time_ms=getattr(trace.info, 'execution_time_ms', None),
+      status=getattr(trace.info, 'status', 'UNKNOWN'),
+      timestamp_ms=getattr(trace.info, 'timestamp_ms', 0),
+      tags=dict(trace.info.tags) if hasattr(trace.info, 'tags') and trace.info.tags else None,
+      mlflow_url=self._generate_mlflow_url(config.databricks_host, config.experiment_id, trace.info.request_id),
+    )
+
   def _truncate_text(self, text: str, max_length: int) -> str:
     """Truncate text to specified length."""
     if len(text) <= max_length:
@@ -167,76 +308,16 @@ class MLflowIntakeService:
 
   def _extract_content_from_json(self, json_text: str) -> str:
     """Extract content from JSON input/output format."""
-    try:
-      import json
-
-      data = json.loads(json_text)
-
-      # Handle the specific MLflow trace format with request.input structure
-      if isinstance(data, dict) and 'request' in data:
-        request_data = data['request']
-        if isinstance(request_data, dict) and 'input' in request_data:
-          input_list = request_data['input']
-          if isinstance(input_list, list) and input_list:
-            # Extract content from the first user message
-            for item in input_list:
-              if isinstance(item, dict) and item.get('role') == 'user' and 'content' in item:
-                return item['content']
-            # If no user message found, return the first item's content
-            if input_list[0].get('content'):
-              return input_list[0]['content']
-
-      # Handle messages format: {"messages": [...]}
-      if isinstance(data, dict) and 'messages' in data:
-        messages = data['messages']
-        if not messages:
-          return json_text
-
-        # First, try to find an assistant message (for output)
-        for message in reversed(messages):
-          if isinstance(message, dict) and message.get('role') == 'assistant' and 'content' in message:
-            return message['content']
-
-        # If no assistant message found, return the first user message (for input)
-        for message in messages:
-          if isinstance(message, dict) and message.get('role') == 'user' and 'content' in message:
-            return message['content']
-
-        # If no specific role found, return the last message content
-        if messages and isinstance(messages[-1], dict) and 'content' in messages[-1]:
-          return messages[-1]['content']
-
-      # Handle output format with response items
-      if isinstance(data, list):
-        # Look for response.output_item.done type items
-        for item in data:
-          if isinstance(item, dict) and item.get('type') == 'response.output_item.done':
-            item_data = item.get('item', {})
-            if isinstance(item_data, dict) and 'content' in item_data:
-              content_list = item_data['content']
-              if isinstance(content_list, list):
-                for content_item in content_list:
-                  if isinstance(content_item, dict) and content_item.get('type') == 'output_text':
-                    return content_item.get('text', '')
-
-      # Handle new output format with object: "response"
-      if isinstance(data, dict) and data.get('object') == 'response' and 'output' in data:
-        output_list = data['output']
-        if isinstance(output_list, list):
-          for output_item in output_list:
-            if isinstance(output_item, dict) and output_item.get('type') == 'message' and output_item.get('role') == 'assistant':
-              content_list = output_item.get('content', [])
-              if isinstance(content_list, list):
-                for content_item in content_list:
-                  if isinstance(content_item, dict) and content_item.get('type') == 'output_text':
-                    return content_item.get('text', '')
-
-      # If no specific format found, return the original text
-      return json_text
-
-    except (json.JSONDecodeError, KeyError, IndexError):
-      # If JSON parsing fails, return the original text
-      return json_text
+    return extract_content(json_text)
+
+  def _extract_trace_content(self, trace: Any, databricks_host: str) -> Tuple[str, str]:
+    """Extract (input, output) content for a trace, parsing each trace only once per process."""
+    cache_key = (databricks_host.rstrip('/'), trace.info.request_id)
+    cached = _cached_content(cache_key)
+    if cached is None:
+      cached = (self._extract_content_from_json(trace.data.request), self._extract_content_from_json(trace.data.response))
+      _store_content(cache_key, cached)
+    return cached
 
   def _generate_mlflow_url(self, databricks_host: str, experiment_id: str, trace_id: str) -> str:
     """Generate MLflow URL for an experiment."""
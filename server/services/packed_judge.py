@@ -0,0 +1,98 @@
+"""Packing several short traces into one judge call.
+
+For short Q&A traces, the judge prompt (criteria plus few-shot examples) is most of
+the tokens in every request. In packed mode the prompt is sent once, followed by a
+numbered block per trace. The model answers with a JSON object keyed by per-item IDs.
+These IDs are derived from the trace ID, so they stay the same across packs and
+retries. Packs are filled greedily under a token budget from the token estimate taken
+when the trace was ingested.
+"""
+
+import hashlib
+import json
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from server.services.rubric_judge import extract_json_object
+
+# Rough characters-per-token ratio of English text for BPE tokenizers
+CHARS_PER_TOKEN = 4
+# Tokens per item for the item header and the ID repeated in the answer
+ITEM_OVERHEAD_TOKENS = 24
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+  """Estimate the token count of a text without loading a tokenizer."""
+  return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+
+def estimate_trace_tokens(input_text: Optional[str], output_text: Optional[str]) -> int:
+  """Estimated tokens a trace adds to a judge prompt."""
+  return estimate_tokens(input_text) + estimate_tokens(output_text)
+
+
+def pack_item_id(trace_id: str) -> str:
+  """Short, stable ID for a trace inside a packed request."""
+  return 'T' + hashlib.sha256(trace_id.encode('utf-8')).hexdigest()[:8]
+
+
+def plan_packs(token_counts: Sequence[int], budget_tokens: int, max_items: int, item_threshold_tokens: int) -> List[List[int]]:
+  """Group item indexes into packs whose estimated tokens fit ``budget_tokens``.
+
+  Items above ``item_threshold_tokens`` are not worth packing and get a pack of their
+  own. The others fill packs greedily, in order, up to ``max_items`` per pack.
+  """
+  packs: List[List[int]] = []
+  current: List[int] = []
+  current_tokens = 0
+  for index, tokens in enumerate(token_counts):
+    if tokens > item_threshold_tokens:
+      packs.append([index])
+      continue
+    cost = tokens + ITEM_OVERHEAD_TOKENS
+    if current and (len(current) >= max_items or current_tokens + cost > budget_tokens):
+      packs.append(current)
+      current, current_tokens = [], 0
+    current.append(index)
+    current_tokens += cost
+  if current:
+    packs.append(current)
+  return packs
+
+
+def render_packed_prompt(prompt_text: str, items: Sequence[Tuple[str, str, str]]) -> str:
+  """Render one judge request for several ``(item_id, input, output)`` items."""
+  criteria = prompt_text.replace('{input}', "[the item's input]").replace('{output}', "[the item's output]")
+  blocks = '\n\n'.join(f'### Item {item_id}\nInput:\n{input_text}\n\nOutput:\n{output_text}' for item_id, input_text, output_text in items)
+  example = json.dumps({item_id: {'score': 3, 'justification': '...'} for item_id, _, _ in items[:2]})
+  return (
+    'You will judge several independent items. Apply the instructions below to each item separately; '
+    'do not let one item influence the score of another.\n\n'
+    f'{criteria}\n\n'
+    f'{blocks}\n\n'
+    'Respond with only a JSON object mapping every item ID to an object with a numeric "score" '
+    f'and a short "justification", for example: {example}'
+  )
+
+
+def parse_packed_response(text: str, item_ids: Sequence[str]) -> Dict[str, Tuple[float, Optional[str]]]:
+  """Parse ``(score, justification)`` per item ID from a packed judge response.
+
+  Items without a usable score are left out, so the caller can re-judge just those.
+
+  Raises:
+      ValueError: If the response holds no JSON object
+  """
+  data = extract_json_object(text)
+  results = {}
+  for item_id in item_ids:
+    value = data.get(item_id)
+    score, justification = (value.get('score'), value.get('justification')) if isinstance(value, dict) else (value, None)
+    try:
+      score = float(score)
+    except (TypeError, ValueError):
+      continue
+    if math.isnan(score):
+      continue
+    results[item_id] = (score, justification if isinstance(justification, str) else None)
+  return results
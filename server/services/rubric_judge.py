@@ -0,0 +1,83 @@
+"""Prompt rendering and response parsing for multi-question (full rubric) judging.
+
+All rubric questions are asked in a single model call per trace. The model answers
+with a JSON object holding a score and justification per question ID, using the same
+question IDs the annotation UI stores in ``Annotation.ratings``.
+"""
+
+import json
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from server.models import Rubric
+
+# Matches a fenced ```json ... ``` block in a model response
+_FENCED_JSON = re.compile(r'```(?:json)?\s*(\{.*?\})\s*```', re.DOTALL)
+
+
+def rubric_questions(rubric: Rubric) -> List[Dict[str, str]]:
+  """Split a rubric into questions keyed like annotation ratings (``{rubric.id}_{index}``)."""
+  questions = []
+  for index, part in enumerate(rubric.question.split('\n\n')):
+    title, _, description = part.partition(':')
+    questions.append(
+      {
+        'id': f'{rubric.id}_{index}',
+        'title': title.strip() or f'Question {index + 1}',
+        'description': description.strip() or part.strip(),
+      }
+    )
+  return questions
+
+
+def render_rubric_prompt(prompt_text: str, questions: List[Dict[str, str]], input_text: str, output_text: str) -> str:
+  """Render the judge prompt for one trace, asking for a score per rubric question."""
+  rendered = prompt_text.replace('{input}', input_text).replace('{output}', output_text)
+  # Prompts without placeholders still need the trace content
+  if '{input}' not in prompt_text and '{output}' not in prompt_text:
+    rendered += f'\n\nInput:\n{input_text}\n\nOutput:\n{output_text}'
+
+  question_lines = '\n'.join(f'- "{q["id"]}": {q["title"]} - {q["description"]}' for q in questions)
+  example = json.dumps({q['id']: {'score': 3, 'justification': '...'} for q in questions[:2]})
+  return (
+    f'{rendered}\n\n'
+    f'Rate the output on each of the following questions using a 1-5 scale:\n{question_lines}\n\n'
+    f'Respond with only a JSON object mapping every question ID to an object with an integer "score" '
+    f'and a short "justification", for example: {example}'
+  )
+
+
+def extract_json_object(text: str) -> Dict[str, Any]:
+  """Find the JSON object in a model response, tolerating code fences and surrounding prose."""
+  fenced = _FENCED_JSON.search(text)
+  candidate = fenced.group(1) if fenced else text[text.find('{') : text.rfind('}') + 1]
+  if not candidate:
+    raise ValueError(f'No JSON object in judge response: {text[:200]}')
+  data = json.loads(candidate)
+  if not isinstance(data, dict):
+    raise ValueError('Judge response JSON is not an object')
+  return data
+
+
+def parse_rubric_response(text: str, question_ids: List[str]) -> Dict[str, Tuple[int, Optional[str]]]:
+  """Parse per-question (score, justification) pairs from a judge response.
+
+  Raises:
+      ValueError: If the response is not JSON or a question has no numeric score
+  """
+  data = extract_json_object(text)
+  results = {}
+  for question_id in question_ids:
+    if question_id not in data:
+      raise ValueError(f'Judge response is missing a score for question {question_id}')
+    value = data[question_id]
+    score, justification = (value.get('score'), value.get('justification')) if isinstance(value, dict) else (value, None)
+    try:
+      score = float(score)
+    except (TypeError, ValueError):
+      raise ValueError(f'Non-numeric score for question {question_id}: {score!r}') from None
+    if math.isnan(score):
+      raise ValueError(f'NaN score for question {question_id}')
+    results[question_id] = (int(round(score)), justification if isinstance(justification, str) else None)
+  return results
@@ -0,0 +1,137 @@
+"""Stopping rule for sequential (early-stopping) judge evaluation.
+
+Traces are scored in random order and in batches. After each batch, confidence
+intervals are computed for accuracy and Cohen's kappa, and the run stops as soon as
+one of these holds:
+
+- both intervals are narrower than the requested width;
+- the intervals lie clearly above or below a baseline prompt's stored metrics.
+
+The data is checked after every batch. A single 95% interval re-checked at every look
+would stop on noise far more often than 5% of the time. To prevent that, the error
+rate is split evenly across the planned looks (a Bonferroni correction), so the
+stated confidence holds for the whole run.
+"""
+
+import math
+from collections import Counter
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import List, Optional, Sequence
+
+STOP_PRECISION = 'precision_reached'
+STOP_BETTER = 'better_than_baseline'
+STOP_WORSE = 'worse_than_baseline'
+STOP_EXHAUSTED = 'exhausted'
+
+
+@dataclass(frozen=True)
+class Interval:
+  """Point estimate with a confidence interval."""
+
+  estimate: float
+  lower: float
+  upper: float
+
+  @property
+  def width(self) -> float:
+    return self.upper - self.lower
+
+
+@dataclass(frozen=True)
+class SequentialCheck:
+  """Outcome of checking the stopping rule after a batch."""
+
+  stop_reason: Optional[str]
+  accuracy: Interval
+  kappa: Interval
+
+
+def planned_looks(total: int, min_traces: int, batch_size: int) -> int:
+  """Number of times the stopping rule can be checked while scoring ``total`` traces."""
+  return 1 + math.ceil(max(0, total - min_traces) / batch_size)
+
+
+def look_z_score(confidence: float, looks: int) -> float:
+  """Two-sided normal critical value with the error rate split across ``looks`` checks."""
+  alpha = (1.0 - confidence) / max(1, looks)
+  return NormalDist().inv_cdf(1.0 - alpha / 2)
+
+
+def wilson_interval(successes: int, n: int, z: float) -> Interval:
+  """Wilson score interval for a proportion. It stays sensible near 0 and 1 and at small n."""
+  if n == 0:
+    return Interval(0.0, 0.0, 1.0)
+  p = successes / n
+  denominator = 1 + z * z / n
+  center = (p + z * z / (2 * n)) / denominator
+  margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+  return Interval(p, max(0.0, center - margin), min(1.0, center + margin))
+
+
+def kappa_interval(human: Sequence[int], predicted: Sequence[int], z: float) -> Interval:
+  """Cohen's kappa with an interval derived from the Wilson interval of observed agreement.
+
+  Chance agreement is treated as fixed, the usual large-sample approximation. When
+  chance agreement is 1 (a single label on both sides), kappa is undefined. Like the
+  full metrics, it then falls back to the agreement ratio.
+  """
+  n = len(human)
+  agreement = wilson_interval(sum(1 for h, p in zip(human, predicted, strict=True) if h == p), n, z)
+  if n == 0:
+    return Interval(0.0, -1.0, 1.0)
+
+  # Over every rating either side used, so ratings outside 1-5 count towards chance agreement too
+  human_counts, predicted_counts = Counter(human), Counter(predicted)
+  chance = sum(human_counts[label] * predicted_counts[label] for label in human_counts.keys() | predicted_counts.keys()) / (n * n)
+  if chance >= 1.0 - 1e-12:
+    return agreement
+
+  def to_kappa(value: float) -> float:
+    return max(-1.0, min(1.0, (value - chance) / (1.0 - chance)))
+
+  return Interval(to_kappa(agreement.estimate), to_kappa(agreement.lower), to_kappa(agreement.upper))
+
+
+def _direction(interval: Interval, baseline: Optional[float]) -> int:
+  """+1 if the interval lies above the baseline, -1 if below, 0 if it overlaps or there is none."""
+  if baseline is None:
+    return 0
+  if interval.lower > baseline:
+    return 1
+  if interval.upper < baseline:
+    return -1
+  return 0
+
+
+class SequentialStopRule:
+  """Decide after each batch whether a sequential evaluation can stop."""
+
+  def __init__(
+    self,
+    target_width: float,
+    confidence: float,
+    looks: int,
+    baseline_accuracy: Optional[float] = None,
+    baseline_kappa: Optional[float] = None,
+  ):
+    self.target_width = target_width
+    self.z = look_z_score(confidence, looks)
+    self.baseline_accuracy = baseline_accuracy
+    self.baseline_kappa = baseline_kappa
+
+  def check(self, human: List[int], predicted: List[int]) -> SequentialCheck:
+    """Compute the current intervals and the stop reason, if any."""
+    accuracy = wilson_interval(sum(1 for h, p in zip(human, predicted, strict=True) if h == p), len(human), self.z)
+    kappa = kappa_interval(human, predicted, self.z)
+
+    # Significant only if the metrics that differ from the baseline agree on the direction
+    directions = {_direction(accuracy, self.baseline_accuracy), _direction(kappa, self.baseline_kappa)} - {0}
+    if directions == {1}:
+      return SequentialCheck(STOP_BETTER, accuracy, kappa)
+    if directions == {-1}:
+      return SequentialCheck(STOP_WORSE, accuracy, kappa)
+
+    if accuracy.width <= self.target_width and kappa.width <= self.target_width:
+      return SequentialCheck(STOP_PRECISION, accuracy, kappa)
+    return SequentialCheck(None, accuracy, kappa)
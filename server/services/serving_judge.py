@@ -0,0 +1,159 @@
+"""Judge backend that calls model serving endpoints directly over pooled HTTP.
+
+Judge prompts whose model name is ``serving:<endpoint>`` skip MLflow. Each trace is sent
+to ``<base_url>/chat/completions``, which is the OpenAI-compatible route Databricks
+exposes under ``<workspace>/serving-endpoints``, with instructions to answer as a
+``{"score": N, "justification": ...}`` JSON object, and the score is parsed from the
+reply. Every call shares one ``requests`` session, so connections stay alive and
+are pooled across traces and requests. Transient 5xx failures are retried with
+exponential backoff. Throttling (429) is left to the endpoint scheduler. Set
+``JUDGE_SERVING_BASE_URL`` to point the backend at any OpenAI-compatible server, such
+as a local fake for testing.
+"""
+
+import math
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from server.config import ServerConfig
+from server.services.judge_telemetry import report_response_usage
+from server.services.rubric_judge import extract_json_object
+
+SERVING_MODEL_PREFIX = 'serving:'
+
+# Transient server errors retried by the HTTP adapter; 429s are left to the endpoint scheduler
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# A "Score: 4" label at the start of a line (optionally in markdown bold)
+_SCORE_LABEL = re.compile(r'^[\s*_]*score[\s*_]*[:=][\s*_]*(-?\d+(?:\.\d+)?)', re.IGNORECASE | re.MULTILINE)
+# A number that is the whole reply or its first token, such as "4" or "4/5 - clear answer"
+_LEADING_NUMBER = re.compile(r'^(-?\d+(?:\.\d+)?)(?=$|[\s.,;:/)])')
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def is_serving_model(model_name: Optional[str]) -> bool:
+  """Whether a judge model name selects the direct serving backend."""
+  return bool(model_name) and model_name.startswith(SERVING_MODEL_PREFIX)
+
+
+def serving_endpoint_name(model_name: str) -> str:
+  """Serving endpoint name from a ``serving:<endpoint>`` model name."""
+  return model_name[len(SERVING_MODEL_PREFIX) :]
+
+
+def get_http_session() -> requests.Session:
+  """Return the process-wide pooled HTTP session used for serving calls."""
+  global _session
+  with _session_lock:
+    if _session is None:
+      retry = Retry(
+        total=ServerConfig.JUDGE_HTTP_MAX_RETRIES,
+        backoff_factor=ServerConfig.JUDGE_HTTP_BACKOFF_SECONDS,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset({'GET', 'POST'}),
+        # Otherwise urllib3 also retries 429s that carry Retry-After, hiding them from the scheduler
+        respect_retry_after_header=False,
+        raise_on_status=False,
+      )
+      pool_size = max(ServerConfig.JUDGE_MAX_CONCURRENCY, 10)
+      adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+      session = requests.Session()
+      session.mount('https://', adapter)
+      session.mount('http://', adapter)
+      _session = session
+    return _session
+
+
+def render_serving_prompt(prompt_text: str, input_text: str, output_text: str) -> str:
+  """Render the judge prompt for one trace, asking for the score as a JSON object."""
+  rendered = prompt_text.replace('{input}', input_text).replace('{output}', output_text)
+  return (
+    f'{rendered}\n\n'
+    'Respond with only a JSON object with a numeric "score" and a short "justification", '
+    'for example: {"score": 3, "justification": "..."}'
+  )
+
+
+def parse_judge_reply(text: str) -> Tuple[float, Optional[str]]:
+  """Parse the ``(score, justification)`` from a judge reply.
+
+  Accepts a JSON object with a ``score`` field (also inside code fences or prose), a
+  ``Score: 4`` label at the start of a line, or a reply whose whole text or first token
+  is a number. Numbers elsewhere in free text are not guessed at, since a reply such as
+  ``Rating (1-5): 4`` would otherwise be scored as 1.
+
+  Raises:
+      ValueError: If the reply holds no score in any of these forms
+  """
+  stripped = text.strip()
+  try:
+    data = extract_json_object(stripped)
+  except ValueError:
+    data = None
+  if data is not None and 'score' in data:
+    try:
+      score = float(data['score'])
+    except (TypeError, ValueError):
+      raise ValueError(f'Non-numeric score in judge response: {data["score"]!r}') from None
+    if math.isnan(score):
+      raise ValueError('NaN score in judge response')
+    justification = data.get('justification')
+    return score, str(justification) if justification is not None else None
+
+  match = _SCORE_LABEL.search(stripped) or _LEADING_NUMBER.match(stripped)
+  if not match:
+    raise ValueError(f'No score in judge response: {stripped[:200]}')
+  return float(match.group(1)), None
+
+
+class ServingJudgeClient:
+  """Chat completion client for OpenAI-compatible serving endpoints."""
+
+  def __init__(self, base_url: str, token: str, session: Optional[requests.Session] = None):
+    self.base_url = base_url.rstrip('/')
+    self.token = token
+    self.session = session or get_http_session()
+    self.timeout = (ServerConfig.JUDGE_HTTP_CONNECT_TIMEOUT_SECONDS, ServerConfig.JUDGE_HTTP_TIMEOUT_SECONDS)
+
+  @classmethod
+  def for_workspace(cls, databricks_host: str, token: str) -> 'ServingJudgeClient':
+    """Client for a workspace's serving endpoints, unless ``JUDGE_SERVING_BASE_URL`` overrides it."""
+    base_url = ServerConfig.JUDGE_SERVING_BASE_URL or f'{databricks_host.rstrip("/")}/serving-endpoints'
+    return cls(base_url, token)
+
+  def chat(self, endpoint_name: str, messages: List[Dict[str, str]], parameters: Optional[Dict[str, Any]] = None) -> str:
+    """Send a chat completion request and return the reply text.
+
+    Raises:
+        requests.HTTPError: If the endpoint throttles the call or still fails after retries
+        ValueError: If the response has no message content
+    """
+    payload = {'model': endpoint_name, 'messages': messages, **(parameters or {})}
+    response = self.session.post(
+      f'{self.base_url}/chat/completions',
+      headers={'Authorization': f'Bearer {self.token}'},
+      json=payload,
+      timeout=self.timeout,
+    )
+    response.raise_for_status()
+
+    try:
+      body = response.json()
+      content = body['choices'][0]['message']['content']
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+      raise ValueError(f'Unexpected chat completion response from {endpoint_name}: {response.text[:200]}') from e
+    report_response_usage(body)
+
+    # Some endpoints return content as a list of typed parts
+    if isinstance(content, list):
+      content = ''.join(part.get('text', '') for part in content if isinstance(part, dict))
+    if not content:
+      raise ValueError(f'Empty chat completion response from {endpoint_name}')
+    return content
@@ -0,0 +1,127 @@
+"""Span compaction for trace context stored at ingestion time.
+
+MLflow spans carry full ``inputs`` and ``outputs`` payloads. For RAG agents the same
+retrieved documents show up in several spans, so copying every payload verbatim into
+``TraceDB.context`` makes rows very large. The compactor keeps span metadata inline,
+enforces per-span and per-trace byte budgets and moves large or repeated payloads to
+the overflow store (``trace_payloads`` table), leaving a small reference behind.
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Tuple
+
+from server.models import SpanCompactionConfig
+
+# Payloads smaller than this are never deduplicated - a reference would not be smaller
+DEDUPE_MIN_BYTES = 256
+# Length of the preview kept inline for payloads moved to the overflow store
+PREVIEW_CHARS = 200
+# Span fields that hold payloads (everything else is metadata and always kept inline)
+PAYLOAD_FIELDS = ('inputs', 'outputs')
+
+SPAN_MODE_FULL = 'full'
+SPAN_MODE_METADATA_ONLY = 'metadata_only'
+
+
+def serialize_payload(value: Any) -> str:
+  """Serialize a span payload to compact JSON text."""
+  return json.dumps(value, default=str, ensure_ascii=False, separators=(',', ':'))
+
+
+def payload_hash(serialized: str) -> str:
+  """Content hash used to key payloads in the overflow store."""
+  return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def is_overflow_ref(value: Any) -> bool:
+  """Check whether an inline span value is a reference to the overflow store."""
+  return isinstance(value, dict) and '$overflow_ref' in value
+
+
+class SpanCompactor:
+  """Apply a :class:`SpanCompactionConfig` to the spans of a single trace."""
+
+  def __init__(self, config: SpanCompactionConfig):
+    if config.mode not in (SPAN_MODE_FULL, SPAN_MODE_METADATA_ONLY):
+      raise ValueError(f"Unsupported span mode '{config.mode}'. Use '{SPAN_MODE_FULL}' or '{SPAN_MODE_METADATA_ONLY}'")
+    self.config = config
+
+  def compact(self, spans: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, str], Dict[str, Any]]:
+    """Compact a list of span dictionaries.
+
+    Args:
+        spans: Span dictionaries with metadata fields plus ``inputs``/``outputs``
+
+    Returns:
+        Tuple of (compacted spans, overflow payloads keyed by content hash as serialized
+        JSON text, compaction statistics for the trace context)
+    """
+    if self.config.mode == SPAN_MODE_METADATA_ONLY:
+      compacted = [{k: v for k, v in span.items() if k not in PAYLOAD_FIELDS} for span in spans]
+      return compacted, {}, {'mode': self.config.mode, 'original_bytes': None, 'inline_bytes': 0, 'overflow_refs': 0}
+
+    compacted: List[Dict[str, Any]] = []
+    overflow: Dict[str, str] = {}
+    seen_hashes = set()
+    # Payloads that stayed inline - candidates for eviction in the trace budget pass
+    inline_payloads: List[Tuple[int, str, int, str]] = []
+    original_bytes = 0
+    inline_bytes = 0
+
+    for span_index, span in enumerate(spans):
+      compacted_span = {k: v for k, v in span.items() if k not in PAYLOAD_FIELDS}
+      for field in PAYLOAD_FIELDS:
+        if field not in span:
+          continue
+        value = span[field]
+        if value is None:
+          compacted_span[field] = None
+          continue
+
+        serialized = serialize_payload(value)
+        size = len(serialized.encode('utf-8'))
+        original_bytes += size
+
+        # Repeated payload: store once, reference everywhere after the first occurrence
+        if self.config.deduplicate and size >= DEDUPE_MIN_BYTES:
+          digest = payload_hash(serialized)
+          if digest in seen_hashes:
+            overflow[digest] = serialized
+            compacted_span[field] = self._make_ref(digest, size, serialized)
+            continue
+          seen_hashes.add(digest)
+
+        if self.config.max_span_bytes is not None and size > self.config.max_span_bytes:
+          digest = payload_hash(serialized)
+          overflow[digest] = serialized
+          compacted_span[field] = self._make_ref(digest, size, serialized)
+          continue
+
+        compacted_span[field] = value
+        inline_bytes += size
+        inline_payloads.append((span_index, field, size, serialized))
+      compacted.append(compacted_span)
+
+    # Enforce the per-trace budget by evicting the largest inline payloads first
+    if self.config.max_trace_bytes is not None and inline_bytes > self.config.max_trace_bytes:
+      for span_index, field, size, serialized in sorted(inline_payloads, key=lambda p: p[2], reverse=True):
+        if inline_bytes <= self.config.max_trace_bytes:
+          break
+        digest = payload_hash(serialized)
+        overflow[digest] = serialized
+        compacted[span_index][field] = self._make_ref(digest, size, serialized)
+        inline_bytes -= size
+
+    stats = {
+      'mode': self.config.mode,
+      'original_bytes': original_bytes,
+      'inline_bytes': inline_bytes,
+      'overflow_refs': sum(1 for span in compacted for field in PAYLOAD_FIELDS if is_overflow_ref(span.get(field))),
+    }
+    return compacted, overflow, stats
+
+  def _make_ref(self, digest: str, size: int, serialized: str) -> Dict[str, Any]:
+    """Build the inline placeholder for a payload moved to the overflow store."""
+    preview = serialized if len(serialized) <= PREVIEW_CHARS else serialized[:PREVIEW_CHARS] + '...'
+    return {'$overflow_ref': digest, 'size_bytes': size, 'preview': preview}
@@ -0,0 +1,54 @@
+"""Consensus (mode) human ratings per trace and rubric question.
+
+The ``trace_consensus`` table holds, for every annotated trace and question, the most
+common rating, how many ratings there are, the full rating distribution and the share
+of annotators who gave the mode. The overall ``rating`` of an annotation is stored
+under ``OVERALL_QUESTION_ID``. Per-question ``ratings`` are stored under their question
+ID. Rows for a trace are recomputed from that trace's annotations whenever one of them
+is written. Judge evaluation and dashboards then read ground truth in one indexed
+query instead of regrouping every annotation of the workshop.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Question ID under which the overall (legacy single) rating is aggregated
+OVERALL_QUESTION_ID = 'overall'
+
+
+def summarize_ratings(ratings: List[int]) -> Tuple[int, int, Dict[str, int], float]:
+  """Mode, count, distribution and agreement of a trace's ratings for one question.
+
+  Ties go to the rating given first, so ``ratings`` should be in annotation order.
+  """
+  counts = Counter(ratings)
+  mode, votes = counts.most_common(1)[0]
+  distribution = {str(rating): counts[rating] for rating in sorted(counts)}
+  return mode, len(ratings), distribution, votes / len(ratings)
+
+
+def consensus_rows(workshop_id: str, trace_id: str, annotations: Iterable[Tuple[Optional[int], Optional[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+  """``trace_consensus`` rows for one trace from its ``(rating, ratings)`` annotation pairs."""
+  ratings_by_question: Dict[str, List[int]] = {}
+  for rating, ratings in annotations:
+    if rating is not None:
+      ratings_by_question.setdefault(OVERALL_QUESTION_ID, []).append(int(rating))
+    for question_id, value in (ratings or {}).items():
+      if value is not None:
+        ratings_by_question.setdefault(question_id, []).append(int(value))
+
+  rows = []
+  for question_id, ratings in ratings_by_question.items():
+    mode, count, distribution, agreement = summarize_ratings(ratings)
+    rows.append(
+      {
+        'workshop_id': workshop_id,
+        'trace_id': trace_id,
+        'question_id': question_id,
+        'mode': mode,
+        'count': count,
+        'distribution': distribution,
+        'agreement': agreement,
+      }
+    )
+  return rows
@@ -0,0 +1,477 @@
+"""Offline bulk import of MLflow trace exports (JSONL / Parquet).
+
+Nightly production exports are streamed record by record, converted with the same
+content extraction and span compaction used by live MLflow intake, and inserted in
+chunks. No MLflow tracking server or other network access is needed.
+"""
+
+import gzip
+import json
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from pydantic import ValidationError
+
+from server.config import ServerConfig
+from server.models import SpanCompactionConfig, TraceUpload
+from server.services.content_extraction import default_registry, extract_content, json_loads
+from server.services.database_service import DatabaseService
+from server.services.span_compaction import SpanCompactor
+
+try:
+  import pyarrow.parquet as pq
+
+  PYARROW_AVAILABLE = True
+except ImportError:
+  PYARROW_AVAILABLE = False
+
+SUPPORTED_FORMATS = ('jsonl', 'parquet')
+# Keep at most this many error messages on a job so a bad file cannot blow up memory
+MAX_JOB_ERRORS = 50
+
+# MLflow span attribute keys (mlflow.tracing.constant.SpanAttributeKey)
+SPAN_INPUTS_KEY = 'mlflow.spanInputs'
+SPAN_OUTPUTS_KEY = 'mlflow.spanOutputs'
+SPAN_TYPE_KEY = 'mlflow.spanType'
+
+
+def infer_file_format(file_name: str) -> str:
+  """Infer the export format from a file name."""
+  name = file_name.lower()
+  if name.endswith('.gz'):
+    name = name[:-3]
+  if name.endswith('.parquet') or name.endswith('.pq'):
+    return 'parquet'
+  if name.endswith('.jsonl') or name.endswith('.ndjson') or name.endswith('.json'):
+    return 'jsonl'
+  raise ValueError(f'Cannot infer export format from file name: {file_name}. Use .jsonl or .parquet')
+
+
+class InvalidRecord:
+  """Placeholder yielded for an export line that could not be decoded, so the import can skip it."""
+
+  def __init__(self, message: str):
+    self.message = message
+
+
+def iter_jsonl_records(path: Path) -> Iterator[Union[Dict[str, Any], InvalidRecord]]:
+  """Stream records from a (optionally gzipped) JSONL file one line at a time.
+
+  Lines that are not valid UTF-8 JSON are yielded as ``InvalidRecord`` instead of
+  ending the stream.
+  """
+  opener = gzip.open if path.suffix == '.gz' else open
+  with opener(path, 'rb') as f:
+    for line_number, line in enumerate(f, start=1):
+      line = line.strip()
+      if not line:
+        continue
+      try:
+        record = json_loads(line.decode('utf-8'))
+      except ValueError as e:
+        yield InvalidRecord(f'Invalid JSON on line {line_number}: {e}')
+        continue
+      yield record
+
+
+def iter_parquet_records(path: Path, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+  """Stream records from a Parquet file one row group batch at a time."""
+  if not PYARROW_AVAILABLE:
+    raise ValueError('Parquet import requires pyarrow. Install it or export traces as JSONL')
+
+  parquet_file = pq.ParquetFile(path)
+  for batch in parquet_file.iter_batches(batch_size=batch_size):
+    yield from batch.to_pylist()
+
+
+def _maybe_json(value: Any) -> Any:
+  """Decode JSON-encoded attribute values, leaving anything else untouched."""
+  if isinstance(value, str):
+    try:
+      return json_loads(value)
+    except ValueError:
+      return value
+  return value
+
+
+def _as_json_text(value: Any) -> str:
+  """Return request/response values as the JSON text expected by content extraction."""
+  if value is None:
+    return ''
+  if isinstance(value, str):
+    return value
+  return json.dumps(value, default=str)
+
+
+def _extract_content(value: Any) -> str:
+  """Extract content with the same extractors as live MLflow intake.
+
+  Values already decoded from the export are matched directly instead of being
+  serialized and parsed again.
+  """
+  if isinstance(value, (dict, list)):
+    content = default_registry.extract_from_data(value)
+    if content is not None:
+      return content
+  return extract_content(_as_json_text(value))
+
+
+# Most decompressed bytes produced from one piece of compressed input at a time
+_INFLATE_PIECE_BYTES = 1024 * 1024
+
+
+def _inflate(decompressor: 'zlib._Decompress', data: bytes) -> Iterator[bytes]:
+  """Decompress ``data`` in bounded pieces, so a small compressed body cannot expand all at once.
+
+  Raises:
+      ValueError: If the data is not valid gzip or continues past the end of the gzip stream
+  """
+  try:
+    while data:
+      if decompressor.eof:
+        raise ValueError('Unexpected data after the end of the gzip stream')
+      piece = decompressor.decompress(data, _INFLATE_PIECE_BYTES)
+      data = decompressor.unconsumed_tail or decompressor.unused_data
+      if decompressor.unused_data:
+        raise ValueError('Unexpected data after the end of the gzip stream')
+      yield piece
+  except zlib.error as e:
+    raise ValueError(f'Corrupt gzip data: {e}') from e
+
+
+def _finish_inflate(decompressor: 'zlib._Decompress') -> bytes:
+  """Flush the decompressor once the input has ended.
+
+  Raises:
+      ValueError: If the gzip stream was truncated
+  """
+  try:
+    tail = decompressor.flush()
+  except zlib.error as e:
+    raise ValueError(f'Corrupt gzip data: {e}') from e
+  if not decompressor.eof:
+    raise ValueError('Truncated gzip data: the stream ended before the end of the gzip data')
+  return tail
+
+
+def gunzip_limited(data: bytes, max_bytes: Optional[int] = None) -> bytes:
+  """Decompress a complete gzip body, refusing to produce more than ``max_bytes``.
+
+  Raises:
+      ValueError: If the data is corrupt or truncated, or decompresses to more than ``max_bytes``
+  """
+  decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+  pieces: List[bytes] = []
+  size = 0
+
+  def append(piece: bytes) -> None:
+    nonlocal size
+    size += len(piece)
+    if max_bytes is not None and size > max_bytes:
+      raise ValueError(f'Decompressed body exceeds {max_bytes} bytes')
+    pieces.append(piece)
+
+  # Pieces are produced lazily, so the size check stops a gzip bomb before it is inflated
+  for piece in _inflate(decompressor, data):
+    append(piece)
+  append(_finish_inflate(decompressor))
+  return b''.join(pieces)
+
+
+async def aiter_ndjson_lines(
+  chunks: AsyncIterator[bytes], gzip_encoded: bool = False, max_bytes: Optional[int] = None, max_line_bytes: Optional[int] = None
+) -> AsyncIterator[bytes]:
+  """Split a streamed (optionally gzip-encoded) NDJSON body into lines without buffering it.
+
+  Raises:
+      ValueError: If the gzip data is corrupt or truncated, the decompressed body exceeds
+          ``max_bytes``, or a line exceeds ``max_line_bytes``
+  """
+  decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16) if gzip_encoded else None
+  # Pieces of the current, unfinished line, joined only once its newline arrives
+  pending: List[bytes] = []
+  pending_size = 0
+  total = 0
+
+  def split(piece: bytes) -> List[bytes]:
+    nonlocal pending, pending_size, total
+    total += len(piece)
+    if max_bytes is not None and total > max_bytes:
+      raise ValueError(f'Upload exceeds {max_bytes} bytes')
+    lines = []
+    start = 0
+    newline = piece.find(b'\n')
+    while newline >= 0:
+      pending.append(piece[start:newline])
+      lines.append(b''.join(pending))
+      pending, pending_size = [], 0
+      start = newline + 1
+      newline = piece.find(b'\n', start)
+    if start < len(piece):
+      pending.append(piece[start:])
+      pending_size += len(piece) - start
+    if max_line_bytes is not None and (pending_size > max_line_bytes or any(len(line) > max_line_bytes for line in lines)):
+      raise ValueError(f'NDJSON line exceeds {max_line_bytes} bytes')
+    return lines
+
+  async for chunk in chunks:
+    for piece in _inflate(decompressor, chunk) if decompressor is not None else (chunk,):
+      for line in split(piece):
+        yield line
+  if decompressor is not None:
+    for line in split(_finish_inflate(decompressor)):
+      yield line
+  if pending:
+    yield b''.join(pending)
+
+
+class TraceImportService:
+  """Service for importing MLflow trace exports from files."""
+
+  def __init__(self, db_service: DatabaseService):
+    self.db_service = db_service
+
+  def import_file(
+    self,
+    workshop_id: str,
+    path: Path,
+    file_format: Optional[str] = None,
+    chunk_size: int = 500,
+    skip_existing: bool = True,
+    job_id: Optional[str] = None,
+    progress_callback: Optional[Callable[[Dict[str, int]], None]] = None,
+  ) -> Dict[str, int]:
+    """Stream an export file into a workshop.
+
+    Args:
+        workshop_id: Workshop to import traces into
+        path: Path of the JSONL or Parquet export
+        file_format: 'jsonl' or 'parquet' (inferred from the file name when omitted)
+        chunk_size: Number of traces inserted per transaction
+        skip_existing: Skip records whose MLflow trace ID already exists in the workshop
+        job_id: Optional import job to report progress and skipped records to
+        progress_callback: Optional callable receiving the running counters after each chunk
+
+    Returns:
+        Counters for records read, traces imported and records skipped
+    """
+    file_format = file_format or infer_file_format(path.name)
+    if file_format == 'jsonl':
+      records = iter_jsonl_records(path)
+    elif file_format == 'parquet':
+      records = iter_parquet_records(path, batch_size=chunk_size)
+    else:
+      raise ValueError(f'Unsupported export format: {file_format}. Supported formats: {", ".join(SUPPORTED_FORMATS)}')
+
+    return self.import_records(workshop_id, records, chunk_size, skip_existing, job_id, progress_callback)
+
+  def import_records(
+    self,
+    workshop_id: str,
+    records: Iterable[Union[Dict[str, Any], InvalidRecord]],
+    chunk_size: int = 500,
+    skip_existing: bool = True,
+    job_id: Optional[str] = None,
+    progress_callback: Optional[Callable[[Dict[str, int]], None]] = None,
+  ) -> Dict[str, int]:
+    """Convert and insert an iterable of exported trace records in chunks.
+
+    Records that cannot be decoded or converted are skipped; the job records why.
+    """
+    mlflow_config = self.db_service.get_mlflow_config(workshop_id)
+    compactor = SpanCompactor((mlflow_config.span_compaction if mlflow_config else None) or SpanCompactionConfig())
+    existing_ids = self.db_service.get_mlflow_trace_ids(workshop_id) if skip_existing else set()
+
+    counters = {'records_read': 0, 'traces_imported': 0, 'records_skipped': 0}
+    errors: List[str] = []
+    chunk: List[TraceUpload] = []
+    chunk_payloads: Dict[str, str] = {}
+
+    def flush() -> None:
+      if not chunk:
+        return
+      self.db_service.add_trace_payloads(workshop_id, chunk_payloads)
+      counters['traces_imported'] += self.db_service.bulk_add_traces(workshop_id, chunk)
+      chunk.clear()
+      chunk_payloads.clear()
+      if job_id:
+        self.db_service.update_trace_import_job(job_id, counters=counters, errors=errors)
+      if progress_callback:
+        progress_callback(dict(counters))
+
+    def skip(message: str) -> None:
+      counters['records_skipped'] += 1
+      if len(errors) < MAX_JOB_ERRORS:
+        errors.append(message)
+
+    for record in records:
+      counters['records_read'] += 1
+      if isinstance(record, InvalidRecord):
+        skip(record.message)
+        continue
+      try:
+        trace_upload, payloads = self._record_to_trace_upload(record, compactor)
+      except Exception as e:
+        skip(f'Record {counters["records_read"]}: {str(e)}')
+        continue
+
+      if trace_upload.mlflow_trace_id and trace_upload.mlflow_trace_id in existing_ids:
+        counters['records_skipped'] += 1
+        continue
+      if trace_upload.mlflow_trace_id:
+        existing_ids.add(trace_upload.mlflow_trace_id)
+
+      chunk.append(trace_upload)
+      chunk_payloads.update(payloads)
+      if len(chunk) >= chunk_size:
+        flush()
+
+    flush()
+    if job_id:
+      self.db_service.update_trace_import_job(job_id, counters=counters, errors=errors)
+    return counters
+
+  async def import_upload_stream(
+    self, workshop_id: str, chunks: AsyncIterator[bytes], gzip_encoded: bool = False, batch_size: int = 500
+  ) -> Dict[str, Any]:
+    """Validate and insert ``TraceUpload`` records from a streamed NDJSON request body.
+
+    Records are parsed as the body arrives and inserted in batches, so memory use does not
+    grow with the upload size. Invalid lines are rejected individually and reported.
+
+    Raises:
+        ValueError: If the body is corrupt or truncated gzip, or exceeds the upload size limits.
+            Batches inserted before the error are kept.
+    """
+    result: Dict[str, Any] = {'traces_created': 0, 'records_rejected': 0, 'errors': []}
+    batch: List[TraceUpload] = []
+    line_number = 0
+
+    lines = aiter_ndjson_lines(chunks, gzip_encoded, ServerConfig.TRACE_UPLOAD_MAX_BYTES, ServerConfig.TRACE_UPLOAD_MAX_LINE_BYTES)
+    try:
+      async for line in lines:
+        line_number += 1
+        line = line.strip()
+        if not line:
+          continue
+        try:
+          batch.append(TraceUpload.model_validate_json(line))
+        except ValidationError as e:
+          result['records_rejected'] += 1
+          if len(result['errors']) < MAX_JOB_ERRORS:
+            result['errors'].append(f'Line {line_number}: {e.errors()[0]["msg"] if e.errors() else str(e)}')
+          continue
+
+        if len(batch) >= batch_size:
+          result['traces_created'] += self.db_service.bulk_add_traces(workshop_id, batch)
+          batch = []
+    except ValueError as e:
+      # Earlier batches are already committed, so say how far the upload got
+      raise ValueError(f'Invalid upload body after line {line_number}: {e}. {result["traces_created"]} traces were imported before the error') from e
+
+    result['traces_created'] += self.db_service.bulk_add_traces(workshop_id, batch)
+    return result
+
+  def run_import_job(self, job_id: str, path: Path, chunk_size: int, skip_existing: bool, delete_after: bool = False) -> None:
+    """Run a created import job, recording its status (used as a background task)."""
+    job = self.db_service.get_trace_import_job(job_id)
+    if not job:
+      return
+
+    self.db_service.update_trace_import_job(job_id, status='running', started_at=datetime.now())
+    try:
+      self.import_file(job.workshop_id, path, job.file_format, chunk_size, skip_existing, job_id=job_id)
+      self.db_service.update_trace_import_job(job_id, status='completed', finished_at=datetime.now())
+    except Exception as e:
+      print(f'Trace import {job_id} failed: {str(e)}')
+      self.db_service.db.rollback()
+      errors = self.db_service.get_trace_import_job(job_id).errors
+      self.db_service.update_trace_import_job(job_id, status='failed', errors=[*errors[: MAX_JOB_ERRORS - 1], str(e)], finished_at=datetime.now())
+    finally:
+      if delete_after:
+        path.unlink(missing_ok=True)
+
+  def _record_to_trace_upload(self, record: Dict[str, Any], compactor: SpanCompactor) -> tuple[TraceUpload, Dict[str, str]]:
+    """Convert one exported trace record to a TraceUpload plus overflow payloads.
+
+    Supports ``Trace.to_dict()`` records (``info``/``data``), records with a serialized
+    ``trace`` column, and flat ``search_traces`` rows (``request``, ``response``, ``spans``).
+    """
+    if not isinstance(record, dict):
+      raise ValueError(f'Expected a JSON object, got {type(record).__name__}')
+    trace_value = _maybe_json(record.get('trace'))
+    if isinstance(trace_value, dict):
+      record = {**record, **trace_value}
+
+    info = record.get('info') or {}
+    data = record.get('data') or {}
+    raw_spans = data.get('spans') if data else record.get('spans')
+    raw_spans = _maybe_json(raw_spans) or []
+
+    spans = [self._normalize_span(span) for span in raw_spans if isinstance(span, dict)]
+
+    # Request/response: explicit fields first, then the root span payloads
+    request = record.get('request', data.get('request'))
+    response = record.get('response', data.get('response'))
+    root_span = next((s for s in raw_spans if isinstance(s, dict) and not s.get('parent_span_id') and not s.get('parent_id')), None)
+    if request is None and root_span is not None:
+      request = (root_span.get('attributes') or {}).get(SPAN_INPUTS_KEY, root_span.get('inputs'))
+    if response is None and root_span is not None:
+      response = (root_span.get('attributes') or {}).get(SPAN_OUTPUTS_KEY, root_span.get('outputs'))
+    if request is None:
+      request = info.get('request_preview')
+    if response is None:
+      response = info.get('response_preview')
+    if request is None and response is None:
+      raise ValueError('Record has no request/response data')
+
+    input_content = _extract_content(request)
+    output_content = _extract_content(response)
+
+    compacted_spans, payloads, compaction_stats = compactor.compact(spans)
+
+    trace_id = record.get('trace_id') or record.get('request_id') or info.get('trace_id') or info.get('request_id')
+    tags = _maybe_json(record.get('tags', info.get('tags'))) or {}
+    execution_time_ms = (
+      record.get('execution_time_ms')
+      or record.get('execution_duration')
+      or info.get('execution_duration_ms')
+      or info.get('execution_time_ms')
+    )
+    status = record.get('state') or record.get('status') or info.get('state') or info.get('status')
+    experiment_id = record.get('experiment_id') or info.get('experiment_id') or (info.get('trace_location') or {}).get('mlflow_experiment', {}).get('experiment_id')
+
+    trace_upload = TraceUpload(
+      input=input_content,
+      output=output_content,
+      context={
+        'spans': compacted_spans,
+        'span_compaction': compaction_stats,
+        'execution_time_ms': execution_time_ms,
+        'status': str(status) if status is not None else None,
+        'tags': dict(tags) if isinstance(tags, dict) else {},
+      },
+      trace_metadata={
+        'mlflow_trace_id': trace_id,
+        'mlflow_experiment_id': experiment_id,
+        'source': 'offline_import',
+      },
+      mlflow_trace_id=trace_id,
+      mlflow_experiment_id=experiment_id,
+    )
+    return trace_upload, payloads
+
+  def _normalize_span(self, span: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize exported span dictionaries to the shape stored by live intake."""
+    attributes = span.get('attributes') or {}
+    span_type = span.get('span_type', attributes.get(SPAN_TYPE_KEY))
+    return {
+      'name': span.get('name'),
+      'span_type': _maybe_json(span_type),
+      'inputs': _maybe_json(span['inputs']) if 'inputs' in span else _maybe_json(attributes.get(SPAN_INPUTS_KEY)),
+      'outputs': _maybe_json(span['outputs']) if 'outputs' in span else _maybe_json(attributes.get(SPAN_OUTPUTS_KEY)),
+      'start_time_ns': span.get('start_time_ns', span.get('start_time_unix_nano')),
+      'end_time_ns': span.get('end_time_ns', span.get('end_time_unix_nano')),
+    }